@@ -1,31 +1,122 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
+
 from celery import shared_task
+from redis.exceptions import LockError
+from sqlalchemy import select, delete
+
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.core.redis import get_redis
+from app.core.s3 import s3_service
 from app.db.session import SessionLocal
 from app.models.worker import ImageModel
-from app.core.s3 import s3_service
 
+logger = logging.getLogger(__name__)
+
+# Object keys whose rows are already deleted but whose S3 objects are not yet.
+# Survives worker restarts, so a slice that dies midway is picked up by the next one.
+PENDING_KEYS_QUEUE = "retention:s3_pending"
+RETENTION_LOCK = "retention:screenshots:lock"
+
+
+def _delete_expired_rows() -> int:
+    """
+    Deletes expired rows in short batches and queues their keys for S3 deletion.
+    Whole expired days are dropped as partitions by maintain_partitions; this only
+    sweeps what is left past the grace period (e.g. rows in the default partition).
+    """
+    retention_days = settings.SCREENSHOT_RETENTION_DAYS + settings.RETENTION_FALLBACK_GRACE_DAYS
+    cutoff_date = (
+        datetime.now(timezone.utc) - timedelta(days=retention_days)
+    ).replace(tzinfo=None)
+    redis_client = get_redis()
+    deleted_rows = 0
 
-@shared_task(name="cleanup_old_screenshots")
-def cleanup_old_screenshots():
     db = SessionLocal()
     try:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
+        for _ in range(settings.SCREENSHOT_RETENTION_MAX_BATCHES):
+            expired_ids = (
+                select(ImageModel.id)
+                .where(ImageModel.created_at < cutoff_date)
+                .order_by(ImageModel.id)
+                .limit(settings.SCREENSHOT_RETENTION_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            stmt = (
+                delete(ImageModel)
+                .where(ImageModel.id.in_(expired_ids))
+                .returning(ImageModel.s3_key)
+            )
+            keys = db.execute(stmt).scalars().all()
+            if not keys:
+                db.rollback()
+                break
+
+            # Queue first: if the commit fails the rows stay and are retried,
+            # deleting their (already expired) objects twice is harmless.
+            redis_client.rpush(PENDING_KEYS_QUEUE, *keys)
+            db.commit()
+            deleted_rows += len(keys)
+    finally:
+        db.close()
 
-        old_images = db.query(ImageModel).filter(ImageModel.created_at < cutoff_date).all()
+    return deleted_rows
 
-        deleted_count = 0
-        for img in old_images:
-            try:
-                s3_service.delete_file(img.s3_url)
 
-                db.delete(img)
-                deleted_count += 1
-            except Exception as e:
-                print(f"Error while deleting file {img.s3_url}: {e}")
+def _drain_pending_keys() -> tuple[int, int]:
+    """
+    Deletes queued keys from S3 with bulk DeleteObjects calls.
+    Keys are only trimmed from the queue after the calls return; failures are requeued.
+    """
+    redis_client = get_redis()
+    max_keys = settings.SCREENSHOT_RETENTION_BATCH_SIZE * settings.SCREENSHOT_RETENTION_MAX_BATCHES
+    keys = redis_client.lrange(PENDING_KEYS_QUEUE, 0, max_keys - 1)
+    if not keys:
+        return 0, 0
+
+    failed = asyncio.run(
+        s3_service.delete_objects(keys, concurrency=settings.S3_DELETE_CONCURRENCY)
+    )
+
+    pipe = redis_client.pipeline()
+    pipe.ltrim(PENDING_KEYS_QUEUE, len(keys), -1)
+    if failed:
+        pipe.rpush(PENDING_KEYS_QUEUE, *failed)
+    pipe.execute()
+
+    return len(keys) - len(failed), len(failed)
+
+
+@shared_task(name="cleanup_old_screenshots")
+def cleanup_old_screenshots():
+    """One retention slice. Scheduled every minute, bounded by SCREENSHOT_RETENTION_MAX_BATCHES."""
+    lock = get_redis().lock(RETENTION_LOCK, timeout=300)
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "reason": "previous slice still running"}
+
+    try:
+        deleted_rows = _delete_expired_rows()
+        deleted_objects, failed_objects = _drain_pending_keys()
+
+        incr("screenshot_retention_rows_deleted_total", deleted_rows)
+        incr("screenshot_retention_objects_deleted_total", deleted_objects)
+        incr("screenshot_retention_objects_failed_total", failed_objects)
+        set_gauge("screenshot_retention_pending_keys", get_redis().llen(PENDING_KEYS_QUEUE))
 
-        db.commit()
-        return {"status": "success", "deleted_images": deleted_count}
+        return {
+            "status": "success",
+            "deleted_images": deleted_rows,
+            "deleted_objects": deleted_objects,
+            "requeued_objects": failed_objects,
+        }
     except Exception as e:
-        print(f"Error in task cleanup: {e}")
+        logger.error(f"Error in screenshot retention: {e}")
+        return {"status": "error", "error": str(e)}
     finally:
-        db.close()
\ No newline at end of file
+        try:
+            lock.release()
+        except LockError:
+            pass
@@ -0,0 +1,50 @@
+"""
+Enqueueing of Celery jobs from the API.
+
+The API only sends messages, so Celery and the task modules (with docker-py,
+aioboto3, Pillow behind them) are imported on the first enqueue instead of with
+app.main. app.main warms them up in the background once the app is serving.
+"""
+from datetime import datetime
+
+from app.core.config import settings
+
+
+def enqueue_provisioning(worker_id: int, vnc_password: str | None) -> None:
+    from app.celery_tasks.worker_tasks import provision_worker
+
+    provision_worker.delay(
+        worker_id=worker_id,
+        vnc_password=vnc_password,
+        gemini_api_key=settings.GEMINI_API_KEY,
+    )
+
+
+def enqueue_task_execution(
+    task_id: int,
+    worker_id: int,
+    container_id: str | None,
+    prompt: str,
+    record_timeline: bool = False,
+    created_at: datetime | None = None,
+) -> None:
+    from app.celery_tasks.worker_tasks import execute_worker_task, execution_id
+
+    execute_worker_task.apply_async(
+        kwargs=dict(
+            task_id=task_id,
+            # Lets the execution address the task's partition instead of every one
+            created_at=created_at.isoformat() if created_at else None,
+            worker_id=worker_id,
+            container_id=container_id,
+            prompt=prompt,
+            gemini_api_key=settings.GEMINI_API_KEY,
+            record_timeline=record_timeline,
+        ),
+        task_id=execution_id(task_id),
+    )
+
+
+def warm_up() -> None:
+    """Imports what the first enqueue would otherwise pay for. Blocking, run it in a thread."""
+    import app.celery_tasks.worker_tasks  # noqa: F401
@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from sqlalchemy import column, select, table as table_clause, text
+
+from app.celery_tasks.cleanup_screenshots import PENDING_KEYS_QUEUE
+from app.core.config import settings
+from app.core.metrics import incr
+from app.core.redis import get_redis
+from app.db.partitions import (
+    PARTITIONED_TABLES,
+    create_partition,
+    drop_partition,
+    expired_partitions,
+    missing_days,
+    partition_name,
+    unlink_task_images,
+)
+from app.db.session import SessionLocal
+from app.worker.status_cache import mark_tasks_deleted
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = {
+    "tasks": lambda: settings.TASK_RETENTION_DAYS,
+    "task_images": lambda: settings.SCREENSHOT_RETENTION_DAYS,
+}
+
+
+def _partition_keys(db, name: str) -> list[str]:
+    """S3 keys of a screenshot partition, read in batches."""
+    result = db.execute(
+        text(f'SELECT s3_key FROM "{name}"'), execution_options={"yield_per": 1000}
+    )
+    return [key for keys in result.scalars().partitions() for key in keys]
+
+
+def _partition_tasks(db, name: str) -> list[tuple[int, int, int]]:
+    """(task_id, worker_id, user_id) of every task in a tasks partition."""
+    return db.execute(
+        text(
+            f'SELECT t.id, t.worker_id, w.user_id FROM "{name}" t '
+            "JOIN workers w ON w.id = t.worker_id"
+        )
+    ).tuples().all()
+
+
+def _queue_keys(keys: list[str]) -> None:
+    """Hands S3 keys to the retention delete queue, in RPUSH batches of 1000."""
+    redis_client = get_redis()
+    for i in range(0, len(keys), 1000):
+        redis_client.rpush(PENDING_KEYS_QUEUE, *keys[i:i + 1000])
+
+
+def _maintain_table(db, table: str, today, created: list, dropped: list, failed: list) -> None:
+    for day in missing_days(db, table, today, settings.PARTITION_PREMAKE_DAYS):
+        name = partition_name(table, day)
+        try:
+            create_partition(db, table, day)
+            db.commit()
+            created.append(name)
+        except Exception as e:
+            db.rollback()
+            failed.append(name)
+            logger.error(f"Partition {name} not created: {e}")
+
+    cutoff = today - timedelta(days=RETENTION_DAYS[table]())
+    for name in expired_partitions(db, table, cutoff):
+        try:
+            # DROP needs a brief exclusive lock on the parent: give up rather
+            # than queue live inserts behind it, the next run retries.
+            db.execute(text("SET LOCAL lock_timeout = '5s'"))
+            # Keys are only queued once the DROP is committed: a rolled back
+            # drop must not have its screenshots deleted from S3.
+            keys = _partition_keys(db, name) if table == "task_images" else []
+            tasks = _partition_tasks(db, name) if table == "tasks" else []
+            if table == "tasks":
+                db.execute(
+                    unlink_task_images(select(column("id")).select_from(table_clause(name)))
+                )
+            drop_partition(db, name)
+            db.commit()
+            dropped.append(name)
+            mark_tasks_deleted(tasks)
+        except Exception as e:
+            db.rollback()
+            failed.append(name)
+            logger.error(f"Partition {name} not dropped: {e}")
+            continue
+
+        try:
+            _queue_keys(keys)
+        except Exception as e:
+            # The rows are gone, so this is the last trace of those objects: log them loud
+            failed.append(name)
+            logger.error(f"S3 keys of dropped partition {name} not queued ({len(keys)}): {e}")
+
+
+@shared_task(name="maintain_partitions")
+def maintain_partitions():
+    """
+    Creates the next PARTITION_PREMAKE_DAYS daily partitions and drops expired ones.
+    Each partition is created or dropped in its own transaction and each table is
+    handled on its own: a failure is logged, counted and retried on the next run
+    without holding back the other partitions.
+    """
+    today = datetime.now(timezone.utc).date()
+    db = SessionLocal()
+    created, dropped, failed = [], [], []
+    try:
+        for table in PARTITIONED_TABLES:
+            try:
+                _maintain_table(db, table, today, created, dropped, failed)
+            except Exception as e:
+                db.rollback()
+                failed.append(table)
+                logger.error(f"Partition maintenance of {table} failed: {e}")
+
+        incr("partitions_created_total", len(created))
+        incr("partitions_dropped_total", len(dropped))
+        if failed:
+            incr("partition_maintenance_errors_total", len(failed))
+        return {
+            "status": "error" if failed else "success",
+            "created": created,
+            "dropped": dropped,
+            "failed": failed,
+        }
+    finally:
+        db.close()
@@ -0,0 +1,343 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from redis.exceptions import LockError
+from sqlalchemy import and_, func, or_, select, update
+
+from app.celery_tasks.worker_tasks import execution_id
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.core.redis import get_redis
+from app.db.session import SessionLocal
+from app.models.worker import (
+    ProvisioningPhase,
+    ResourceClass,
+    TaskModel,
+    TaskStatus,
+    WorkerModel,
+    WorkerStatus,
+)
+from app.worker.docker_service import get_docker_service
+from app.worker.resources import boosted_worker_ids, release_worker
+from app.worker.status_cache import mark_worker_changed, mark_task_changed
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOCK = "reconcile:lock"
+
+OPEN_TASK_STATUSES = (TaskStatus.QUEUED, TaskStatus.PROCESSING)
+
+# Hash of the kombu Redis transport holding messages delivered but not yet acked
+BROKER_UNACKED_KEY = "unacked"
+
+
+def _message_id(raw: str, unacked: bool = False) -> str | None:
+    try:
+        message = json.loads(raw)
+        if unacked:
+            # Unacked entries are [message, exchange, routing_key]
+            message = message[0]
+        return message["headers"]["id"]
+    except (ValueError, LookupError, TypeError):
+        return None
+
+
+def _broker_task_ids() -> set[str]:
+    """Ids of the messages waiting in the broker queue or delivered and not yet acked."""
+    redis_client = get_redis()
+    ids = {
+        _message_id(raw)
+        for raw in redis_client.lrange(celery_app.conf.task_default_queue, 0, -1)
+    }
+    ids.update(
+        _message_id(raw, unacked=True) for raw in redis_client.hvals(BROKER_UNACKED_KEY)
+    )
+    ids.discard(None)
+    return ids
+
+
+def _live_celery_task_ids() -> set[str] | None:
+    """
+    Ids of every task message that still exists: waiting in the broker, held by a
+    worker for an ETA, prefetched or running.
+    A message only moves along that list, so each place is read before the next:
+    one in flight between two reads is seen in the later one.
+    Returns None when no worker replied: "nothing is running" can't be told
+    apart from "workers are unreachable", so callers must not act on it.
+    """
+    live_ids = _broker_task_ids()
+
+    inspect = celery_app.control.inspect(timeout=settings.RECONCILE_INSPECT_TIMEOUT_SECONDS)
+    scheduled = inspect.scheduled()
+    reserved = inspect.reserved()
+    active = inspect.active()
+    if active is None:
+        return None
+
+    for entries in (scheduled or {}).values():
+        live_ids.update(entry["request"]["id"] for entry in entries)
+    for requests in (reserved or {}).values():
+        live_ids.update(request["id"] for request in requests)
+    for requests in active.values():
+        live_ids.update(request["id"] for request in requests)
+    return live_ids
+
+
+def _container_created_at(container) -> datetime:
+    # Docker reports nanoseconds ("2025-01-01T12:00:00.123456789Z"), seconds are enough
+    return datetime.strptime(
+        container.attrs["Created"][:19], "%Y-%m-%dT%H:%M:%S"
+    ).replace(tzinfo=timezone.utc)
+
+
+def _fail_lost_tasks(db, live_ids: set[str], now: datetime) -> list:
+    """
+    Marks open tasks whose Celery message no longer exists as FAILED: PROCESSING
+    tasks started before the grace period with no live execution, and QUEUED tasks
+    whose message is neither in the broker nor on a worker. Returns (id, worker_id) of each.
+    A task failed here never runs later: execute_worker_task only claims QUEUED tasks.
+    """
+    cutoff = now - timedelta(seconds=settings.RECONCILE_TASK_GRACE_SECONDS)
+    open_tasks = db.execute(
+        select(TaskModel.id, TaskModel.created_at, TaskModel.worker_id, TaskModel.status).where(
+            or_(
+                and_(
+                    TaskModel.status == TaskStatus.PROCESSING,
+                    func.coalesce(TaskModel.started_at, TaskModel.created_at) < cutoff,
+                ),
+                and_(TaskModel.status == TaskStatus.QUEUED, TaskModel.created_at < cutoff),
+            )
+        )
+    ).all()
+
+    lost = [row for row in open_tasks if execution_id(row.id) not in live_ids]
+    if not lost:
+        return []
+    # Conditional on the status read above: a task claimed meanwhile is left alone
+    return db.execute(
+        update(TaskModel)
+        .where(
+            or_(
+                *(
+                    and_(
+                        TaskModel.id == row.id,
+                        TaskModel.created_at == row.created_at,
+                        TaskModel.status == row.status,
+                    )
+                    for row in lost
+                )
+            )
+        )
+        .values(
+            status=TaskStatus.FAILED,
+            result="Error: Task execution was lost before it finished.",
+            finished_at=now,
+        )
+        .returning(TaskModel.id, TaskModel.worker_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _release_stuck_workers(db) -> list:
+    """BUSY workers without an open task go back to IDLE. Returns (user_id, id) of each."""
+    open_task = (
+        select(TaskModel.id)
+        .where(
+            TaskModel.worker_id == WorkerModel.id,
+            TaskModel.status.in_(OPEN_TASK_STATUSES),
+        )
+        .exists()
+    )
+    result = db.execute(
+        update(WorkerModel)
+        .where(WorkerModel.status == WorkerStatus.BUSY, ~open_task)
+        .values(status=WorkerStatus.IDLE)
+        .returning(WorkerModel.user_id, WorkerModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.all()
+
+
+def _sync_container_states(
+    db, workers, containers_by_id, now: datetime, changed_workers: set[tuple[int, int]]
+) -> dict:
+    """
+    Aligns worker status with what Docker reports:
+    - IDLE/BUSY workers whose container is gone -> ERROR, stopped -> OFFLINE
+    - STARTING workers past the grace period -> ERROR: provision_worker gives up well
+      before it, so their provisioning job was lost
+    Each update is conditional on the status read at the start of the run,
+    so a concurrent start/stop from the API wins over the reconciler.
+    """
+    starting_cutoff = now - timedelta(seconds=settings.RECONCILE_STARTING_GRACE_SECONDS)
+    fixes = {"missing_containers": 0, "stopped_containers": 0, "stale_starting": 0}
+
+    for worker in workers:
+        container = containers_by_id.get(worker.container_id) if worker.container_id else None
+        running = container is not None and container.status == "running"
+
+        if worker.status in (WorkerStatus.IDLE, WorkerStatus.BUSY) and not running:
+            if container is None:
+                values, drift = {"status": WorkerStatus.ERROR}, "missing_containers"
+            else:
+                values, drift = {"status": WorkerStatus.OFFLINE}, "stopped_containers"
+        elif worker.status == WorkerStatus.STARTING and worker.created_at < starting_cutoff:
+            values = {
+                "status": WorkerStatus.ERROR,
+                "provisioning_phase": ProvisioningPhase.FAILED,
+                "provisioning_error": "Provisioning did not finish in time.",
+            }
+            drift = "stale_starting"
+        else:
+            continue
+
+        result = db.execute(
+            update(WorkerModel)
+            .where(WorkerModel.id == worker.id, WorkerModel.status == worker.status)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            fixes[drift] += 1
+            changed_workers.add((worker.user_id, worker.id))
+
+    return fixes
+
+
+def _release_stale_boosts(db) -> int:
+    """Returns boost budget held by workers that are no longer BUSY (lost task, crashed release)."""
+    boosted_ids = boosted_worker_ids()
+    if not boosted_ids:
+        return 0
+
+    rows = db.execute(
+        select(
+            WorkerModel.id,
+            WorkerModel.container_id,
+            WorkerModel.status,
+            WorkerModel.resource_class,
+        ).where(WorkerModel.id.in_(boosted_ids))
+    ).all()
+    busy_ids = {row.id for row in rows if row.status == WorkerStatus.BUSY}
+    workers = {row.id: row for row in rows}
+
+    stale_ids = boosted_ids - busy_ids
+    for worker_id in stale_ids:
+        worker = workers.get(worker_id)
+        if worker:
+            release_worker(worker_id, worker.container_id, worker.resource_class)
+        else:
+            # Deleted worker: its container is gone, only the budget is left
+            release_worker(worker_id, None, ResourceClass.DESKTOP)
+    return len(stale_ids)
+
+
+def _remove_orphan_containers(containers, known_ids: set[str], now: datetime) -> int:
+    """
+    Removes factory containers no worker row points at. Young containers are
+    skipped: provision_worker stores the id in its creating_container phase only
+    after containers.run returns (and a kasm container's port is mapped).
+    """
+    cutoff = now - timedelta(seconds=settings.RECONCILE_ORPHAN_GRACE_SECONDS)
+    removed = 0
+
+    for container in containers:
+        if container.id in known_ids or _container_created_at(container) > cutoff:
+            continue
+        try:
+            get_docker_service().remove_container(container.id)
+            removed += 1
+        except Exception as e:
+            logger.warning(f"Failed to remove orphan container {container.name}: {e}")
+
+    return removed
+
+
+@shared_task(name="reconcile_workers")
+def reconcile_workers():
+    """
+    Brings the workers/tasks tables back in line with Docker and Celery.
+    Covers what the happy path can't: a Celery process dying mid-task, the API
+    crashing between containers.run and saving the container id, deleted workers.
+    """
+    lock = get_redis().lock(RECONCILE_LOCK, timeout=600)
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "reason": "previous reconcile still running"}
+
+    db = SessionLocal()
+    now = datetime.now(timezone.utc)
+    summary = {}
+    try:
+        docker_service = get_docker_service()
+        containers = docker_service.list_factory_containers()
+        containers_by_id = {container.id: container for container in containers}
+
+        workers = db.execute(
+            select(
+                WorkerModel.id,
+                WorkerModel.user_id,
+                WorkerModel.container_id,
+                WorkerModel.status,
+                WorkerModel.created_at,
+            )
+        ).all()
+        known_ids = {worker.container_id for worker in workers if worker.container_id}
+
+        # (user_id, worker_id) of every worker whose status or tasks changed
+        changed_workers: set[tuple[int, int]] = set()
+        summary.update(
+            _sync_container_states(db, workers, containers_by_id, now, changed_workers)
+        )
+        lost_tasks = []
+
+        live_ids = _live_celery_task_ids()
+        if live_ids is None:
+            logger.warning("No Celery worker answered inspect, task liveness skipped.")
+            incr("reconcile_inspect_unavailable_total")
+        else:
+            lost_tasks = _fail_lost_tasks(db, live_ids, now)
+            summary["lost_tasks"] = len(lost_tasks)
+            owners = {worker.id: worker.user_id for worker in workers}
+            changed_workers.update(
+                (owners[task.worker_id], task.worker_id)
+                for task in lost_tasks
+                if task.worker_id in owners
+            )
+            released = _release_stuck_workers(db)
+            summary["released_workers"] = len(released)
+            changed_workers.update((row.user_id, row.id) for row in released)
+        db.commit()
+
+        if lost_tasks:
+            mark_task_changed(*(task.id for task in lost_tasks))
+        workers_by_user: dict[int, list[int]] = {}
+        for user_id, worker_id in changed_workers:
+            workers_by_user.setdefault(user_id, []).append(worker_id)
+        for user_id, worker_ids in workers_by_user.items():
+            mark_worker_changed(user_id, *worker_ids)
+
+        summary["stale_boosts_released"] = _release_stale_boosts(db)
+        summary["orphan_containers_removed"] = _remove_orphan_containers(
+            containers, known_ids, now
+        )
+        if settings.RECONCILE_PRUNE_IMAGES:
+            summary["image_bytes_reclaimed"] = docker_service.prune_dangling_images()
+
+        for name, value in summary.items():
+            set_gauge(f"reconcile_{name}", value)
+        set_gauge("reconcile_last_success_timestamp", now.timestamp())
+        return {"status": "success", **summary}
+    except Exception as e:
+        db.rollback()
+        incr("reconcile_errors_total")
+        logger.error(f"Reconcile failed: {e}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            pass
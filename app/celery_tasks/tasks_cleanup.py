@@ -1,28 +1,117 @@
-from datetime import datetime, timedelta, timezone
+import logging
+import time
+
 from celery import shared_task
+from redis.exceptions import LockError
+from sqlalchemy import case, select, delete, func, text, tuple_
+
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.core.redis import get_redis
+from app.db.partitions import unlink_task_images
 from app.db.session import SessionLocal
-from app.models.worker import TaskModel
+from app.models.user import User
+from app.models.worker import TaskModel, WorkerModel, TaskStatus
+from app.worker.status_cache import mark_tasks_deleted
+
+logger = logging.getLogger(__name__)
+
+PURGE_LOCK = "retention:tasks:lock"
+
+
+def _purge_batch(db, after_id: int) -> list[tuple[int, int, int]]:
+    """
+    Deletes up to TASK_PURGE_BATCH_SIZE expired tasks with id > after_id and
+    unlinks their images. Returns (task_id, worker_id, user_id) of the deleted tasks.
+
+    Only primary keys are selected, so `logs` and `result` never leave the database,
+    and the delete addresses each row's partition.
+    Rows locked by a live task write are skipped, and lock/statement timeouts keep
+    a slow batch from blocking the tasks table.
+
+    Global retention is handled by dropping daily partitions (maintain_partitions);
+    this purge applies shorter per-user retention and sweeps leftovers past the grace period.
+    """
+    db.execute(text(f"SET LOCAL lock_timeout = {settings.TASK_PURGE_LOCK_TIMEOUT_MS}"))
+    db.execute(
+        text(f"SET LOCAL statement_timeout = {settings.TASK_PURGE_STATEMENT_TIMEOUT_MS}")
+    )
+
+    # LEAST ignores NULLs, so users without a retention of their own need their
+    # own branch to get the grace period.
+    retention_days = case(
+        (
+            User.task_retention_days.is_(None),
+            settings.TASK_RETENTION_DAYS + settings.RETENTION_FALLBACK_GRACE_DAYS,
+        ),
+        else_=func.least(User.task_retention_days, settings.TASK_RETENTION_DAYS),
+    )
+    expired_keys = (
+        select(TaskModel.id, TaskModel.created_at)
+        .join(WorkerModel, WorkerModel.id == TaskModel.worker_id)
+        .join(User, User.id == WorkerModel.user_id)
+        .where(
+            TaskModel.id > after_id,
+            TaskModel.status != TaskStatus.PROCESSING,
+            TaskModel.created_at < func.now() - func.make_interval(0, 0, 0, retention_days),
+        )
+        .order_by(TaskModel.id)
+        .limit(settings.TASK_PURGE_BATCH_SIZE)
+        .with_for_update(of=TaskModel, skip_locked=True)
+    )
+    owner_id = (
+        select(WorkerModel.user_id)
+        .where(WorkerModel.id == TaskModel.worker_id)
+        .scalar_subquery()
+    )
+    stmt = (
+        delete(TaskModel)
+        .where(tuple_(TaskModel.id, TaskModel.created_at).in_(expired_keys))
+        .returning(TaskModel.id, TaskModel.worker_id, owner_id)
+    )
+    deleted = db.execute(stmt).tuples().all()
+    if deleted:
+        db.execute(unlink_task_images([task_id for task_id, _, _ in deleted]))
+    return deleted
 
 
 @shared_task(name="cleanup_old_tasks")
 def cleanup_old_tasks():
+    """Purges expired task history in bounded batches. Scheduled every 5 minutes."""
+    lock = get_redis().lock(PURGE_LOCK, timeout=600)
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "reason": "previous purge still running"}
+
     db = SessionLocal()
+    started = time.monotonic()
+    deleted_count = 0
+    after_id = 0
     try:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=10)
-
-        old_tasks = db.query(TaskModel).filter(TaskModel.created_at < cutoff_date).all()
-
-        deleted_count = 0
-        for task in old_tasks:
+        for _ in range(settings.TASK_PURGE_MAX_BATCHES):
+            batch_started = time.monotonic()
             try:
-                db.delete(task)
-                deleted_count += 1
+                deleted = _purge_batch(db, after_id)
+                db.commit()
             except Exception as e:
-                print(f"Error while deleting task {task.id}: {e}")
+                db.rollback()
+                incr("task_purge_batch_errors_total")
+                logger.warning(f"Task purge batch after id {after_id} failed: {e}")
+                break
+
+            set_gauge("task_purge_last_batch_seconds", time.monotonic() - batch_started)
+            if not deleted:
+                break
+
+            mark_tasks_deleted(deleted)
+            deleted_count += len(deleted)
+            after_id = max(task_id for task_id, _, _ in deleted)
+            incr("task_purge_deleted_total", len(deleted))
 
-        db.commit()
+        set_gauge("task_purge_last_run_seconds", time.monotonic() - started)
         return {"status": "success", "deleted_tasks": deleted_count}
-    except Exception as e:
-        print(f"Error in task cleanup: {e}")
     finally:
         db.close()
+        try:
+            lock.release()
+        except LockError:
+            pass
@@ -0,0 +1,175 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from redis.exceptions import LockError
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.core.redis import get_redis
+from app.db.session import SessionLocal
+from app.models.worker import (
+    TaskModel,
+    TaskStatus,
+    TaskUsageModel,
+    WorkerModel,
+    WorkerStatus,
+    WorkerUsageModel,
+)
+from app.worker.telemetry import sample_containers
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_LOCK = "telemetry:collect:lock"
+
+SAMPLED_STATUSES = (WorkerStatus.STARTING, WorkerStatus.IDLE, WorkerStatus.BUSY)
+
+
+def _sample_row(usage: dict) -> dict:
+    return {
+        "samples": 1,
+        "cpu_percent_sum": usage["cpu_percent"],
+        "cpu_percent_max": usage["cpu_percent"],
+        "memory_bytes_sum": usage["memory_bytes"],
+        "memory_bytes_max": usage["memory_bytes"],
+        "pids_max": usage["pids"],
+        "block_read_bytes": usage["block_read_bytes"],
+        "block_write_bytes": usage["block_write_bytes"],
+        "net_rx_bytes": usage["net_rx_bytes"],
+        "net_tx_bytes": usage["net_tx_bytes"],
+    }
+
+
+def _accumulate(table, excluded) -> dict:
+    """ON CONFLICT update that folds a new sample into an existing aggregate row."""
+    summed = (
+        "samples",
+        "cpu_percent_sum",
+        "memory_bytes_sum",
+        "block_read_bytes",
+        "block_write_bytes",
+        "net_rx_bytes",
+        "net_tx_bytes",
+    )
+    peaks = ("cpu_percent_max", "memory_bytes_max", "pids_max")
+
+    values = {name: table.c[name] + excluded[name] for name in summed}
+    values.update({name: func.greatest(table.c[name], excluded[name]) for name in peaks})
+    return values
+
+
+@shared_task(name="collect_worker_usage")
+def collect_worker_usage():
+    """
+    Samples CPU, memory, I/O, network and PIDs of every running worker container
+    and folds them into per-minute worker rows and per-task totals.
+    Scheduled every TELEMETRY_SAMPLE_SECONDS.
+    """
+    lock = get_redis().lock(TELEMETRY_LOCK, timeout=settings.TELEMETRY_SAMPLE_SECONDS * 2)
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "reason": "previous collection still running"}
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(WorkerModel.id, WorkerModel.container_id, TaskModel.id.label("task_id"))
+            .outerjoin(
+                TaskModel,
+                and_(
+                    TaskModel.worker_id == WorkerModel.id,
+                    TaskModel.status == TaskStatus.PROCESSING,
+                ),
+            )
+            .where(
+                WorkerModel.container_id.is_not(None),
+                WorkerModel.status.in_(SAMPLED_STATUSES),
+            )
+        ).all()
+
+        workers = {row.container_id: row.id for row in rows}
+        tasks = [row for row in rows if row.task_id is not None]
+
+        usage = sample_containers(list(workers))
+        now = datetime.now(timezone.utc)
+        minute = now.replace(second=0, microsecond=0)
+
+        worker_rows = [
+            {"worker_id": workers[container_id], "minute": minute, **_sample_row(sample)}
+            for container_id, sample in usage.items()
+        ]
+        task_rows = [
+            {
+                "task_id": row.task_id,
+                "worker_id": row.id,
+                "first_sample_at": now,
+                "last_sample_at": now,
+                **_sample_row(usage[row.container_id]),
+            }
+            for row in tasks
+            if row.container_id in usage
+        ]
+
+        if worker_rows:
+            stmt = insert(WorkerUsageModel).values(worker_rows)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["worker_id", "minute"],
+                    set_=_accumulate(WorkerUsageModel.__table__, stmt.excluded),
+                )
+            )
+        if task_rows:
+            stmt = insert(TaskUsageModel).values(task_rows)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["task_id"],
+                    set_={
+                        **_accumulate(TaskUsageModel.__table__, stmt.excluded),
+                        "last_sample_at": stmt.excluded.last_sample_at,
+                    },
+                )
+            )
+        db.commit()
+
+        set_gauge("telemetry_sampled_containers", len(usage))
+        return {"status": "success", "sampled": len(usage), "tasks": len(task_rows)}
+    except Exception as e:
+        db.rollback()
+        incr("telemetry_errors_total")
+        logger.error(f"Usage collection failed: {e}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            pass
+
+
+@shared_task(name="purge_usage_history")
+def purge_usage_history():
+    """Drops worker usage past TELEMETRY_RETENTION_DAYS and task usage of purged tasks."""
+    now = datetime.now(timezone.utc)
+    task_retention_days = settings.TASK_RETENTION_DAYS + settings.RETENTION_FALLBACK_GRACE_DAYS
+
+    db = SessionLocal()
+    try:
+        workers_deleted = db.execute(
+            delete(WorkerUsageModel).where(
+                WorkerUsageModel.minute < now - timedelta(days=settings.TELEMETRY_RETENTION_DAYS)
+            )
+        ).rowcount
+        tasks_deleted = db.execute(
+            delete(TaskUsageModel).where(
+                TaskUsageModel.last_sample_at < now - timedelta(days=task_retention_days)
+            )
+        ).rowcount
+        db.commit()
+        return {"status": "success", "worker_rows": workers_deleted, "task_rows": tasks_deleted}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Usage history purge failed: {e}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+import logging
+
+from celery import shared_task
+from redis.exceptions import LockError
+from sqlalchemy import select, delete, func
+
+from app.core.config import settings
+from app.core.metrics import incr
+from app.core.redis import get_redis
+from app.db.session import SessionLocal
+from app.models.user import RefreshTokenModel
+
+logger = logging.getLogger(__name__)
+
+PURGE_LOCK = "retention:refresh_tokens:lock"
+
+
+def _purge_batch(db) -> int:
+    """Deletes up to REFRESH_TOKEN_PURGE_BATCH_SIZE expired refresh tokens, oldest first."""
+    expired_ids = (
+        select(RefreshTokenModel.id)
+        .where(RefreshTokenModel.expires_at < func.now())
+        .order_by(RefreshTokenModel.expires_at)
+        .limit(settings.REFRESH_TOKEN_PURGE_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        delete(RefreshTokenModel).where(RefreshTokenModel.id.in_(expired_ids))
+    )
+    return result.rowcount
+
+
+@shared_task(name="purge_expired_refresh_tokens")
+def purge_expired_refresh_tokens():
+    """
+    Purges expired refresh tokens in bounded batches, each in its own transaction.
+    Logins only clean up the tokens of the user logging in. Scheduled hourly.
+    """
+    lock = get_redis().lock(PURGE_LOCK, timeout=600)
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "reason": "previous purge still running"}
+
+    db = SessionLocal()
+    deleted_count = 0
+    try:
+        for _ in range(settings.REFRESH_TOKEN_PURGE_MAX_BATCHES):
+            try:
+                deleted = _purge_batch(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Refresh token purge batch failed: {e}")
+                break
+
+            deleted_count += deleted
+            incr("refresh_tokens_purged_total", deleted)
+            if deleted < settings.REFRESH_TOKEN_PURGE_BATCH_SIZE:
+                break
+
+        return {"status": "success", "deleted_tokens": deleted_count}
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            pass
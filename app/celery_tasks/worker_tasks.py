@@ -3,27 +3,105 @@ import datetime
 import logging
 from datetime import datetime, timezone
 from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy import select, update
 
 from app.core.celery_app import celery_app
+from app.core.config import settings
 from app.db.session import SessionLocal
-from app.models.worker import TaskModel, WorkerModel, WorkerStatus, TaskStatus
-from app.worker.docker_service import get_docker_service
+from app.models.worker import (
+    TaskModel,
+    WorkerModel,
+    WorkerStatus,
+    TaskStatus,
+    ResourceClass,
+    ProvisioningPhase,
+)
+from app.worker.docker_service import get_docker_service, WORKER_CONTAINER_PREFIX
+from app.worker.resources import boost_worker, release_worker, worker_profile
+from app.worker.status_cache import mark_worker_changed, mark_task_changed
+from app.worker.timeline import TimelineRecorder
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(bind=True, name="run_oi_agent")
-def run_oi_agent(self, container_id: str, gemini_api_key: str):
+def execution_id(task_id: int) -> str:
+    """Celery task id of a task's execution, so its liveness can be checked by TaskModel.id."""
+    return f"execute_worker_task:{task_id}"
+
+
+def _task_key(task_id: int, created_at: str | None) -> list:
+    """Conditions matching a task; created_at, if the message carries it, prunes to one partition."""
+    conditions = [TaskModel.id == task_id]
+    if created_at:
+        conditions.append(TaskModel.created_at == datetime.fromisoformat(created_at))
+    return conditions
+
+
+def _claim_task(task_id: int, created_at: str | None = None) -> bool:
+    """
+    QUEUED -> PROCESSING, at most once. False if the task was deleted, failed by
+    the reconciler or already claimed by an earlier delivery of the same message.
+    """
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(TaskModel)
+            .where(*_task_key(task_id, created_at), TaskModel.status == TaskStatus.QUEUED)
+            .values(status=TaskStatus.PROCESSING, started_at=datetime.now(timezone.utc))
+            .returning(TaskModel.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return claimed is not None
+    finally:
+        db.close()
+
+
+def _finish_task(db, task_id: int, outcome: dict, created_at: str | None = None) -> bool:
     """
-    Attention frontend: user need to wait 3-4 minutes while ubuntu installing
-    apps for new computer
-    :param self:
-    :param container_id:
-    :param gemini_api_key:
-    :return:
+    PROCESSING -> COMPLETED/FAILED with the execution's outcome, at most once.
+    False if the reconciler failed the task meanwhile: a finished task is served
+    as immutable, so its status must never change again.
     """
-    logger.info(f"⚙️ Initialization container {container_id}")
+    finished = db.execute(
+        update(TaskModel)
+        .where(*_task_key(task_id, created_at), TaskModel.status == TaskStatus.PROCESSING)
+        .values(**outcome, finished_at=datetime.now(timezone.utc))
+        .returning(TaskModel.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return finished is not None
 
+
+def _release_worker(db, worker_id: int) -> int | None:
+    """
+    BUSY -> IDLE once the worker has no open task. Only from BUSY: the events
+    listener may have marked the container OFFLINE/ERROR in the meantime.
+    Returns the owner's user id if the worker was released.
+    """
+    open_task = (
+        select(TaskModel.id)
+        .where(
+            TaskModel.worker_id == worker_id,
+            TaskModel.status.in_((TaskStatus.QUEUED, TaskStatus.PROCESSING)),
+        )
+        .exists()
+    )
+    released = db.execute(
+        update(WorkerModel)
+        .where(
+            WorkerModel.id == worker_id,
+            WorkerModel.status == WorkerStatus.BUSY,
+            ~open_task,
+        )
+        .values(status=WorkerStatus.IDLE)
+        .returning(WorkerModel.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    return released
+
+
+def _install_desktop_apps(container_id: str):
     # 1. Даємо права sudo (від root)
     fix_sudo_cmd = "sh -c 'echo \"kasm-user ALL=(ALL) NOPASSWD:ALL\" >> /etc/sudoers'"
     try:
@@ -46,6 +124,7 @@ def run_oi_agent(self, container_id: str, gemini_api_key: str):
     get_docker_service().execute_command(container_id, install_cmd, user="kasm-user")
 
 
+def _start_agent(container_id: str, gemini_api_key: str):
     python_logic = (
 "import os; "
 "os.makedirs('/home/kasm-user/agent', exist_ok=True); "
@@ -58,11 +137,146 @@ f"os.environ['GEMINI_API_KEY']='{gemini_api_key}'; "
     oi_cmd = f'python3 -c "{python_logic}"'
     get_docker_service().execute_command(container_id, oi_cmd, user="kasm-user")
 
-    return {"status": "initialized"}
+
+def _probe_ready(container_id: str, desktop: bool):
+    """Raises RuntimeError unless the container runs and everything a task needs is in place."""
+    container = get_docker_service().client.containers.get(container_id)
+    if container.status != "running":
+        raise RuntimeError(f"Container is {container.status}.")
+
+    checks = ["python3 -c 'import interpreter'", "test -w /home/kasm-user/agent"]
+    if desktop:
+        checks.append("command -v scrot")
+    for check in checks:
+        get_docker_service().execute_command(
+            container_id, f'sh -c "{check}"', user="kasm-user"
+        )
+
+
+def _advance(db, worker_id: int, phase: ProvisioningPhase, **values) -> bool:
+    """
+    Moves a STARTING worker to the next provisioning phase.
+    Returns False if the worker was deleted or left STARTING meanwhile.
+    """
+    row = db.execute(
+        update(WorkerModel)
+        .where(WorkerModel.id == worker_id, WorkerModel.status == WorkerStatus.STARTING)
+        .values(provisioning_phase=phase, **values)
+        .returning(WorkerModel.user_id)
+    ).first()
+    db.commit()
+
+    if row:
+        mark_worker_changed(row.user_id, worker_id)
+        logger.info(f"Worker {worker_id}: {phase.value}")
+    return row is not None
+
+
+@celery_app.task(
+    bind=True,
+    name="provision_worker",
+    soft_time_limit=settings.PROVISION_TIMEOUT_SECONDS,
+    time_limit=settings.PROVISION_TIMEOUT_SECONDS + 30,
+)
+def provision_worker(self, worker_id: int, vnc_password: str | None, gemini_api_key: str):
+    """
+    Brings a STARTING worker up: container -> packages -> agent -> readiness probe.
+    The worker becomes IDLE only after the probe passes; any failure leaves it in
+    ERROR with the phase it failed in and the reason.
+    """
+    db = SessionLocal()
+    container_id = None
+    phase = ProvisioningPhase.CREATING_CONTAINER
+    try:
+        worker = db.query(WorkerModel).filter(WorkerModel.id == worker_id).first()
+        if not worker:
+            return {"status": "skipped", "reason": "worker deleted"}
+        profile = worker_profile(worker.resource_class)
+        container_name = f"{WORKER_CONTAINER_PREFIX}{worker.id}_{worker.user_id}"
+
+        if not _advance(db, worker_id, phase):
+            return {"status": "skipped", "reason": "worker is no longer starting"}
+
+        host_port = None
+        if profile.desktop:
+            container_id, host_port = get_docker_service().create_kasm_worker(
+                worker_name=container_name,
+                vnc_password=vnc_password,
+                image=profile.image,
+                shm_size=profile.shm_size,
+                cpus=profile.idle.cpus,
+                memory_mb=profile.idle.memory_mb,
+            )
+        else:
+            container_id = get_docker_service().create_cli_worker(
+                worker_name=container_name,
+                image=profile.image,
+                shm_size=profile.shm_size,
+                cpus=profile.idle.cpus,
+                memory_mb=profile.idle.memory_mb,
+            )
+
+        # Stored right away, so the reconciler never sees the container as an orphan
+        if not _advance(db, worker_id, phase, container_id=container_id, vnc_port=host_port):
+            get_docker_service().remove_container(container_id)
+            return {"status": "skipped", "reason": "worker is no longer starting"}
+
+        steps = []
+        if profile.desktop:
+            steps.append((ProvisioningPhase.INSTALLING_PACKAGES, _install_desktop_apps, (container_id,)))
+        steps.append((ProvisioningPhase.STARTING_AGENT, _start_agent, (container_id, gemini_api_key)))
+        steps.append((ProvisioningPhase.PROBING, _probe_ready, (container_id, profile.desktop)))
+
+        for phase, step, args in steps:
+            if not _advance(db, worker_id, phase):
+                get_docker_service().remove_container(container_id)
+                return {"status": "skipped", "reason": "worker is no longer starting"}
+            step(*args)
+
+        _advance(db, worker_id, ProvisioningPhase.READY, status=WorkerStatus.IDLE)
+        return {"status": "ready", "container_id": container_id}
+
+    except Exception as e:
+        if isinstance(e, SoftTimeLimitExceeded):
+            e = RuntimeError("Provisioning exceeded the time limit.")
+        logger.error(f"Provisioning of worker {worker_id} failed in {phase.value}: {e}")
+        db.rollback()
+        _advance(
+            db,
+            worker_id,
+            ProvisioningPhase.FAILED,
+            status=WorkerStatus.ERROR,
+            provisioning_error=f"{phase.value}: {e}"[:2000],
+        )
+        return {"status": "error", "phase": phase.value, "error": str(e)}
+    finally:
+        db.close()
 
 
 @celery_app.task(bind=True, name="execute_worker_task", soft_time_limit=300, time_limit=310)
-def execute_worker_task(self, task_id: int, worker_id: int, container_id: str, prompt: str, gemini_api_key: str):
+def execute_worker_task(
+    self,
+    task_id: int,
+    worker_id: int,
+    container_id: str,
+    prompt: str,
+    gemini_api_key: str,
+    record_timeline: bool = False,
+    created_at: str | None = None,
+):
+    if not _claim_task(task_id, created_at):
+        logger.warning(f"Task {task_id} is no longer QUEUED, execution skipped")
+        # The worker was blocked for this task; free it unless another task holds it
+        db = SessionLocal()
+        try:
+            user_id = _release_worker(db, worker_id)
+            db.commit()
+        finally:
+            db.close()
+        if user_id is not None:
+            mark_worker_changed(user_id, worker_id)
+        return {"status": "skipped", "reason": "Task is no longer queued"}
+
     logger.info(f"▶️ Executing task {task_id} via Base64 Injection")
     status_check = get_docker_service().execute_command(container_id, "whoami", user="kasm-user", check=False)
     logger.info(f"🔍 Container user check: {status_check}")
@@ -194,10 +408,22 @@ except Exception as e:
     run_cmd = f"python3 -c \"import base64; exec(base64.b64decode('{encoded_script}').decode('utf-8'))\""
 
     db = SessionLocal()
+    recorder = None
+    boosted = False
+    outcome = {}
     try:
-        task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
         worker = db.query(WorkerModel).filter(WorkerModel.id == worker_id).first()
 
+        mark_task_changed(task_id)
+        if worker:
+            mark_worker_changed(worker.user_id, worker_id)
+
+        resource_class = worker.resource_class if worker else ResourceClass.DESKTOP
+        boosted = boost_worker(worker_id, container_id, resource_class)
+
+        if record_timeline:
+            recorder = TimelineRecorder(task_id, worker_id, container_id).start()
+
         logger.info(f"🛠 Running command: {run_cmd[:100]}...")
         output = get_docker_service().execute_command(container_id, run_cmd, user="kasm-user")
 
@@ -208,10 +434,8 @@ except Exception as e:
             error_msg = output.split("===INTERNAL_ERROR===")[-1].strip()
             raise Exception(f"Agent crashed internally: {error_msg}")
 
-        if task:
-            task.status = TaskStatus.COMPLETED
-            task.logs = final_result
-            task.result = output  # Store full raw output for debugging
+        # Full raw output is stored for debugging
+        outcome = {"status": TaskStatus.COMPLETED, "logs": final_result, "result": output}
 
         logger.info(f"Task {task_id} completed successfully")
         result_payload = {"status": "success", "output": final_result}
@@ -219,28 +443,42 @@ except Exception as e:
     except SoftTimeLimitExceeded:
         logger.warning(f"Task {task_id} exceeded time limit!")
 
-        if task:
-            task.status = TaskStatus.FAILED
-            task.result = "Error: Task execution exceeded the time limit."
+        outcome = {
+            "status": TaskStatus.FAILED,
+            "result": "Error: Task execution exceeded the time limit.",
+        }
 
         result_payload = {"status": "error", "error": "Timeout"}
 
     except Exception as e:
         logger.error(f"Task {task_id} failed: {str(e)}")
 
-        if task:
-            task.status = TaskStatus.FAILED
-            task.result = str(e)
+        outcome = {"status": TaskStatus.FAILED, "result": str(e)}
 
         result_payload = {"status": "error", "error": str(e)}
 
     finally:
-        if task:
-            task.finished_at = datetime.now(timezone.utc)
+        if not outcome:
+            # Interrupted by a BaseException before reaching an outcome
+            outcome = {"status": TaskStatus.FAILED, "result": "Error: Task execution was interrupted."}
+        finished = _finish_task(db, task_id, outcome, created_at)
+        if not finished:
+            logger.warning(f"Task {task_id} was already finished (reconciler), result dropped")
         if worker:
-            worker.status = WorkerStatus.IDLE
+            _release_worker(db, worker_id)
+            user_id = worker.user_id
 
         db.commit()
         db.close()
+        mark_task_changed(task_id)
+        if worker:
+            mark_worker_changed(user_id, worker_id)
+        if boosted:
+            release_worker(worker_id, container_id, resource_class)
+
+        # Task result is already committed, so the final frame upload
+        # does not hold back the task status seen by the API.
+        if recorder:
+            recorder.stop(timeout=5)
 
     return result_payload
\ No newline at end of file
@@ -11,6 +11,10 @@ celery_app = Celery(
         "app.celery_tasks.worker_tasks",
         "app.celery_tasks.cleanup_screenshots",
         "app.celery_tasks.tasks_cleanup",
+        "app.celery_tasks.partitions",
+        "app.celery_tasks.reconcile",
+        "app.celery_tasks.telemetry",
+        "app.celery_tasks.tokens_cleanup",
     ],
 )
 
@@ -23,12 +27,34 @@ celery_app.conf.update(
 )
 
 celery_app.conf.beat_schedule = {
-    "cleanup-old-screenshots-every-night": {
+    "maintain-partitions-every-hour": {
+        "task": "maintain_partitions",
+        "schedule": crontab(minute=5),
+    },
+    "cleanup-old-screenshots-every-minute": {
         "task": "cleanup_old_screenshots",
-        "schedule": crontab(hour=3, minute=0),
+        "schedule": 60.0,
     },
-    "cleanup-old-tasks-every-night": {
+    "cleanup-old-tasks-every-5-minutes": {
         "task": "cleanup_old_tasks",
-        "schedule": crontab(hour=3, minute=30),
+        "schedule": crontab(minute="*/5"),
+    },
+    "reconcile-workers": {
+        "task": "reconcile_workers",
+        "schedule": float(settings.RECONCILE_INTERVAL_SECONDS),
+    },
+    "collect-worker-usage": {
+        "task": "collect_worker_usage",
+        "schedule": float(settings.TELEMETRY_SAMPLE_SECONDS),
+        # A sample that waited behind long agent tasks is useless, skip it
+        "options": {"expires": settings.TELEMETRY_SAMPLE_SECONDS},
+    },
+    "purge-usage-history-every-hour": {
+        "task": "purge_usage_history",
+        "schedule": crontab(minute=20),
+    },
+    "purge-expired-refresh-tokens-every-hour": {
+        "task": "purge_expired_refresh_tokens",
+        "schedule": crontab(minute=35),
     },
 }
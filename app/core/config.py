@@ -16,11 +16,17 @@ class Settings(BaseSettings):
     REDIS_URL: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 
     DATABASE_URL_ASYNC: str | None = None
+    # Logs every SQL statement of the API engine; for local debugging only
+    SQL_ECHO: bool = False
 
     AWS_ACCESS_KEY_ID: str = "testing"
     AWS_SECRET_ACCESS_KEY: str = "testing"
     AWS_REGION: str = "eu-central-1"
     S3_BUCKET_NAME: str = "test-bucket"
+    S3_PRESIGN_EXPIRE_SECONDS: int = 36000
+    # Cached presigned URLs are re-signed this long before they expire
+    S3_PRESIGN_REFRESH_MARGIN_SECONDS: int = 1800
+    S3_PRESIGN_CACHE_SIZE: int = 10000
 
     SECRET_KEY_ACCESS: str = Field(default="super-secret-key", env="SECRET_KEY_ACCESS")
     SECRET_KEY_REFRESH: str | None = Field(
@@ -28,11 +34,129 @@ class Settings(BaseSettings):
     )
 
     JWT_SIGNING_ALGORITHM: str = "HS256"
+    # Raising it upgrades stored hashes on the next successful login
+    BCRYPT_ROUNDS: int = 12
+    # Processes for bcrypt and other CPU-bound work of each API process
+    CPU_POOL_WORKERS: int = 2
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Active sessions per user; a new login evicts the oldest beyond it
+    REFRESH_TOKENS_PER_USER: int = 10
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 5000
+    REFRESH_TOKEN_PURGE_MAX_BATCHES: int = 50
+    # Authenticated user cache: Redis entry TTL, and how long each API process
+    # reuses its own copy (an upper bound on revocation lag across processes)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300
+    PRINCIPAL_LOCAL_TTL_SECONDS: int = 10
+    PRINCIPAL_LOCAL_CACHE_SIZE: int = 10000
 
     GEMINI_API_KEY: str = None
 
+    # Avatar uploads: body size, enforced while the upload streams in, and decoded pixels
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_MAX_PIXELS: int = 40_000_000
+
+    # Keyset pagination for list endpoints
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+    # Latest tasks embedded in GET /workers/{id}; the full history is paginated
+    WORKER_DETAIL_TASKS_LIMIT: int = 20
+
+    # Safety-net TTL of cached GET /workers pages; changes invalidate them right away
+    WORKER_LIST_CACHE_TTL_SECONDS: int = 300
+    # Version counters behind ETags; a counter idle this long restarts at a new random value
+    ETAG_VERSION_TTL_SECONDS: int = 86400
+    # Docker events listener: reconnect delay after the event stream drops
+    EVENTS_RECONNECT_SECONDS: float = 2.0
+
+    # Screenshots younger than this are served without a new capture
+    SCREENSHOT_MAX_AGE_SECONDS: int = 30
+    # Redis lease held by the single in-flight capture per worker
+    SCREENSHOT_CAPTURE_LEASE_SECONDS: int = 20
+    SCREENSHOT_WAIT_POLL_SECONDS: float = 0.25
+    # Max dHash bit distance (out of 64) at which two screenshots count as unchanged
+    SCREENSHOT_DEDUP_THRESHOLD: int = 5
+
+    # tasks/task_images are partitioned by day; expired partitions are dropped whole.
+    # Row-level retention jobs only catch rows this many days past retention
+    # (default partition, failed drops), so they don't churn partitions about to go.
+    PARTITION_PREMAKE_DAYS: int = 7
+    RETENTION_FALLBACK_GRACE_DAYS: int = 2
+    # How long each API process reuses the id floors that bound by-id task lookups
+    PARTITION_ID_FLOORS_TTL_SECONDS: int = 300
+
+    # Screenshot retention runs in small slices every minute
+    SCREENSHOT_RETENTION_DAYS: int = 7
+    SCREENSHOT_RETENTION_BATCH_SIZE: int = 1000
+    SCREENSHOT_RETENTION_MAX_BATCHES: int = 10
+    S3_DELETE_CONCURRENCY: int = 4
+
+    # Task history purge: short PK-ordered batches, each in its own transaction
+    TASK_RETENTION_DAYS: int = 10
+    TASK_PURGE_BATCH_SIZE: int = 500
+    TASK_PURGE_MAX_BATCHES: int = 20
+    TASK_PURGE_LOCK_TIMEOUT_MS: int = 2000
+    TASK_PURGE_STATEMENT_TIMEOUT_MS: int = 10000
+
+    # Reconciler: brings workers/tasks in line with Docker and Celery
+    RECONCILE_INTERVAL_SECONDS: int = 120
+    # Open tasks older than this with no live Celery execution are failed
+    RECONCILE_TASK_GRACE_SECONDS: int = 900
+    # Must stay above PROVISION_TIMEOUT_SECONDS plus the time a job may wait in the queue
+    RECONCILE_STARTING_GRACE_SECONDS: int = 900
+    # Unreferenced containers younger than this may still be mid-creation
+    RECONCILE_ORPHAN_GRACE_SECONDS: int = 600
+    RECONCILE_INSPECT_TIMEOUT_SECONDS: float = 2.0
+    RECONCILE_PRUNE_IMAGES: bool = True
+
+    DESKTOP_WORKER_IMAGE: str = "custom-kasm-worker:latest"
+    CLI_WORKER_IMAGE: str = "custom-cli-worker:latest"
+    # A worker still provisioning after this long goes to ERROR
+    PROVISION_TIMEOUT_SECONDS: int = 600
+
+    # Bulk worker operations: ids per request, Docker calls in flight per request
+    BULK_MAX_ITEMS: int = 50
+    BULK_DOCKER_CONCURRENCY: int = 8
+
+    # Per-user token buckets of expensive routes: sustained requests per minute, burst size
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_SCREENSHOT_PER_MINUTE: int = 12
+    RATE_LIMIT_SCREENSHOT_BURST: int = 4
+    RATE_LIMIT_WORKERS_PER_MINUTE: int = 10
+    RATE_LIMIT_WORKERS_BURST: int = 5
+    RATE_LIMIT_TASKS_PER_MINUTE: int = 30
+    RATE_LIMIT_TASKS_BURST: int = 10
+    # Docker calls in flight across all API processes. A caller waits this long for
+    # a slot, then gets 429; a slot held by a process that died frees after the lease.
+    DOCKER_MAX_CONCURRENT_OPS: int = 16
+    DOCKER_SLOT_WAIT_SECONDS: float = 5.0
+    DOCKER_SLOT_POLL_SECONDS: float = 0.1
+    DOCKER_SLOT_LEASE_SECONDS: int = 120
+
+    # Worker containers run at idle limits and are boosted while a task executes.
+    # WORKER_* are the `desktop` class limits; `desktop-large` doubles them.
+    # HEADLESS_* are the `headless-cli` class limits.
+    # HOST_BOOST_* caps the extra (boost - idle) resources held by all boosts together.
+    WORKER_IDLE_CPUS: float = 0.5
+    WORKER_IDLE_MEMORY_MB: int = 1024
+    WORKER_BOOST_CPUS: float = 2.0
+    WORKER_BOOST_MEMORY_MB: int = 3072
+    HEADLESS_IDLE_CPUS: float = 0.1
+    HEADLESS_IDLE_MEMORY_MB: int = 256
+    HEADLESS_BOOST_CPUS: float = 1.0
+    HEADLESS_BOOST_MEMORY_MB: int = 1024
+    HOST_BOOST_CPUS: float = 6.0
+    HOST_BOOST_MEMORY_MB: int = 12288
+
+    # Container resource telemetry
+    TELEMETRY_SAMPLE_SECONDS: int = 15
+    TELEMETRY_STATS_CONCURRENCY: int = 16
+    TELEMETRY_RETENTION_DAYS: int = 14
+
+    # Screenshot timeline recorded while a task runs
+    TIMELINE_INTERVAL_SECONDS: int = 10
+    TIMELINE_MAX_FRAMES: int = 60
+
     @property
     def database_url_async(self) -> str:
         if self.DATABASE_URL_ASYNC:
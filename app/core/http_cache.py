@@ -0,0 +1,35 @@
+"""
+Conditional GET helpers: If-None-Match against an ETag, 304 responses and
+the Cache-Control values used by the API.
+"""
+from fastapi import Request, Response
+from starlette import status
+
+# Polled resources: the client keeps the body but revalidates on every use
+REVALIDATE = "private, no-cache"
+# Finished tasks never change again
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _opaque(etag: str) -> str:
+    """ETag without its weak prefix; If-None-Match uses weak comparison."""
+    return etag.strip().removeprefix("W/")
+
+
+def etag_matches(request: Request, etag: str | None) -> bool:
+    header = request.headers.get("if-none-match")
+    if not etag or not header:
+        return False
+    return _opaque(etag) in {_opaque(candidate) for candidate in header.split(",")}
+
+
+def set_cache_headers(response: Response, etag: str | None, cache_control: str = REVALIDATE) -> None:
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, cache_control)
+    return response
@@ -0,0 +1,64 @@
+"""
+Minimal Redis-backed metrics shared by all API replicas and Celery workers.
+
+Counters and gauges live in two Redis hashes, so any process can update them and
+GET /metrics renders the totals in Prometheus text format. Labels are encoded in
+the metric name, e.g. incr('requests_shed_total{route="screenshot"}').
+Metric writes never raise: losing a sample is better than failing a request.
+"""
+import logging
+
+from app.core.redis import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = "metrics:counters"
+GAUGES_KEY = "metrics:gauges"
+
+
+def incr(name: str, amount: int = 1) -> None:
+    try:
+        get_redis().hincrby(COUNTERS_KEY, name, amount)
+    except Exception as e:
+        logger.warning(f"Metric {name} not recorded: {e}")
+
+
+async def aincr(name: str, amount: int = 1) -> None:
+    try:
+        await get_async_redis().hincrby(COUNTERS_KEY, name, amount)
+    except Exception as e:
+        logger.warning(f"Metric {name} not recorded: {e}")
+
+
+def set_gauge(name: str, value: float) -> None:
+    try:
+        get_redis().hset(GAUGES_KEY, name, value)
+    except Exception as e:
+        logger.warning(f"Metric {name} not recorded: {e}")
+
+
+async def aset_gauge(name: str, value: float) -> None:
+    try:
+        await get_async_redis().hset(GAUGES_KEY, name, value)
+    except Exception as e:
+        logger.warning(f"Metric {name} not recorded: {e}")
+
+
+def _render(metrics: dict[str, str], metric_type: str) -> list[str]:
+    lines = []
+    declared = set()
+    for name in sorted(metrics):
+        base_name = name.split("{", 1)[0]
+        if base_name not in declared:
+            lines.append(f"# TYPE {base_name} {metric_type}")
+            declared.add(base_name)
+        lines.append(f"{name} {metrics[name]}")
+    return lines
+
+
+async def render_prometheus() -> str:
+    client = get_async_redis()
+    counters = await client.hgetall(COUNTERS_KEY)
+    gauges = await client.hgetall(GAUGES_KEY)
+    lines = _render(counters, "counter") + _render(gauges, "gauge")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination on (created_at, id), newest first.
+
+The cursor is an opaque url-safe token of the last row on the page. The next page
+is fetched with WHERE (created_at, id) < (cursor) which, unlike OFFSET, costs the
+same on page 1000 as on page 1 when backed by an index ending in (created_at, id).
+"""
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Sequence, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.exceptions.pagination import InvalidCursorError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+T = TypeVar("T")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursorError("Invalid pagination cursor.")
+
+
+def to_naive_utc(value: datetime | None) -> datetime | None:
+    """For filters on `timestamp without time zone` columns (stored as UTC)."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def paginate_newest_first(
+    query: Select,
+    created_col: InstrumentedAttribute,
+    id_col: InstrumentedAttribute,
+    cursor: str | None,
+    limit: int,
+) -> Select:
+    """Applies the cursor, ordering and limit. Fetches one extra row to detect a next page."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_page(rows: Sequence[T], limit: int) -> tuple[list[T], str | None]:
+    """Returns (page_rows, next_cursor); next_cursor is None on the last page."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
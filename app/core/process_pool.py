@@ -0,0 +1,43 @@
+"""
+Process pool for CPU-bound work that must not run on the API event loop:
+bcrypt hashing and avatar processing.
+
+bcrypt 4.x releases the GIL, so threads would hash just as well. What matters is
+the bound: at most CPU_POOL_WORKERS jobs run at once. run_in_threadpool would
+put every hash of a login burst on the CPU at the same time (up to 40 threads)
+and starve the event loop thread. The pool also keeps Pillow, which holds the
+GIL for parts of a decode, out of the API process.
+
+tests/bench_password_hashing.py measures it: 16 concurrent verifies at
+BCRYPT_ROUNDS=12, 1 CPU, CPU_POOL_WORKERS=2, Python 3.13. Total time is
+about the same (6.3-6.8s both ways); the event loop is late on a 5ms timer by
+p99 15-17ms / max 235-285ms with run_in_threadpool, p99 4.5ms / max 6ms here.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.CPU_POOL_WORKERS)
+    return _process_pool
+
+
+async def run_in_process(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Runs a picklable module-level function in the pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
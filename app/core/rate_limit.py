@@ -0,0 +1,157 @@
+"""
+Admission control of expensive operations, shared by all API replicas through Redis.
+
+Per-user token buckets, one per route class (screenshot capture, worker lifecycle,
+task submission), refill at RATE_LIMIT_<CLASS>_PER_MINUTE up to a burst; an empty
+bucket answers 429 with Retry-After. On top of that, every Docker call made by the
+API takes a slot of a global semaphore (DOCKER_MAX_CONCURRENT_OPS): callers queue
+for up to DOCKER_SLOT_WAIT_SECONDS, then are shed with 429 as well.
+Both run as Lua scripts on Redis time, so replicas with skewed clocks agree.
+Shed requests are counted in requests_shed_total{route, reason}.
+
+Redis errors never reject a request: without Redis the limits are simply off.
+"""
+import asyncio
+import logging
+import math
+import secrets
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.core.metrics import aincr
+from app.core.redis import get_async_redis
+from app.exceptions.rate_limit import RateLimitExceeded, DockerBusyError
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT = "screenshot"
+WORKERS = "workers"
+TASKS = "tasks"
+
+BUCKET_KEY = "ratelimit:{route}:{user_id}"
+# Sorted set of slot tokens scored by lease expiry
+DOCKER_SLOTS_KEY = "ratelimit:docker_slots"
+
+# Returns {allowed, seconds until a token is available}
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, retry_after}
+"""
+
+ACQUIRE_SLOT_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def _bucket(route: str) -> tuple[int, int]:
+    """(requests per minute, burst) of a route class."""
+    if route == SCREENSHOT:
+        return settings.RATE_LIMIT_SCREENSHOT_PER_MINUTE, settings.RATE_LIMIT_SCREENSHOT_BURST
+    if route == WORKERS:
+        return settings.RATE_LIMIT_WORKERS_PER_MINUTE, settings.RATE_LIMIT_WORKERS_BURST
+    if route == TASKS:
+        return settings.RATE_LIMIT_TASKS_PER_MINUTE, settings.RATE_LIMIT_TASKS_BURST
+    raise ValueError(f"Unknown rate limit route class: {route}")
+
+
+async def _shed(route: str, reason: str) -> None:
+    await aincr(f'requests_shed_total{{route="{route}",reason="{reason}"}}')
+
+
+async def acheck_rate_limit(user_id: int, route: str) -> None:
+    """Takes a token of the user's bucket for the route class; raises RateLimitExceeded if empty."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    per_minute, burst = _bucket(route)
+    try:
+        allowed, retry_after = await get_async_redis().eval(
+            TOKEN_BUCKET_SCRIPT,
+            1,
+            BUCKET_KEY.format(route=route, user_id=user_id),
+            per_minute / 60,
+            burst,
+        )
+    except Exception as e:
+        logger.warning(f"Rate limit of {route} not checked: {e}")
+        return
+
+    if not allowed:
+        await _shed(route, "rate_limit")
+        raise RateLimitExceeded(
+            "Too many requests, slow down.", retry_after=max(int(retry_after), 1)
+        )
+
+
+async def _try_acquire_slot(token: str) -> bool:
+    try:
+        acquired = await get_async_redis().eval(
+            ACQUIRE_SLOT_SCRIPT,
+            1,
+            DOCKER_SLOTS_KEY,
+            settings.DOCKER_MAX_CONCURRENT_OPS,
+            settings.DOCKER_SLOT_LEASE_SECONDS,
+            token,
+        )
+    except Exception as e:
+        logger.warning(f"Docker slot not acquired, running unbounded: {e}")
+        return True
+    return bool(acquired)
+
+
+async def _release_slot(token: str) -> None:
+    try:
+        await get_async_redis().zrem(DOCKER_SLOTS_KEY, token)
+    except Exception as e:
+        # The lease expires on its own
+        logger.warning(f"Docker slot not released: {e}")
+
+
+@asynccontextmanager
+async def docker_slot(route: str):
+    """
+    Holds one of the global Docker operation slots for the duration of the block.
+    Waits up to DOCKER_SLOT_WAIT_SECONDS for one, then raises DockerBusyError.
+    """
+    token = secrets.token_hex(8)
+    deadline = time.monotonic() + settings.DOCKER_SLOT_WAIT_SECONDS
+
+    while not await _try_acquire_slot(token):
+        if time.monotonic() >= deadline:
+            await _shed(route, "docker_busy")
+            raise DockerBusyError(
+                "Too many Docker operations in progress, retry later.",
+                retry_after=math.ceil(settings.DOCKER_SLOT_WAIT_SECONDS),
+            )
+        await asyncio.sleep(settings.DOCKER_SLOT_POLL_SECONDS)
+
+    try:
+        yield
+    finally:
+        await _release_slot(token)
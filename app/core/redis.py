@@ -0,0 +1,27 @@
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+_redis_client: Optional[redis.Redis] = None
+_async_redis_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Sync client for Celery tasks and other blocking code."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Async client for the API event loop."""
+    global _async_redis_client
+    if _async_redis_client is None:
+        _async_redis_client = aioredis.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True
+        )
+    return _async_redis_client
@@ -1,6 +1,12 @@
-import aioboto3
+import asyncio
+import time
+from typing import Iterable, Sequence
+
 from fastapi import HTTPException, status
+
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.redis import get_async_redis
 
 """
 GUIDE FOR INTEGRATING S3 CLIENT FOR USER AVATARS
@@ -27,20 +33,33 @@ GUIDE FOR INTEGRATING S3 CLIENT FOR USER AVATARS
    if current_user.profile.avatar:
        await s3_client.delete_file(current_user.profile.avatar)
 
-Note: The database stores ONLY the relative path. 
-Front-end should prepend the MinIO endpoint (e.g., http://localhost:9000/avatars/...) to display the image.
+Note: The database stores ONLY the relative path (object key).
+Responses turn keys into URLs with s3_service.get_presigned_url(s), which caches
+signed URLs in-process and in Redis and re-signs them only shortly before expiry.
 """
 
+PRESIGN_CACHE_PREFIX = "presign:"
+
 
 class S3Service:
     def __init__(self):
-        self.session = aioboto3.Session()
+        self._session = None
         self.config = {
             "aws_access_key_id": settings.AWS_ACCESS_KEY_ID,
             "aws_secret_access_key": settings.AWS_SECRET_ACCESS_KEY,
             "region_name": settings.AWS_REGION,
         }
         self.default_bucket = settings.S3_BUCKET_NAME
+        self._presign_cache = TTLCache(maxsize=settings.S3_PRESIGN_CACHE_SIZE)
+
+    @property
+    def session(self):
+        """aioboto3 (botocore, aiohttp) is imported on first use: it dominated API import time."""
+        if self._session is None:
+            import aioboto3
+
+            self._session = aioboto3.Session()
+        return self._session
 
     async def upload_bytes(
         self, file_data: bytes, object_name: str, content_type: str = "image/png"
@@ -59,13 +78,61 @@ class S3Service:
             print(f"S3 Upload Error: {e}")
             return ""
 
+    async def download_bytes(self, object_name: str) -> bytes:
+        try:
+            async with self.session.client("s3", **self.config) as client:
+                response = await client.get_object(
+                    Bucket=self.default_bucket, Key=object_name
+                )
+                async with response["Body"] as stream:
+                    return await stream.read()
+        except Exception as e:
+            print(f"S3 Download Error: {e}")
+            return b""
+
     async def delete_file(self, object_name: str):
         try:
             async with self.session.client("s3", **self.config) as client:
                 await client.delete_object(Bucket=self.default_bucket, Key=object_name)
+            self._presign_cache.pop(object_name)
         except Exception as e:
             print(f"S3 Delete Error: {e}")
 
+    async def delete_objects(
+        self, object_names: Sequence[str], concurrency: int = 4
+    ) -> list[str]:
+        """
+        Bulk delete through DeleteObjects, 1000 keys per call, at most
+        `concurrency` calls in flight. Returns the keys that failed to delete.
+        """
+        chunks = [object_names[i : i + 1000] for i in range(0, len(object_names), 1000)]
+        semaphore = asyncio.Semaphore(concurrency)
+        failed: list[str] = []
+
+        async def _delete_chunk(client, chunk: Sequence[str]) -> None:
+            async with semaphore:
+                try:
+                    response = await client.delete_objects(
+                        Bucket=self.default_bucket,
+                        Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+                    )
+                    failed.extend(error["Key"] for error in response.get("Errors", []))
+                except Exception as e:
+                    print(f"S3 Bulk Delete Error: {e}")
+                    failed.extend(chunk)
+
+        try:
+            async with self.session.client("s3", **self.config) as client:
+                await asyncio.gather(*(_delete_chunk(client, chunk) for chunk in chunks))
+        except Exception as e:
+            print(f"S3 Bulk Delete Error: {e}")
+            return list(object_names)
+
+        for name in object_names:
+            self._presign_cache.pop(name)
+
+        return failed
+
     async def generate_presigned_url(
         self, object_name: str, expiration: int = 36000
     ) -> str:
@@ -81,5 +148,85 @@ class S3Service:
             print(f"S3 Presign Error: {e}")
             return ""
 
+    async def get_presigned_url(self, object_name: str) -> str:
+        """Cached presigned URL for a single object key."""
+        urls = await self.get_presigned_urls([object_name])
+        return urls.get(object_name, "")
+
+    async def get_presigned_urls(self, object_names: Iterable[str]) -> dict[str, str]:
+        """
+        Batch presign for list endpoints: {object_key: url}.
+        Looks in the in-process cache, then Redis (one MGET), and signs whatever is
+        left with a single client. A URL is re-signed only when it is within
+        S3_PRESIGN_REFRESH_MARGIN_SECONDS of expiring.
+        """
+        urls: dict[str, str] = {}
+        missing = []
+        for name in dict.fromkeys(object_names):
+            cached_url = self._presign_cache.get(name)
+            if cached_url:
+                urls[name] = cached_url
+            else:
+                missing.append(name)
+
+        if not missing:
+            return urls
+
+        now = time.time()
+        margin = settings.S3_PRESIGN_REFRESH_MARGIN_SECONDS
+
+        try:
+            cached_values = await get_async_redis().mget(
+                [PRESIGN_CACHE_PREFIX + name for name in missing]
+            )
+        except Exception as e:
+            print(f"Presign cache read error: {e}")
+            cached_values = [None] * len(missing)
+
+        to_sign = []
+        for name, value in zip(missing, cached_values):
+            if value:
+                expires_at, url = value.split("|", 1)
+                ttl = float(expires_at) - margin - now
+                if ttl > 0:
+                    urls[name] = url
+                    self._presign_cache.set(name, url, ttl)
+                    continue
+            to_sign.append(name)
+
+        if not to_sign:
+            return urls
+
+        expiration = settings.S3_PRESIGN_EXPIRE_SECONDS
+        expires_at = int(now) + expiration
+        ttl = expiration - margin
+
+        signed = {}
+        try:
+            async with self.session.client("s3", **self.config) as client:
+                for name in to_sign:
+                    signed[name] = await client.generate_presigned_url(
+                        "get_object",
+                        Params={"Bucket": self.default_bucket, "Key": name},
+                        ExpiresIn=expiration,
+                    )
+        except Exception as e:
+            print(f"S3 Presign Error: {e}")
+
+        for name, url in signed.items():
+            self._presign_cache.set(name, url, ttl)
+
+        if signed:
+            try:
+                pipe = get_async_redis().pipeline(transaction=False)
+                for name, url in signed.items():
+                    pipe.set(PRESIGN_CACHE_PREFIX + name, f"{expires_at}|{url}", ex=ttl)
+                await pipe.execute()
+            except Exception as e:
+                print(f"Presign cache write error: {e}")
+
+        urls.update(signed)
+        return urls
+
 
 s3_service = S3Service()
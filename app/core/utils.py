@@ -1,87 +1,155 @@
-import asyncio
+import hashlib
 import io
+import os
+import shutil
+import subprocess
+import tempfile
 import time
 import tarfile
+import uuid
 from io import BytesIO
-from PIL import Image
-from fastapi import UploadFile, HTTPException, status
 
 from app.core.config import settings
-from app.core.s3 import s3_service
+from app.exceptions.worker import ReplayEncodingError
 from app.worker.docker_service import get_docker_service
 
 
-def process_avatar(file: UploadFile) -> bytes:
+# Redis lease of the single in-flight capture of a worker's desktop, shared by
+# the API (get_or_capture_screenshot) and the task timeline recorder
+SCREENSHOT_CAPTURE_LOCK = "screenshot:capture:{worker_id}"
+
+
+def grab_desktop_png(container_id: str) -> bytes:
     """
-    1. Validates the format.
-    2. Cuts to a square.
-    3. Resize to 256x256.
-    4. Converts to WebP (light format).
+    Takes a scrot screenshot inside the container and returns the PNG bytes.
+    Every capture writes its own file, so concurrent captures never clobber each other.
     """
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only JPEG, PNG, or WebP images are allowed",
-        )
+    file_name = f"screen-{uuid.uuid4().hex}.png"
+    tmp_path = f"/tmp/{file_name}"
+
+    get_docker_service().execute_command(
+        container_id, f"scrot {tmp_path}", user="kasm-user"
+    )
 
     try:
-        image = Image.open(file.file)
-        if image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        width, height = image.size
-        new_size = min(width, height)
-        left = (width - new_size) / 2
-        top = (height - new_size) / 2
-        right = (width + new_size) / 2
-        bottom = (height + new_size) / 2
-        image = image.crop((left, top, right, bottom))
-
-        image = image.resize((256, 256), Image.Resampling.LANCZOS)
+        container = get_docker_service().client.containers.get(container_id)
+        bits, stat = container.get_archive(tmp_path)
+
+        file_obj = io.BytesIO(b"".join(b for b in bits))
+        tar = tarfile.open(fileobj=file_obj)
+        member = tar.getmember(file_name)
+        return tar.extractfile(member).read()
+    finally:
+        get_docker_service().execute_command(
+            container_id, f"rm -f {tmp_path}", user="kasm-user", check=False
+        )
 
-        buffer = BytesIO()
-        image.save(buffer, format="WEBP", quality=85, optimize=True)
-        buffer.seek(0)
 
-        return buffer.getvalue()
+def fingerprint_screenshot(png_bytes: bytes) -> tuple[str, str]:
+    """
+    Returns (perceptual_hash, content_hash) for a screenshot.
 
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file"
-        )
+    perceptual_hash is a 64-bit difference hash (dHash) as 16 hex chars: the image
+    is shrunk to 9x8 grayscale and every bit says whether a pixel is brighter than
+    its right neighbour, so a blinking cursor or clock barely moves it.
+    content_hash is the SHA-256 of the raw PNG bytes.
+    """
+    from PIL import Image
 
+    content_hash = hashlib.sha256(png_bytes).hexdigest()
 
-def capture_desktop_screenshot(container_id: str, worker_id: int) -> str:
-    tmp_path = "/tmp/screen.png"
+    image = Image.open(BytesIO(png_bytes)).convert("L")
+    pixels = image.resize((9, 8), Image.Resampling.BILINEAR).tobytes()
 
-    get_docker_service().execute_command(
-        container_id, f"scrot {tmp_path}", user="kasm-user"
-    )
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
 
-    container = get_docker_service().client.containers.get(container_id)
-    bits, stat = container.get_archive(tmp_path)
+    return f"{bits:016x}", content_hash
 
-    file_obj = io.BytesIO(b"".join(b for b in bits))
-    tar = tarfile.open(fileobj=file_obj)
-    member = tar.getmember("screen.png")
-    png_bytes = tar.extractfile(member).read()
 
-    object_key = f"results/worker_{worker_id}/{int(time.time())}.png"
+def is_same_screen(
+    perceptual_hash: str,
+    content_hash: str,
+    other_perceptual_hash: str | None,
+    other_content_hash: str | None,
+) -> bool:
+    """True if two fingerprints are identical or within the dHash distance threshold."""
+    if other_content_hash and content_hash == other_content_hash:
+        return True
+    if not other_perceptual_hash:
+        return False
 
-    asyncio.run(
-        s3_service.upload_bytes(
-            png_bytes,
-            object_key,
-        )
-    )
+    distance = (int(perceptual_hash, 16) ^ int(other_perceptual_hash, 16)).bit_count()
+    return distance <= settings.SCREENSHOT_DEDUP_THRESHOLD
 
-    url = asyncio.run(
-        s3_service.generate_presigned_url(
-            object_key,
-        )
-    )
 
-    get_docker_service().execute_command(
-        container_id, f"rm {tmp_path}", user="kasm-user", check=False
-    )
+def screenshot_object_key(worker_id: int) -> str:
+    return f"results/worker_{worker_id}/{int(time.time() * 1000)}.png"
+
+
+def pack_timeline(frames: list[bytes], fmt: str, frame_duration_ms: int) -> bytes:
+    """
+    Packs timeline PNG frames into a single replay file.
+    fmt="webp" builds an animated WebP with Pillow, fmt="mp4" encodes H.264 with ffmpeg.
+    Frames are downscaled to at most 1280px wide to keep the replay small.
+    """
+    from PIL import Image
+
+    images = []
+    for frame in frames:
+        image = Image.open(BytesIO(frame)).convert("RGB")
+        image.thumbnail((1280, 1280), Image.Resampling.LANCZOS)
+        images.append(image)
+
+    if fmt == "webp":
+        buffer = BytesIO()
+        images[0].save(
+            buffer,
+            format="WEBP",
+            save_all=True,
+            append_images=images[1:],
+            duration=frame_duration_ms,
+            loop=0,
+            quality=70,
+        )
+        return buffer.getvalue()
 
-    return url
+    if fmt == "mp4":
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise ReplayEncodingError("ffmpeg is not installed on this server.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for index, image in enumerate(images):
+                image.save(os.path.join(tmp_dir, f"frame_{index:05d}.png"))
+
+            output_path = os.path.join(tmp_dir, "replay.mp4")
+            completed = subprocess.run(
+                [
+                    ffmpeg,
+                    "-y",
+                    "-loglevel", "error",
+                    "-framerate", f"{1000 / frame_duration_ms:.3f}",
+                    "-i", os.path.join(tmp_dir, "frame_%05d.png"),
+                    "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+                    "-c:v", "libx264",
+                    "-pix_fmt", "yuv420p",
+                    "-movflags", "+faststart",
+                    output_path,
+                ],
+                capture_output=True,
+                timeout=120,
+            )
+            if completed.returncode != 0:
+                raise ReplayEncodingError(
+                    f"ffmpeg failed: {completed.stderr.decode(errors='ignore')[:300]}"
+                )
+
+            with open(output_path, "rb") as f:
+                return f.read()
+
+    raise ReplayEncodingError(f"Unsupported replay format: {fmt}")
@@ -0,0 +1,204 @@
+"""
+Daily range partitions for the append-only history tables.
+
+`tasks` and `task_images` are declared PARTITION BY RANGE (created_at) with one
+partition per UTC day named <table>_pYYYYMMDD, plus a <table>_default catch-all.
+Retention drops whole partitions instead of deleting rows, so it costs the same
+for ten rows or ten million and leaves nothing behind for VACUUM.
+
+Lookups by id alone probe every partition. Ids come from one sequence as rows
+are inserted, so the lowest id of each day ("id floors") bounds the created_at
+of any id, which lets such lookups prune down to the few partitions around it.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import Select, text, update
+from sqlalchemy.orm import Session
+
+from app.models.worker import ImageModel
+
+# table -> whether created_at is `timestamp with time zone`
+PARTITIONED_TABLES = {
+    "tasks": True,
+    "task_images": False,
+}
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _bound(table: str, day: date) -> str:
+    suffix = "+00" if PARTITIONED_TABLES[table] else ""
+    return f"{day.isoformat()} 00:00:00{suffix}"
+
+
+def _day_start(table: str, day: date) -> datetime:
+    start = datetime.combine(day, time())
+    return start.replace(tzinfo=timezone.utc) if PARTITIONED_TABLES[table] else start
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def missing_days(db: Session, table: str, start: date, days: int) -> list[date]:
+    """Days in [start, start + days) without a daily partition."""
+    existing = {day for _, day in list_partitions(db, table)}
+    return [
+        start + timedelta(days=offset)
+        for offset in range(days)
+        if start + timedelta(days=offset) not in existing
+    ]
+
+
+def _has_default_rows(db: Session, table: str, day: date) -> bool:
+    default = default_partition_name(table)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar() is None:
+        return False
+    return db.execute(
+        text(
+            f'SELECT EXISTS (SELECT 1 FROM "{default}" '
+            f"WHERE created_at >= '{_bound(table, day)}' "
+            f"AND created_at < '{_bound(table, day + timedelta(days=1))}')"
+        )
+    ).scalar()
+
+
+def _column_list(db: Session, table: str) -> str:
+    names = db.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = :table ORDER BY ordinal_position"
+        ),
+        {"table": table},
+    ).scalars()
+    return ", ".join(f'"{name}"' for name in names)
+
+
+def create_partition(db: Session, table: str, day: date) -> None:
+    """
+    Creates the daily partition of `day`. Rows of that day can already sit in the
+    default partition (beat was down, rows copied by the migration), and then a
+    plain CREATE ... PARTITION OF fails: those rows are moved into a new table
+    which is attached once the default partition no longer holds any of them.
+    """
+    name = partition_name(table, day)
+    bounds = (
+        f"FOR VALUES FROM ('{_bound(table, day)}') "
+        f"TO ('{_bound(table, day + timedelta(days=1))}')"
+    )
+
+    if not _has_default_rows(db, table, day):
+        db.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" {bounds}'))
+        return
+
+    columns = _column_list(db, table)
+    db.execute(
+        text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    )
+    db.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{default_partition_name(table)}" '
+            f"WHERE created_at >= '{_bound(table, day)}' "
+            f"AND created_at < '{_bound(table, day + timedelta(days=1))}' "
+            f"RETURNING {columns}) "
+            f'INSERT INTO "{name}" ({columns}) SELECT {columns} FROM moved'
+        )
+    )
+    db.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" {bounds}'))
+
+
+def list_partitions(db: Session, table: str) -> list[tuple[str, date]]:
+    """Daily partitions of a table as (name, day), oldest first. The default partition is skipped."""
+    rows = db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ).scalars()
+
+    prefix = f"{table}_p"
+    partitions = []
+    for name in rows:
+        suffix = name[len(prefix):]
+        if not name.startswith(prefix) or len(suffix) != 8 or not suffix.isdigit():
+            continue
+        partitions.append((name, date(int(suffix[:4]), int(suffix[4:6]), int(suffix[6:]))))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def expired_partitions(db: Session, table: str, cutoff: date) -> list[str]:
+    """Partitions whose whole day range lies before `cutoff`."""
+    return [name for name, day in list_partitions(db, table) if day < cutoff]
+
+
+def drop_partition(db: Session, name: str) -> None:
+    db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+
+
+# How far an id's created_at may stray from its neighbours' (clock skew between
+# processes, slow flushes). Wider only costs probing a partition more.
+ID_RANGE_SLACK = timedelta(days=1)
+
+
+def id_floors(db: Session, table: str) -> list[tuple[date, int]]:
+    """(day, lowest id) of every daily partition holding rows, oldest first."""
+    partitions = list_partitions(db, table)
+    if not partitions:
+        return []
+
+    # One primary key probe per partition
+    query = " UNION ALL ".join(
+        f'SELECT {n} AS n, (SELECT min(id) FROM "{name}") AS floor'
+        for n, (name, _) in enumerate(partitions)
+    )
+    floors = dict(db.execute(text(query)).tuples().all())
+    return [
+        (day, floors[n]) for n, (_, day) in enumerate(partitions) if floors[n] is not None
+    ]
+
+
+def created_range(
+    table: str, floors: list[tuple[date, int]], row_id: int, now: datetime | None = None
+) -> tuple[datetime | None, datetime]:
+    """
+    [lower, upper) bounds of the created_at of row `row_id`, from id_floors.
+    The lower bound is None for ids older than every floor; the upper bound of
+    the newest ids is `now`. Rows whose created_at was set far from insert time
+    can fall outside: callers fall back to an unbounded lookup when the bounded
+    one finds nothing.
+    """
+    now = now or datetime.now(timezone.utc)
+    if not PARTITIONED_TABLES[table]:
+        now = now.astimezone(timezone.utc).replace(tzinfo=None)
+
+    lower, upper = None, now + ID_RANGE_SLACK
+    for day, floor in floors:
+        if floor > row_id:
+            # Inserted before the first row of `day`
+            upper = min(upper, _day_start(table, day + timedelta(days=1)) + ID_RANGE_SLACK)
+            break
+        # Inserted after the first row of `day`
+        lower = _day_start(table, day) - ID_RANGE_SLACK
+    return lower, upper
+
+
+def unlink_task_images(
+    task_ids: Sequence[int] | Select, created_after: datetime | None = None
+):
+    """
+    Clears task_id of the images of deleted tasks, which the task_images.task_id
+    foreign key (ON DELETE SET NULL) did before tasks was partitioned. The images
+    stay as worker screenshots and go with screenshot retention.
+    `created_after` (naive UTC) prunes partitions older than the tasks.
+    """
+    stmt = update(ImageModel).where(ImageModel.task_id.in_(task_ids))
+    if created_after is not None:
+        stmt = stmt.where(ImageModel.created_at >= created_after)
+    return stmt.values(task_id=None).execution_options(synchronize_session=False)
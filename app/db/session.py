@@ -6,7 +6,7 @@ from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.core.config import settings
 
-engine = create_async_engine(settings.database_url_async, echo=True)
+engine = create_async_engine(settings.database_url_async, echo=settings.SQL_ECHO)
 
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
@@ -0,0 +1,14 @@
+class RequestShedError(Exception):
+    """Base of the errors answered with 429; retry_after is in seconds."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(RequestShedError):
+    pass
+
+
+class DockerBusyError(RequestShedError):
+    pass
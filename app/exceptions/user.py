@@ -0,0 +1,2 @@
+class InvalidAvatarError(Exception):
+    pass
@@ -18,6 +18,10 @@ class WorkerOfflineError(Exception):
     pass
 
 
+class WorkerNotReadyError(Exception):
+    pass
+
+
 class TaskIsProcessingError(Exception):
     pass
 
@@ -32,3 +36,23 @@ class DockerOperationError(Exception):
 
 class ContainerNotFoundError(Exception):
     pass
+
+
+class TimelineNotFound(Exception):
+    pass
+
+
+class ReplayEncodingError(Exception):
+    pass
+
+
+class ScreenshotCaptureTimeout(Exception):
+    pass
+
+
+class WorkerHasNoDesktopError(Exception):
+    pass
+
+
+class UsageNotFound(Exception):
+    pass
@@ -1,13 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.celery_tasks.dispatch import warm_up as warm_up_celery
 from app.core.config import settings
+from app.core.metrics import render_prometheus
+from app.core.process_pool import shutdown_process_pool
+from app.core.s3 import s3_service
+from app.routers.dashboard import router as dashboard_router
 from app.routers.user import router as user_router
 from app.routers.tasks import router as task_router
 from app.routers.workers import router as worker_router
+from app.routers.workers_bulk import router as worker_bulk_router
+
+
+def _warm_up() -> None:
+    """Heavy modules the API imports lazily, loaded before the first request needs them."""
+    warm_up_celery()
+    s3_service.session  # first access imports aioboto3
+
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In the background: the app is ready to serve without waiting for it
+    asyncio.get_running_loop().run_in_executor(None, _warm_up)
+    yield
+    shutdown_process_pool()
+
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 app.include_router(user_router, prefix="/routers/v1")
 app.include_router(task_router, prefix="/routers/v1")
+app.include_router(worker_bulk_router, prefix="/routers/v1")
 app.include_router(worker_router, prefix="/routers/v1")
+app.include_router(dashboard_router, prefix="/routers/v1")
 
 
 @app.get("/health")
@@ -15,6 +43,11 @@ async def health_check():
     return {"status": "ok", "db": "connected"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return await render_prometheus()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -11,12 +11,18 @@ from sqlalchemy import (
     Date,
     Text,
     UniqueConstraint,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 if TYPE_CHECKING:
     from app.models.worker import WorkerModel
-from app.user.security import hash_password, verify_password, generate_secure_token
+from app.user.security import (
+    hash_password,
+    verify_password,
+    generate_secure_token,
+    hash_refresh_token,
+)
 from app.user.validators import validate_password_strength, validate_email
 from app.db.session import Base
 
@@ -30,6 +36,13 @@ class User(Base):
     )
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # Days task history is kept for this user; NULL means settings.TASK_RETENTION_DAYS.
+    # Can only shorten retention: whole days past the global limit are dropped as partitions.
+    task_retention_days: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Carried by access tokens as "ver"; bumping it revokes every access token issued so far
+    token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -159,12 +172,26 @@ class PasswordResetTokenModel(TokenBaseModel):
         return f"<PasswordResetTokenModel(id={self.id}, token={self.token}, expires_at={self.expires_at})>"
 
 
-class RefreshTokenModel(TokenBaseModel):
+class RefreshTokenModel(Base):
+    """
+    Only the SHA-256 of a refresh token is stored: a fixed 64-char key that is
+    useless if the table leaks. The raw token goes to the client once.
+    """
+
     __tablename__ = "refresh_tokens"
 
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     user: Mapped[User] = relationship("User", back_populates="refresh_tokens")
-    token: Mapped[str] = mapped_column(
-        String(512), unique=True, nullable=False, default=generate_secure_token
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
     )
 
     @classmethod
@@ -175,11 +202,11 @@ class RefreshTokenModel(TokenBaseModel):
         Factory method to create a new RefreshTokenModel instance.
 
         This method simplifies the creation of a new refresh token by calculating
-        the expiration date based on the provided number of valid days and setting
-        the required attributes.
+        the expiration date based on the provided number of valid days and hashing
+        the raw token.
         """
         expires_at = datetime.now(timezone.utc) + timedelta(days=days_valid)
-        return cls(user_id=user_id, expires_at=expires_at, token=token)
+        return cls(user_id=user_id, expires_at=expires_at, token_hash=hash_refresh_token(token))
 
     def __repr__(self):
-        return f"<RefreshTokenModel(id={self.id}, token={self.token}, expires_at={self.expires_at})>"
+        return f"<RefreshTokenModel(id={self.id}, user_id={self.user_id}, expires_at={self.expires_at})>"
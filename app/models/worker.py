@@ -1,14 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, List, TYPE_CHECKING
 
 from sqlalchemy import (
+    BigInteger,
     DateTime,
+    Float,
     ForeignKey,
     Integer,
     String,
     func,
     Text,
+    Index,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -26,6 +30,22 @@ class WorkerStatus(str, Enum):
     ERROR = "ERROR"
 
 
+class ResourceClass(str, Enum):
+    HEADLESS_CLI = "headless-cli"  # Без робочого столу: лише shell і Python
+    DESKTOP = "desktop"
+    DESKTOP_LARGE = "desktop-large"
+
+
+class ProvisioningPhase(str, Enum):
+    QUEUED = "queued"
+    CREATING_CONTAINER = "creating_container"
+    INSTALLING_PACKAGES = "installing_packages"
+    STARTING_AGENT = "starting_agent"
+    PROBING = "probing"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class TaskStatus(str, Enum):
     QUEUED = "QUEUED"
     PROCESSING = "PROCESSING"
@@ -48,6 +68,13 @@ class WorkerModel(Base):
     vnc_port: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     status: Mapped[WorkerStatus] = mapped_column(String, default=WorkerStatus.OFFLINE)
+    resource_class: Mapped[ResourceClass] = mapped_column(
+        String(20), default=ResourceClass.DESKTOP, server_default=ResourceClass.DESKTOP.value
+    )
+    provisioning_phase: Mapped[Optional[ProvisioningPhase]] = mapped_column(
+        String(30), nullable=True
+    )
+    provisioning_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -59,11 +86,27 @@ class WorkerModel(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship("User", back_populates="workers")
 
+    __table_args__ = (
+        Index("ix_workers_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Docker events and the reconciler find workers by container
+        Index("ix_workers_container_id", "container_id"),
+    )
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utcnow_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class TaskModel(Base):
+    """Partitioned by day on created_at (see app.db.partitions), hence the composite PK."""
+
     __tablename__ = "tasks"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     prompt: Mapped[str] = mapped_column(Text, nullable=False)
 
@@ -77,7 +120,14 @@ class TaskModel(Base):
     status: Mapped[TaskStatus] = mapped_column(String, default=TaskStatus.QUEUED)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True),
+        primary_key=True,
+        default=_utcnow,
+        server_default=func.now(),
+    )
+    # Set when a Celery worker claims the task (QUEUED -> PROCESSING)
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
     )
     finished_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True), nullable=True
@@ -85,11 +135,105 @@ class TaskModel(Base):
     worker_id: Mapped[int] = mapped_column(ForeignKey("workers.id"))
     worker: Mapped["WorkerModel"] = relationship("WorkerModel", back_populates="tasks")
 
+    __table_args__ = (
+        Index("ix_tasks_worker_id_created_at_id", "worker_id", "created_at", "id"),
+        # Previous-task context of execute_worker_task
+        Index(
+            "ix_tasks_worker_id_finished_at_completed",
+            "worker_id",
+            text("finished_at DESC"),
+            postgresql_where=text("status = 'COMPLETED'"),
+        ),
+        # Open tasks are few; the reconciler and telemetry only ever look for those
+        Index(
+            "ix_tasks_worker_id_open",
+            "worker_id",
+            "created_at",
+            postgresql_where=text("status IN ('QUEUED', 'PROCESSING')"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
 
 class ImageModel(Base):
+    """
+    Partitioned by day on created_at like tasks. task_id is a plain column:
+    a partitioned tasks table can't be referenced by id alone.
+    """
+
     __tablename__ = "task_images"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     worker_id: Mapped[int] = mapped_column(ForeignKey("workers.id", ondelete="CASCADE"))
-    s3_url: Mapped[str] = mapped_column(String(500), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    task_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    s3_key: Mapped[str] = mapped_column(String(500), nullable=False)
+    perceptual_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True, default=_utcnow_naive, server_default=func.now()
+    )
+    # Last capture that matched this image (dedup); created_at never changes
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_images_task_id_created_at", "task_id", "created_at"),
+        Index(
+            "ix_task_images_worker_id_created_at_id", "worker_id", "created_at", "id"
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    @property
+    def seen_at(self) -> datetime:
+        """When the desktop last looked like this image."""
+        return self.last_seen_at or self.created_at
+
+
+class _UsageTotals:
+    """Aggregated container samples: sums for averages, maxima for peaks."""
+
+    samples: Mapped[int] = mapped_column(Integer, default=0)
+    cpu_percent_sum: Mapped[float] = mapped_column(Float, default=0)
+    cpu_percent_max: Mapped[float] = mapped_column(Float, default=0)
+    memory_bytes_sum: Mapped[int] = mapped_column(BigInteger, default=0)
+    memory_bytes_max: Mapped[int] = mapped_column(BigInteger, default=0)
+    pids_max: Mapped[int] = mapped_column(Integer, default=0)
+    block_read_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+    block_write_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+    net_rx_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+    net_tx_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    @property
+    def cpu_percent_avg(self) -> float:
+        return self.cpu_percent_sum / self.samples if self.samples else 0.0
+
+    @property
+    def memory_bytes_avg(self) -> int:
+        return self.memory_bytes_sum // self.samples if self.samples else 0
+
+
+class WorkerUsageModel(_UsageTotals, Base):
+    """Per-minute resource usage of a worker container."""
+
+    __tablename__ = "worker_usage"
+
+    worker_id: Mapped[int] = mapped_column(
+        ForeignKey("workers.id", ondelete="CASCADE"), primary_key=True
+    )
+    minute: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    __table_args__ = (Index("ix_worker_usage_minute", "minute"),)
+
+
+class TaskUsageModel(_UsageTotals, Base):
+    """Resource usage of the worker container while a task was PROCESSING."""
+
+    __tablename__ = "task_usage"
+
+    # No FK: tasks is partitioned and can't be referenced by id alone
+    task_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    worker_id: Mapped[int] = mapped_column(ForeignKey("workers.id", ondelete="CASCADE"))
+    first_sample_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    last_sample_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (Index("ix_task_usage_last_sample_at", "last_sample_at"),)
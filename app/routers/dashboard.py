@@ -0,0 +1,40 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.http_cache import set_cache_headers
+from app.db.session import get_db
+from app.models import User
+from app.schemas.worker import DashboardWorker
+from app.user.dependencies import get_current_user
+from app.worker import crud
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+DASHBOARD_ADAPTER = TypeAdapter(List[DashboardWorker])
+
+
+@router.get(
+    "/",
+    response_model=List[DashboardWorker],
+    summary="Everything the dashboard shows, in one request",
+    description="""
+    Every worker with its status, latest task and latest screenshot (with a presigned URL),
+    newest worker first. Replaces the per-worker detail, task and screenshot calls.
+    Screenshots are not captured here: use GET /workers/{id}/screenshot to refresh one.
+    """,
+)
+async def get_dashboard_endpoint(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    dashboard = await crud.get_dashboard(db, current_user.id)
+
+    # Serialized straight to JSON bytes by pydantic-core, skipping the jsonable_encoder pass
+    response = Response(
+        content=DASHBOARD_ADAPTER.dump_json(dashboard), media_type="application/json"
+    )
+    set_cache_headers(response, None)
+    return response
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core.http_cache import IMMUTABLE, etag_matches, not_modified, set_cache_headers
 from app.db.session import get_db
-from app.exceptions.worker import TaskNotFound, TaskIsProcessingError
+from app.exceptions.worker import (
+    TaskNotFound,
+    TaskIsProcessingError,
+    TimelineNotFound,
+    ReplayEncodingError,
+    UsageNotFound,
+)
 from app.models import User
-from app.schemas.worker import TaskRead
+from app.models.worker import TaskStatus
+from app.schemas.worker import TaskRead, ImageRead, TaskUsageRead
 from app.user.dependencies import get_current_user
 from app.worker import crud
+from app.worker.status_cache import atask_etag
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
@@ -15,14 +26,27 @@ router = APIRouter(prefix="/tasks", tags=["Tasks"])
 @router.get("/{task_id}", response_model=TaskRead)
 async def get_task_endpoint(
     task_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),  # Мок
 ):
+    """Supports If-None-Match; finished tasks are served as immutable."""
+    etag = await atask_etag(task_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     try:
-        return await crud.get_task(db, task_id, current_user.id)
+        task = await crud.get_task(db, task_id, current_user.id)
     except TaskNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
+    if task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+        set_cache_headers(response, etag, IMMUTABLE)
+    else:
+        set_cache_headers(response, etag)
+    return task
+
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task_endpoint(
@@ -37,3 +61,70 @@ async def delete_task_endpoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except TaskIsProcessingError as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get(
+    "/{task_id}/timeline",
+    response_model=List[ImageRead],
+    summary="Get the screenshot timeline of a task",
+)
+async def get_task_timeline_endpoint(
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Frames recorded while the task was running, oldest first. Unchanged frames are dropped."""
+    try:
+        frames = await crud.get_task_timeline(db, task_id, current_user.id)
+        return await crud.build_image_reads(frames)
+    except TaskNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get(
+    "/{task_id}/usage",
+    response_model=TaskUsageRead,
+    summary="Peak and average resource usage of a task",
+)
+async def get_task_usage_endpoint(
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        return await crud.get_task_usage(db, task_id, current_user.id)
+    except (TaskNotFound, UsageNotFound) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+REPLAY_MEDIA_TYPES = {"webp": "image/webp", "mp4": "video/mp4"}
+
+
+@router.get(
+    "/{task_id}/timeline/replay",
+    summary="Download the task timeline as an animated replay",
+    response_class=Response,
+)
+async def get_task_replay_endpoint(
+    task_id: int,
+    format: Literal["webp", "mp4"] = Query("webp", description="Replay container"),
+    frame_ms: int = Query(800, ge=100, le=10000, description="Duration of each frame"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        content = await crud.build_task_replay(
+            db, task_id, current_user.id, format, frame_ms
+        )
+    except (TaskNotFound, TimelineNotFound) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ReplayEncodingError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    return Response(
+        content=content,
+        media_type=REPLAY_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'inline; filename="task_{task_id}_replay.{format}"'
+        },
+    )
@@ -1,18 +1,29 @@
-from datetime import datetime, timezone, timedelta
+import asyncio
+from datetime import datetime, timezone
 
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Request,
     status,
 )
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, func, or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.core.s3 import S3Service
+from app.core.process_pool import run_in_process
+from app.core.s3 import s3_service
+from app.exceptions.user import InvalidAvatarError
+from app.user.avatars import (
+    AVATAR_CONTENT_TYPES,
+    avatar_object_keys,
+    avatar_variant_keys,
+    process_avatar,
+)
 from app.user.dependencies import get_current_user, get_current_user_profile
+from app.user.principal_cache import ainvalidate_principal
 from app.models import User
 from app.models.user import (
     RefreshTokenModel,
@@ -32,15 +43,17 @@ from app.schemas.user import (
 )
 from app.user.security import (
     create_access_token,
-    verify_password,
+    ahash_password,
+    averify_password,
+    averify_and_update,
     generate_secure_token,
+    hash_refresh_token,
 )
 from app.core.config import settings
 from app.db.session import get_db
-from app.user.validators import validate_passwords_different
+from app.user.validators import validate_password_strength
 
 router = APIRouter(prefix="/user", tags=["User"])
-s3_service = S3Service()
 
 
 async def _validate_token_not_expired(
@@ -55,15 +68,88 @@ async def _validate_token_not_expired(
         raise HTTPException(status_code=status_code, detail=error_detail)
 
 
+async def _issue_refresh_token(session: AsyncSession, user_id: int) -> str:
+    """
+    Adds a new refresh token for the user and returns its raw value.
+    Expired tokens of the user and the oldest ones beyond REFRESH_TOKENS_PER_USER
+    are deleted in the same transaction, which the caller commits.
+    """
+    kept_ids = (
+        select(RefreshTokenModel.id)
+        .where(RefreshTokenModel.user_id == user_id)
+        .order_by(RefreshTokenModel.id.desc())
+        .limit(settings.REFRESH_TOKENS_PER_USER - 1)
+    )
+    await session.execute(
+        delete(RefreshTokenModel).where(
+            RefreshTokenModel.user_id == user_id,
+            or_(
+                RefreshTokenModel.expires_at < func.now(),
+                RefreshTokenModel.id.not_in(kept_ids),
+            ),
+        )
+    )
+
+    token_value = generate_secure_token()
+    session.add(
+        RefreshTokenModel.create(
+            user_id=user_id,
+            days_valid=settings.REFRESH_TOKEN_EXPIRE_DAYS,
+            token=token_value,
+        )
+    )
+    return token_value
+
+
+async def _revoke_all_tokens(session: AsyncSession, user_id: int) -> int:
+    """
+    Deletes the user's refresh tokens and bumps token_version, which revokes the
+    access tokens. Returns the revoked version; the caller commits and then
+    passes it to ainvalidate_principal.
+    """
+    await session.execute(
+        delete(RefreshTokenModel).where(RefreshTokenModel.user_id == user_id)
+    )
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )
+    return result.scalar_one() - 1
+
+
 async def _build_profile_response(profile: UserProfileModel) -> UserProfileResponse:
-    avatar_url = None
-    if profile.avatar:
-        avatar_url = await s3_service.generate_presigned_url(profile.avatar)
     response = UserProfileResponse.model_validate(profile)
-    response.avatar_url = avatar_url
+    if profile.avatar:
+        variant_keys = avatar_variant_keys(profile.avatar)
+        urls = await s3_service.get_presigned_urls(variant_keys.values())
+        response.avatar_urls = {size: urls.get(key, "") for size, key in variant_keys.items()}
+        response.avatar_url = response.avatar_urls[max(variant_keys)]
     return response
 
 
+async def _read_avatar_body(request: Request) -> bytes:
+    """
+    Reads the upload while it streams in and stops at AVATAR_MAX_BYTES, so an
+    oversized body is never buffered whole.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Avatar must not exceed {settings.AVATAR_MAX_BYTES} bytes",
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.AVATAR_MAX_BYTES:
+        raise too_large
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.AVATAR_MAX_BYTES:
+            raise too_large
+    return bytes(body)
+
+
 @router.post(
     "/register",
     response_model=TokenLoginResponseSchema,
@@ -79,22 +165,15 @@ async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db
         )
 
     new_user = User(email=str(user_data.email))
-    new_user.password = user_data.password
+    validate_password_strength(user_data.password)
+    new_user.hashed_password = await ahash_password(user_data.password)
     new_user.is_active = True
 
     session.add(new_user)
     await session.flush()  # get new_user.id before creating refresh token
 
-    access_token = create_access_token(user_id=new_user.id)
-    refresh_token_value = generate_secure_token()
-    refresh_token = RefreshTokenModel(
-        user_id=new_user.id,
-        token=refresh_token_value,
-        expires_at=datetime.now(timezone.utc)
-        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-    )
-
-    session.add(refresh_token)
+    access_token = create_access_token(user_id=new_user.id, token_version=new_user.token_version)
+    refresh_token_value = await _issue_refresh_token(session, new_user.id)
     await session.commit()
 
     return TokenLoginResponseSchema(
@@ -113,7 +192,12 @@ async def login(credentials: LoginRequest, session: AsyncSession = Depends(get_d
     result = await session.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    verified, new_hash = (
+        await averify_and_update(credentials.password, user.hashed_password)
+        if user
+        else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -125,16 +209,12 @@ async def login(credentials: LoginRequest, session: AsyncSession = Depends(get_d
             status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user"
         )
 
-    access_token = create_access_token(user_id=user.id)
-    refresh_token_value = generate_secure_token()
-    refresh_token = RefreshTokenModel(
-        user_id=user.id,
-        token=refresh_token_value,
-        expires_at=datetime.now(timezone.utc)
-        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-    )
+    if new_hash:
+        # Stored with the current BCRYPT_ROUNDS, committed with the refresh token
+        user.hashed_password = new_hash
 
-    session.add(refresh_token)
+    access_token = create_access_token(user_id=user.id, token_version=user.token_version)
+    refresh_token_value = await _issue_refresh_token(session, user.id)
     await session.commit()
 
     return TokenLoginResponseSchema(
@@ -166,7 +246,7 @@ async def refresh_access_token(
 ):
     result = await session.execute(
         select(RefreshTokenModel)
-        .where(RefreshTokenModel.token == data.refresh_token)
+        .where(RefreshTokenModel.token_hash == hash_refresh_token(data.refresh_token))
         .options(selectinload(RefreshTokenModel.user))
     )
     refresh_token = result.scalar_one_or_none()
@@ -193,17 +273,11 @@ async def refresh_access_token(
         )
 
     await session.delete(refresh_token)
+    new_refresh_value = await _issue_refresh_token(session, user.id)
 
-    new_refresh_value = generate_secure_token()
-    new_refresh = RefreshTokenModel(
-        user_id=user.id,
-        token=new_refresh_value,
-        expires_at=datetime.now(timezone.utc)
-        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    new_access_token = create_access_token(
+        user_id=user.id, token_version=user.token_version
     )
-    session.add(new_refresh)
-
-    new_access_token = create_access_token(user_id=user.id)
     await session.commit()
 
     return TokenLoginResponseSchema(
@@ -216,16 +290,15 @@ async def refresh_access_token(
     "/logout",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Logout",
-    description="Logout current user and revoke all refresh tokens",
+    description="Logout current user and revoke all refresh and access tokens",
 )
 async def logout(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db),
 ):
-    await session.execute(
-        delete(RefreshTokenModel).where(RefreshTokenModel.user_id == current_user.id)
-    )
+    revoked_version = await _revoke_all_tokens(session, current_user.id)
     await session.commit()
+    await ainvalidate_principal(current_user.id, revoked_version)
 
 
 
@@ -241,30 +314,22 @@ async def change_password(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db),
 ):
-    if not current_user.verify_password(data.current_password):
+    user = await session.get(User, current_user.id)
+
+    if not await averify_password(data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Current password is incorrect",
         )
 
-    try:
-        validate_passwords_different(
-            new_password=data.new_password,
-            old_password=None,
-            hashed_old_password=current_user.hashed_password,
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
-        )
-
-    current_user.password = data.new_password
+    # PasswordChangeSchema already checked the strength and that the new password
+    # differs from the current one, which was just verified against the hash:
+    # no second bcrypt verify needed.
+    user.hashed_password = await ahash_password(data.new_password)
 
-    await session.execute(
-        delete(RefreshTokenModel).where(RefreshTokenModel.user_id == current_user.id)
-    )
+    revoked_version = await _revoke_all_tokens(session, user.id)
     await session.commit()
+    await ainvalidate_principal(user.id, revoked_version)
 
     return PasswordResetResponse(detail="Password successfully changed")
 
@@ -337,3 +402,61 @@ async def update_my_profile(
     await session.refresh(profile)
 
     return await _build_profile_response(profile)
+
+
+@router.post(
+    "/profile/avatar",
+    response_model=UserProfileResponse,
+    summary="Upload a new avatar",
+    description="""
+    The request body is the image itself (JPEG, PNG or WebP) with a matching Content-Type,
+    at most AVATAR_MAX_BYTES. It is cut to a square and stored as 64, 128 and 256 px WebP;
+    the previous avatar is deleted.
+    """,
+)
+async def upload_my_avatar(
+    request: Request,
+    profile: UserProfileModel = Depends(get_current_user_profile),
+    session: AsyncSession = Depends(get_db),
+):
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found. Create profile before updating.",
+        )
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in AVATAR_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Only JPEG, PNG, or WebP images are allowed",
+        )
+
+    data = await _read_avatar_body(request)
+    try:
+        variants = await run_in_process(process_avatar, data)
+    except InvalidAvatarError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    new_keys = avatar_object_keys(profile.user_id)
+    uploaded = await asyncio.gather(
+        *(
+            s3_service.upload_bytes(variants[size], key, content_type="image/webp")
+            for size, key in new_keys.items()
+        )
+    )
+    if not all(uploaded):
+        await s3_service.delete_objects(list(new_keys.values()))
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY, detail="Failed to store avatar"
+        )
+
+    old_avatar = profile.avatar
+    profile.avatar = new_keys[max(new_keys)]
+    await session.commit()
+    await session.refresh(profile)
+
+    if old_avatar:
+        await s3_service.delete_objects(list(avatar_variant_keys(old_avatar).values()))
+
+    return await _build_profile_response(profile)
@@ -1,14 +1,19 @@
 import secrets
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.concurrency import run_in_threadpool
 from typing import List
 
 from app.core.config import settings
+from app.core.http_cache import etag_matches, not_modified, set_cache_headers
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.rate_limit import docker_slot, SCREENSHOT, WORKERS, TASKS
 from app.db.session import get_db
 from app.models import User
-from app.models.worker import WorkerStatus
+from app.models.worker import WorkerStatus, TaskStatus
 from app.schemas.worker import (
     WorkerCreate,
     TaskListSchema,
@@ -17,32 +22,50 @@ from app.schemas.worker import (
     ImageRead,
     WorkerStatusRead,
     WorkerRead,
+    WorkerUsageRead,
 )
-from app.user.dependencies import get_current_user
+from app.user.dependencies import get_current_user, rate_limit
 from app.worker import crud
 from app.exceptions.worker import (
     WorkerLimitExceeded,
     WorkerNotFound,
     WorkerIsBusyError,
     WorkerOfflineError,
+    WorkerNotReadyError,
     WorkerNoContainerError,
     DockerOperationError,
     ContainerNotFoundError,
+    ScreenshotCaptureTimeout,
+    WorkerHasNoDesktopError,
 )
-from app.celery_tasks.worker_tasks import run_oi_agent, execute_worker_task
+from app.exceptions.pagination import InvalidCursorError
+from app.exceptions.rate_limit import DockerBusyError
+from app.celery_tasks.dispatch import enqueue_provisioning, enqueue_task_execution
 from app.worker.docker_service import get_docker_service
+from app.worker.resources import worker_profile
+from app.worker.status_cache import (
+    aget_worker_list_page,
+    acache_worker_list_page,
+    aworker_etag,
+    worker_list_etag,
+)
 
 router = APIRouter(prefix="/workers", tags=["Workers"])
 
+WORKER_LIST_ADAPTER = TypeAdapter(List[WorkerStatusRead])
+
 
 @router.post(
     "/",
     response_model=WorkerRead,
-    status_code=status.HTTP_201_CREATED,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limit(WORKERS))],
     summary="Create new VM and AI agent",
     description="""
-        Installing apps on new computer  (3-4 mins), after creating, gets full info of VM.
-        User need to wait before executing tasks for correct work. You need to save VNC password.
+        Returns right away with the worker in STARTING; the VM is provisioned in the background
+        (3-4 mins for desktops). Poll GET /workers/{id}: `provisioning_phase` shows the progress,
+        the worker turns IDLE once it passed the readiness check, or ERROR with `provisioning_error`.
+        The VNC password is only returned here, you need to save it.
         """,
 )
 async def create_worker_endpoint(
@@ -53,36 +76,13 @@ async def create_worker_endpoint(
     try:
         worker = await crud.create_worker(db, worker_in, current_user.id)
 
-        container_name = f"factory_worker_{worker.id}_{current_user.id}"
-        vnc_password = secrets.token_hex(8)
-        try:
-            container_id, host_port = await run_in_threadpool(
-                get_docker_service().create_kasm_worker,
-                worker_name=container_name,
-                vnc_password=vnc_password,
-            )
-        except Exception as docker_error:
-            await crud.delete_worker(db, worker.id, current_user.id, force=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to start isolated environment: {str(docker_error)}",
-            )
-
-        updated_worker = await crud.update_worker_docker_info(
-            session=db,
-            worker_id=worker.id,
-            container_id=container_id,
-            vnc_port=host_port,
-            status=WorkerStatus.IDLE,
+        vnc_password = (
+            secrets.token_hex(8) if worker_profile(worker.resource_class).desktop else None
         )
-        updated_worker.vnc_password = vnc_password
+        enqueue_provisioning(worker.id, vnc_password)
 
-        run_oi_agent.delay(
-            container_id=updated_worker.container_id,
-            gemini_api_key=settings.GEMINI_API_KEY,
-        )
-
-        return updated_worker
+        worker.vnc_password = vnc_password
+        return worker
 
     except WorkerLimitExceeded as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
@@ -90,24 +90,77 @@ async def create_worker_endpoint(
 
 @router.get("/", response_model=List[WorkerStatusRead])
 async def get_workers_endpoint(
-    db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
+    request: Request,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+    status_filter: WorkerStatus | None = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
-    return await crud.get_worker_list(db, current_user.id)
+    """
+    Served from the Redis list cache while none of the user's workers changed.
+    Supports If-None-Match.
+    """
+    page_key = f"{limit}:{cursor or ''}:{status_filter.value if status_filter else ''}"
+    generation, cached_page = await aget_worker_list_page(current_user.id, page_key)
+
+    etag = worker_list_etag(generation, page_key) if generation is not None else None
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if cached_page:
+        items_json, next_cursor = cached_page
+    else:
+        try:
+            workers, next_cursor = await crud.get_worker_list(
+                db, current_user.id, limit=limit, cursor=cursor, status=status_filter
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        items_json = WORKER_LIST_ADAPTER.dump_json(workers).decode()
+        if generation is not None:
+            await acache_worker_list_page(
+                current_user.id, page_key, generation, items_json, next_cursor
+            )
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    response = Response(content=items_json, media_type="application/json", headers=headers)
+    set_cache_headers(response, etag)
+    return response
 
 
 @router.get("/{worker_id}", response_model=WorkerRead)
 async def get_worker_endpoint(
     worker_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    `tasks` holds the latest WORKER_DETAIL_TASKS_LIMIT tasks, newest first; page
+    through the full history with GET /workers/{worker_id}/tasks.
+    Supports If-None-Match: 304 without a database read while the worker is unchanged.
+    """
+    etag = await aworker_etag(worker_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     try:
-        return await crud.get_worker(db, worker_id, current_user.id)
+        worker = await crud.get_worker_detail(db, worker_id, current_user.id)
     except WorkerNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
+    set_cache_headers(response, etag)
+    return worker
+
 
-@router.delete("/{worker_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{worker_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limit(WORKERS))],
+)
 async def delete_worker_endpoint(
     worker_id: int,
     force: bool = Query(False, description="Force delete even if worker is busy"),
@@ -115,20 +168,31 @@ async def delete_worker_endpoint(
     current_user: User = Depends(get_current_user),
 ):
     try:
-        worker = await crud.delete_worker(db, worker_id, current_user.id, force)
+        # The slot is taken before the row goes, so a shed delete leaves nothing behind
+        async with docker_slot(WORKERS):
+            worker = await crud.delete_worker(db, worker_id, current_user.id, force)
 
-        if worker.container_id:
-            get_docker_service().stop_worker(worker.container_id)
+            if worker.container_id:
+                await run_in_threadpool(get_docker_service().stop_worker, worker.container_id)
 
         return None
     except WorkerNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except WorkerIsBusyError as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DockerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post(
-    "/{worker_id}/tasks", response_model=TaskRead, status_code=status.HTTP_201_CREATED
+    "/{worker_id}/tasks",
+    response_model=TaskRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit(TASKS))],
 )
 async def create_task_for_worker(
     worker_id: int,
@@ -142,20 +206,21 @@ async def create_task_for_worker(
             db, task_in, worker_id, current_user.id
         )
 
-        execute_worker_task.delay(
-            task_id=task.id,
-            worker_id=worker_id,
-            container_id=container_id,
-            prompt=task.prompt,
-            gemini_api_key=settings.GEMINI_API_KEY,
+        enqueue_task_execution(
+            task.id,
+            worker_id,
+            container_id,
+            task.prompt,
+            task_in.record_timeline,
+            created_at=task.created_at,
         )
 
         return task
     except WorkerNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-    except WorkerOfflineError as e:
+    except (WorkerOfflineError, WorkerHasNoDesktopError) as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    except WorkerIsBusyError as e:
+    except (WorkerIsBusyError, WorkerNotReadyError) as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
@@ -166,29 +231,73 @@ async def create_task_for_worker(
 )
 async def get_worker_tasks(
     worker_id: int,
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+    status_filter: TaskStatus | None = Query(None, alias="status"),
+    created_after: datetime | None = Query(None),
+    created_before: datetime | None = Query(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Gets the task history of a particular worker."""
-    return await crud.get_task_list(db, worker_id, current_user.id)
+    """Gets the task history of a particular worker, newest first, one page at a time."""
+    try:
+        tasks, next_cursor = await crud.get_task_list(
+            db,
+            worker_id,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            status=status_filter,
+            created_after=created_after,
+            created_before=created_before,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return tasks
 
 
 @router.get(
     "/{worker_id}/screenshot",
     response_model=ImageRead,
+    dependencies=[Depends(rate_limit(SCREENSHOT))],
     summary="Get a screenshot of VirtualMachine",
 )
 async def get_worker_screen(
     worker_id: int,
+    max_age: int = Query(
+        settings.SCREENSHOT_MAX_AGE_SECONDS,
+        ge=0,
+        le=3600,
+        description="Reuse the latest screenshot if it is younger than this many seconds",
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     try:
-        return await crud.get_or_capture_screenshot(db, worker_id, current_user.id)
+        image = await crud.get_or_capture_screenshot(
+            db, worker_id, current_user.id, max_age_seconds=max_age
+        )
+        return (await crud.build_image_reads([image]))[0]
     except WorkerNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except WorkerNoContainerError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except WorkerHasNoDesktopError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ScreenshotCaptureTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+    except DockerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -199,6 +308,7 @@ async def get_worker_screen(
 @router.post(
     "/{worker_id}/stop",
     response_model=WorkerStatusRead,
+    dependencies=[Depends(rate_limit(WORKERS))],
     summary="Stop worker container",
     description="""
     Puts the container into a sleep state (OFFLINE). Frees RAM but keeps files on disk.
@@ -226,11 +336,18 @@ async def stop_worker_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+    except DockerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post(
     "/{worker_id}/start",
     response_model=WorkerStatusRead,
+    dependencies=[Depends(rate_limit(WORKERS))],
     summary="Start a stopped worker",
     description="Wakes up a stopped container and puts it in IDLE status, ready to accept new tasks.",
 )
@@ -251,16 +368,62 @@ async def start_worker_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+    except DockerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.get("/{worker_id}/screenshots", response_model=List[ImageRead])
 async def get_worker_screenshots(
     worker_id: int,
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+    created_after: datetime | None = Query(None),
+    created_before: datetime | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get screenshots for a specific worker, newest first, one page at a time."""
+    try:
+        images, next_cursor = await crud.get_screenshot_list(
+            db,
+            worker_id,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            created_after=created_after,
+            created_before=created_before,
+        )
+    except WorkerNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return await crud.build_image_reads(images)
+
+
+@router.get(
+    "/{worker_id}/usage",
+    response_model=List[WorkerUsageRead],
+    summary="Per-minute resource usage of a worker",
+)
+async def get_worker_usage_endpoint(
+    worker_id: int,
+    since: datetime | None = Query(None, description="Defaults to the last hour"),
+    until: datetime | None = Query(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get a complete list of screenshots for a specific worker, newest first."""
+    """CPU, memory, I/O, network and PIDs of the worker container, one point per minute."""
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(hours=1)
     try:
-        return await crud.get_screenshot_list(db, worker_id, current_user.id)
+        return await crud.get_worker_usage(db, worker_id, current_user.id, since, until)
     except WorkerNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
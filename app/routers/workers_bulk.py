@@ -0,0 +1,117 @@
+import secrets
+from typing import List
+
+from fastapi import APIRouter, Depends, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.rate_limit import WORKERS
+from app.db.session import get_db
+from app.models import User
+from app.schemas.worker import (
+    WorkerBulkIds,
+    WorkerBulkCreate,
+    WorkerBulkResult,
+    WorkerBulkCreateResult,
+)
+from app.user.dependencies import get_current_user, rate_limit
+from app.worker import crud
+from app.celery_tasks.dispatch import enqueue_provisioning
+from app.worker.resources import worker_profile
+
+# Included before the workers router: /workers/{worker_id} would otherwise capture "bulk".
+# A bulk request takes one token of the workers bucket; its Docker calls each take a slot.
+router = APIRouter(
+    prefix="/workers/bulk",
+    tags=["Workers"],
+    dependencies=[Depends(rate_limit(WORKERS))],
+)
+
+
+@router.post(
+    "/create",
+    response_model=List[WorkerBulkCreateResult],
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Create several workers at once",
+    description="""
+    Same as POST /workers for every item, in one transaction. Items past the worker limit
+    fail, the others start provisioning. VNC passwords are only returned here.
+    """,
+)
+async def bulk_create_workers_endpoint(
+    bulk_in: WorkerBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    workers = await crud.bulk_create_workers(db, bulk_in.workers, current_user.id)
+
+    results = []
+    for worker_in, worker in zip(bulk_in.workers, workers):
+        if worker is None:
+            results.append(
+                WorkerBulkCreateResult(
+                    name=worker_in.name, ok=False, error="Maximum number of workers reached."
+                )
+            )
+            continue
+
+        vnc_password = (
+            secrets.token_hex(8) if worker_profile(worker.resource_class).desktop else None
+        )
+        enqueue_provisioning(worker.id, vnc_password)
+        results.append(
+            WorkerBulkCreateResult(
+                worker_id=worker.id,
+                name=worker.name,
+                ok=True,
+                status=worker.status,
+                vnc_password=vnc_password,
+            )
+        )
+    return results
+
+
+@router.post(
+    "/stop",
+    response_model=List[WorkerBulkResult],
+    summary="Stop several worker containers at once",
+)
+async def bulk_stop_workers_endpoint(
+    bulk_in: WorkerBulkIds,
+    force: bool = Query(
+        False,
+        description="Force kill the containers even if they are running a task (BUSY)",
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Containers are stopped concurrently; the result of each worker is reported separately."""
+    return await crud.bulk_stop_workers(db, bulk_in.worker_ids, current_user.id, force)
+
+
+@router.post(
+    "/start",
+    response_model=List[WorkerBulkResult],
+    summary="Start several stopped workers at once",
+)
+async def bulk_start_workers_endpoint(
+    bulk_in: WorkerBulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Containers are started concurrently; the result of each worker is reported separately."""
+    return await crud.bulk_start_workers(db, bulk_in.worker_ids, current_user.id)
+
+
+@router.post(
+    "/delete",
+    response_model=List[WorkerBulkResult],
+    summary="Delete several workers at once",
+)
+async def bulk_delete_workers_endpoint(
+    bulk_in: WorkerBulkIds,
+    force: bool = Query(False, description="Force delete even if workers are busy"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Containers are removed concurrently; the result of each worker is reported separately."""
+    return await crud.bulk_delete_workers(db, bulk_in.worker_ids, current_user.id, force)
@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
 
@@ -79,6 +79,8 @@ class UserProfileResponse(UserProfileBase):
     id: int
     user_id: int
     avatar_url: Optional[str] = None
+    # Size in pixels -> URL of each avatar variant; avatar_url is the largest
+    avatar_urls: Optional[Dict[int, str]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
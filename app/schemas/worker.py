@@ -1,16 +1,19 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
-from app.models.worker import WorkerStatus, TaskStatus
+from app.core.config import settings
+from app.models.worker import WorkerStatus, TaskStatus, ResourceClass, ProvisioningPhase
 
 
 class ImageRead(BaseModel):
     id: int
-    s3_url: str
+    s3_url: Optional[str] = None
     worker_id: int
+    task_id: Optional[int] = None
     created_at: datetime
+    last_seen_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -24,7 +27,7 @@ class TaskBase(BaseModel):
 
 
 class TaskCreate(TaskBase):
-    pass
+    record_timeline: bool = False
 
 
 class TaskRead(TaskBase):
@@ -34,6 +37,7 @@ class TaskRead(TaskBase):
     result: Optional[str] = None
     logs: Optional[str] = None
     created_at: datetime
+    started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -57,15 +61,19 @@ class WorkerBase(BaseModel):
 
 
 class WorkerCreate(WorkerBase):
-    pass
+    resource_class: ResourceClass = ResourceClass.DESKTOP
 
 
 class WorkerRead(WorkerBase):
     id: int
     user_id: int
     status: WorkerStatus
+    resource_class: ResourceClass
     created_at: Optional[datetime] = None
 
+    provisioning_phase: Optional[ProvisioningPhase] = None
+    provisioning_error: Optional[str] = None
+
     container_id: Optional[str] = None
     vnc_port: Optional[int] = None
 
@@ -79,6 +87,7 @@ class WorkerStatusRead(BaseModel):
     id: int
     name: str
     status: str
+    resource_class: ResourceClass
     container_id: str | None
 
     model_config = ConfigDict(from_attributes=True)
@@ -86,3 +95,82 @@ class WorkerStatusRead(BaseModel):
 
 class WorkerUpdate(BaseModel):
     name: Optional[str] = None
+
+
+# Bulk Schemas
+# ==========================================
+
+
+class WorkerBulkIds(BaseModel):
+    worker_ids: List[int] = Field(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+class WorkerBulkCreate(BaseModel):
+    workers: List[WorkerCreate] = Field(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+
+class WorkerBulkResult(BaseModel):
+    worker_id: Optional[int] = None
+    ok: bool
+    status: Optional[WorkerStatus] = None
+    error: Optional[str] = None
+
+
+class WorkerBulkCreateResult(WorkerBulkResult):
+    name: str
+    vnc_password: Optional[str] = None
+
+
+# Dashboard Schemas
+# ==========================================
+
+
+class DashboardTask(BaseModel):
+    id: int
+    prompt: str
+    status: TaskStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class DashboardWorker(BaseModel):
+    id: int
+    name: str
+    status: WorkerStatus
+    resource_class: ResourceClass
+    provisioning_phase: Optional[ProvisioningPhase] = None
+    container_id: Optional[str] = None
+    vnc_port: Optional[int] = None
+
+    latest_task: Optional[DashboardTask] = None
+    latest_screenshot: Optional[ImageRead] = None
+
+
+# Usage Schemas
+# ==========================================
+
+
+class UsageRead(BaseModel):
+    samples: int
+    cpu_percent_avg: float
+    cpu_percent_peak: float = Field(validation_alias="cpu_percent_max")
+    memory_bytes_avg: int
+    memory_bytes_peak: int = Field(validation_alias="memory_bytes_max")
+    pids_peak: int = Field(validation_alias="pids_max")
+    block_read_bytes: int
+    block_write_bytes: int
+    net_rx_bytes: int
+    net_tx_bytes: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TaskUsageRead(UsageRead):
+    task_id: int
+    worker_id: int
+    first_sample_at: datetime
+    last_sample_at: datetime
+
+
+class WorkerUsageRead(UsageRead):
+    minute: datetime
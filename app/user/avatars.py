@@ -0,0 +1,77 @@
+"""
+Avatar images: decoding and resizing of uploads, and their S3 object keys.
+
+An upload is stored as one WebP object per AVATAR_SIZES entry, all sharing a key
+prefix; UserProfileModel.avatar holds the key of the largest one and the other
+keys are derived from it. process_avatar is CPU-bound and runs in the process
+pool, so this module keeps its imports light for the pool processes.
+"""
+import time
+from io import BytesIO
+
+from app.core.config import settings
+from app.exceptions.user import InvalidAvatarError
+
+AVATAR_SIZES = (64, 128, 256)
+AVATAR_FORMATS = ("JPEG", "PNG", "WEBP")
+AVATAR_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+def avatar_object_keys(user_id: int) -> dict[int, str]:
+    """Fresh keys for a new upload: {size: key}. Never reused, so cached URLs can't go stale."""
+    prefix = f"avatars/user_{user_id}/{int(time.time() * 1000)}"
+    return {size: f"{prefix}_{size}.webp" for size in AVATAR_SIZES}
+
+
+def avatar_variant_keys(avatar_key: str) -> dict[int, str]:
+    """{size: key} of the upload whose largest variant is avatar_key."""
+    largest = max(AVATAR_SIZES)
+    suffix = f"_{largest}.webp"
+    if not avatar_key.endswith(suffix):
+        # A key not made by avatar_object_keys: a single image
+        return {largest: avatar_key}
+    prefix = avatar_key.removesuffix(suffix)
+    return {size: f"{prefix}_{size}.webp" for size in AVATAR_SIZES}
+
+
+def process_avatar(data: bytes) -> dict[int, bytes]:
+    """
+    Cuts an uploaded JPEG/PNG/WebP to a centred square and encodes it as WebP in
+    every AVATAR_SIZES size: {size: bytes}.
+
+    Dimensions are checked before decoding. JPEGs are decoded at reduced scale
+    (draft), just large enough for the biggest variant; other formats are shrunk
+    with reduce() inside resize (reducing_gap) before the final resampling.
+    Raises InvalidAvatarError.
+    """
+    from PIL import Image, ImageOps
+
+    largest = max(AVATAR_SIZES)
+    try:
+        image = Image.open(BytesIO(data))
+        if image.format not in AVATAR_FORMATS:
+            raise InvalidAvatarError("Only JPEG, PNG, or WebP images are allowed")
+        if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+            raise InvalidAvatarError("Image dimensions are too large")
+
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        side = min(image.size)
+        left = (image.width - side) // 2
+        top = (image.height - side) // 2
+        image = image.crop((left, top, left + side, top + side))
+
+        variants = {}
+        # Largest first: each smaller variant is resampled from the previous one
+        for size in sorted(AVATAR_SIZES, reverse=True):
+            image = image.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            buffer = BytesIO()
+            image.save(buffer, format="WEBP", quality=85)
+            variants[size] = buffer.getvalue()
+        return variants
+
+    except InvalidAvatarError:
+        raise
+    except Exception:
+        raise InvalidAvatarError("Invalid image file")
@@ -4,8 +4,15 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core.rate_limit import acheck_rate_limit
 from app.db.session import get_db
+from app.exceptions.rate_limit import RateLimitExceeded
 from app.models.user import User, UserProfileModel
+from app.user.principal_cache import (
+    aget_principal,
+    acache_principal,
+    aprincipal_generation,
+)
 from app.user.security import decode_access_token
 
 security = HTTPBearer()
@@ -20,6 +27,9 @@ async def get_current_user(
     This is the main authentication dependency used by all protected endpoints
     across the application. Other developers should use this dependency to
     access the current user in their endpoints.
+
+    The user usually comes from the principal cache and is then detached from
+    the session: load the row (session.get) before changing it.
     """
 
     token = credentials.credentials
@@ -49,13 +59,28 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    token_version = payload.get("ver", 0)
+    user = await aget_principal(user_id, token_version)
 
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
+        # Read before the row: a revocation committed after it stops the cache fill
+        generation = await aprincipal_generation(user_id)
+        result = await session.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+
+        if user.token_version != token_version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        await acache_principal(user, generation)
 
     if not user.is_active:
         raise HTTPException(
@@ -65,6 +90,26 @@ async def get_current_user(
     return user
 
 
+def rate_limit(route: str):
+    """
+    Dependency factory: takes a token of the current user's bucket for the route
+    class (see app.core.rate_limit) and answers 429 with Retry-After when empty.
+    Use as dependencies=[Depends(rate_limit(SCREENSHOT))].
+    """
+
+    async def _check_rate_limit(user: User = Depends(get_current_user)) -> None:
+        try:
+            await acheck_rate_limit(user.id, route)
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    return _check_rate_limit
+
+
 async def get_current_user_profile(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -0,0 +1,132 @@
+"""
+Cache of the authenticated user behind get_current_user, so most requests
+authenticate with JWT verification alone.
+
+Two layers: a per-process TTLCache in front of Redis. Entries carry the
+users.token_version they were read at and only serve access tokens of that
+version ("ver" claim). Logout, password change and deactivation bump the version
+and call ainvalidate_principal; other API processes may still serve their local
+copy for up to PRINCIPAL_LOCAL_TTL_SECONDS. The password hash is never cached.
+
+Invalidation always wins over a concurrent fill: ainvalidate_principal bumps a
+per-user generation counter, get_current_user reads it before loading the user
+from the database, and acache_principal only writes if it has not moved since.
+Cache errors never raise: on failure the user is read from the database.
+"""
+import json
+import logging
+from datetime import datetime
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_KEY = "auth:principal:{user_id}"
+PRINCIPAL_GENERATION_KEY = "auth:principal_gen:{user_id}"
+# Outlives any in-flight fill by far; an expired counter reads as "0" and still
+# differs from the value a fill read before it was bumped.
+PRINCIPAL_GENERATION_TTL_SECONDS = 24 * 3600
+
+# Sets KEYS[1] only if the generation KEYS[2] still equals ARGV[1]
+CACHE_PRINCIPAL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+PRINCIPAL_FIELDS = ("id", "email", "is_active", "task_retention_days", "token_version")
+PRINCIPAL_DATETIME_FIELDS = ("created_at", "updated_at")
+
+_local_cache = TTLCache(maxsize=settings.PRINCIPAL_LOCAL_CACHE_SIZE)
+
+
+def _dump(user: User) -> dict:
+    data = {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+    data.update(
+        {name: getattr(user, name).isoformat() for name in PRINCIPAL_DATETIME_FIELDS}
+    )
+    return data
+
+
+def _build(data: dict) -> User:
+    """A detached User for read-only use; load the row to change it."""
+    values = {name: data[name] for name in PRINCIPAL_FIELDS}
+    values.update(
+        {name: datetime.fromisoformat(data[name]) for name in PRINCIPAL_DATETIME_FIELDS}
+    )
+    return User(**values)
+
+
+async def aget_principal(user_id: int, token_version: int) -> User | None:
+    data = _local_cache.get((user_id, token_version))
+    if data is None:
+        try:
+            cached = await get_async_redis().get(PRINCIPAL_KEY.format(user_id=user_id))
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+            return None
+        if not cached:
+            return None
+
+        data = json.loads(cached)
+        if data["token_version"] != token_version:
+            return None
+        _local_cache.set((user_id, token_version), data, settings.PRINCIPAL_LOCAL_TTL_SECONDS)
+
+    return _build(data)
+
+
+async def aprincipal_generation(user_id: int) -> str | None:
+    """Read before loading the user for acache_principal; None if Redis is unavailable."""
+    try:
+        generation = await get_async_redis().get(PRINCIPAL_GENERATION_KEY.format(user_id=user_id))
+    except Exception as e:
+        logger.warning(f"Principal cache unavailable: {e}")
+        return None
+    return generation or "0"
+
+
+async def acache_principal(user: User, generation: str | None) -> None:
+    """
+    Caches a user loaded after aprincipal_generation returned `generation`.
+    Skipped if the principal was invalidated in between, or Redis is unavailable.
+    """
+    if generation is None:
+        return
+
+    data = _dump(user)
+    try:
+        written = await get_async_redis().eval(
+            CACHE_PRINCIPAL_SCRIPT,
+            2,
+            PRINCIPAL_KEY.format(user_id=user.id),
+            PRINCIPAL_GENERATION_KEY.format(user_id=user.id),
+            generation,
+            json.dumps(data),
+            settings.PRINCIPAL_CACHE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Principal of user {user.id} not cached: {e}")
+        return
+
+    if written:
+        _local_cache.set((user.id, user.token_version), data, settings.PRINCIPAL_LOCAL_TTL_SECONDS)
+
+
+async def ainvalidate_principal(user_id: int, revoked_version: int) -> None:
+    """Call after commit of a token_version bump, with the version it replaced."""
+    _local_cache.pop((user_id, revoked_version))
+    try:
+        generation_key = PRINCIPAL_GENERATION_KEY.format(user_id=user_id)
+        async with get_async_redis().pipeline(transaction=True) as pipe:
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, PRINCIPAL_GENERATION_TTL_SECONDS)
+            pipe.delete(PRINCIPAL_KEY.format(user_id=user_id))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Principal of user {user_id} not invalidated: {e}")
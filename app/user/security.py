@@ -1,3 +1,4 @@
+import hashlib
 import secrets
 from datetime import datetime, timedelta
 
@@ -5,8 +6,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.process_pool import run_in_process
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -26,13 +30,42 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(user_id: int) -> str:
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify a password and rehash it if its hash is outdated (e.g. fewer rounds
+    than BCRYPT_ROUNDS).
+
+    Returns:
+        tuple: (is the password correct, new hash to store or None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password off the event loop, in the CPU process pool."""
+    return await run_in_process(verify_password, plain_password, hashed_password)
+
+
+async def averify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """verify_and_update off the event loop, in the CPU process pool."""
+    return await run_in_process(verify_and_update, plain_password, hashed_password)
+
+
+def create_access_token(user_id: int, token_version: int = 0) -> str:
     """
     Create a new access token with a default or specified expiration time.
+    token_version is the user's current users.token_version.
     """
     expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode = {"sub": str(user_id), "exp": expire, "type": "access"}
+    to_encode = {
+        "sub": str(user_id),
+        "exp": expire,
+        "type": "access",
+        "ver": token_version,
+    }
 
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY_ACCESS, algorithm=settings.JWT_SIGNING_ALGORITHM
@@ -77,6 +110,11 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def ahash_password(password: str) -> str:
+    """hash_password off the event loop, in the CPU process pool."""
+    return await run_in_process(hash_password, password)
+
+
 def generate_secure_token(length: int = 32) -> str:
     """
     Generate a secure random token.
@@ -85,3 +123,11 @@ def generate_secure_token(length: int = 32) -> str:
         str: Securely generated token.
     """
     return secrets.token_urlsafe(length)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Key under which a refresh token is stored. Tokens are random, so a plain
+    SHA-256 is enough (no salt, no bcrypt) and keeps lookups a single index probe.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
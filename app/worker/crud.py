@@ -1,33 +1,102 @@
+import asyncio
+import time
 from datetime import datetime, timezone
 from typing import Sequence
 
-import docker
-from sqlalchemy import select, func
+from sqlalchemy import select, func, true
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from redis.exceptions import LockError
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from starlette.concurrency import run_in_threadpool
 
-from app.core.utils import capture_desktop_screenshot
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import aincr
+from app.core.pagination import paginate_newest_first, split_page, to_naive_utc
+from app.core.rate_limit import docker_slot, SCREENSHOT, WORKERS
+from app.core.redis import get_async_redis
+
+from app.core.s3 import s3_service
+from app.core.utils import (
+    SCREENSHOT_CAPTURE_LOCK,
+    grab_desktop_png,
+    fingerprint_screenshot,
+    is_same_screen,
+    screenshot_object_key,
+    pack_timeline,
+)
+from app.db.partitions import ID_RANGE_SLACK, created_range, id_floors, unlink_task_images
+from app.exceptions.rate_limit import DockerBusyError
 from app.exceptions.worker import (
     WorkerLimitExceeded,
     WorkerNotFound,
     WorkerIsBusyError,
     WorkerOfflineError,
+    WorkerNotReadyError,
     WorkerNoContainerError,
     DockerOperationError,
     ContainerNotFoundError,
     TaskNotFound,
     TaskIsProcessingError,
+    TimelineNotFound,
+    ScreenshotCaptureTimeout,
+    UsageNotFound,
+    WorkerHasNoDesktopError,
 )
 from app.models import WorkerModel
 from app.models.worker import (
     WorkerStatus,
+    ProvisioningPhase,
     TaskModel,
     TaskStatus,
     ImageModel,
+    TaskUsageModel,
+    WorkerUsageModel,
+)
+from app.schemas.worker import (
+    WorkerCreate,
+    TaskCreate,
+    ImageRead,
+    WorkerBulkResult,
+    DashboardTask,
+    DashboardWorker,
+)
+from app.worker.docker_service import get_docker_service, is_not_found
+from app.worker.resources import worker_profile
+from app.worker.status_cache import amark_worker_changed, amark_task_changed
+
+
+MAX_WORKERS_PER_USER = 3
+
+# Task columns behind TaskListSchema. Listings never load prompt/logs/result of
+# every task in full: logs and result can run to megabytes per task.
+TASK_LIST_COLUMNS = (
+    TaskModel.id,
+    TaskModel.created_at,
+    TaskModel.worker_id,
+    TaskModel.prompt,
+    TaskModel.status,
 )
-from app.schemas.worker import WorkerCreate, TaskCreate
-from app.worker.docker_service import get_docker_service
+
+# Worker columns behind WorkerStatusRead, plus the pagination keys
+WORKER_STATUS_COLUMNS = (
+    WorkerModel.id,
+    WorkerModel.created_at,
+    WorkerModel.name,
+    WorkerModel.status,
+    WorkerModel.resource_class,
+    WorkerModel.container_id,
+)
+
+
+# Lowest task id of each day (see app.db.partitions). Past days don't change and a
+# stale copy only widens the bounds, so each API process keeps its own.
+_task_id_floors = TTLCache(maxsize=1)
+
+
+def _task_list_loader():
+    return selectinload(WorkerModel.tasks).load_only(*TASK_LIST_COLUMNS)
 
 
 # ── Worker CRUD ──────────────────────────────────────────────
@@ -44,27 +113,36 @@ async def create_worker(
     result = await session.execute(query)
     worker_count = result.scalar()
 
-    if worker_count >= 3:
+    if worker_count >= MAX_WORKERS_PER_USER:
         raise WorkerLimitExceeded("Maximum number of workers reached.")
 
     data = worker_in.model_dump()
-    new_worker = WorkerModel(**data, user_id=user_id)
+    new_worker = WorkerModel(
+        **data,
+        user_id=user_id,
+        status=WorkerStatus.STARTING,
+        provisioning_phase=ProvisioningPhase.QUEUED,
+    )
 
     session.add(new_worker)
     await session.commit()
-    await session.refresh(new_worker)
+    await amark_worker_changed(user_id)
 
-    return new_worker
+    return await get_worker_detail(session, new_worker.id, user_id)
 
 
 async def get_worker(
-    session: AsyncSession, worker_id: int, user_id: int
+    session: AsyncSession, worker_id: int, user_id: int, with_tasks: bool = False
 ) -> WorkerModel:
-    query = (
-        select(WorkerModel)
-        .options(selectinload(WorkerModel.tasks))
-        .where(WorkerModel.id == worker_id, WorkerModel.user_id == user_id)
+    """
+    with_tasks loads every task of the worker (list columns only), for the delete
+    cascade; WorkerRead goes through get_worker_detail instead.
+    """
+    query = select(WorkerModel).where(
+        WorkerModel.id == worker_id, WorkerModel.user_id == user_id
     )
+    if with_tasks:
+        query = query.options(_task_list_loader())
     result = await session.execute(query)
     worker = result.scalars().first()
 
@@ -74,14 +152,45 @@ async def get_worker(
     return worker
 
 
-async def get_worker_list(session: AsyncSession, user_id: int) -> Sequence[WorkerModel]:
+async def get_worker_detail(
+    session: AsyncSession, worker_id: int, user_id: int
+) -> WorkerModel:
+    """
+    The worker behind WorkerRead: its tasks hold only the latest
+    WORKER_DETAIL_TASKS_LIMIT tasks, newest first. The rest is paged by get_task_list.
+    """
+    worker = await get_worker(session, worker_id, user_id)
+    tasks, _ = await get_task_list(
+        session, worker_id, user_id, limit=settings.WORKER_DETAIL_TASKS_LIMIT
+    )
+    # A partial collection, so it is set as loaded state instead of being assigned:
+    # nothing is flushed for it. Never delete a worker loaded this way.
+    set_committed_value(worker, "tasks", tasks)
+    return worker
+
+
+async def get_worker_list(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+    status: WorkerStatus | None = None,
+) -> tuple[list[WorkerModel], str | None]:
+    """Returns a page of the user's workers, newest first, and the next page cursor."""
+
     query = (
         select(WorkerModel)
+        .options(load_only(*WORKER_STATUS_COLUMNS))
         .where(WorkerModel.user_id == user_id)
-        .options(selectinload(WorkerModel.tasks))
+    )
+    if status:
+        query = query.where(WorkerModel.status == status)
+
+    query = paginate_newest_first(
+        query, WorkerModel.created_at, WorkerModel.id, cursor, limit
     )
     result = await session.execute(query)
-    return result.scalars().all()
+    return split_page(result.scalars().all(), limit)
 
 
 async def delete_worker(
@@ -91,7 +200,8 @@ async def delete_worker(
     Deletes a worker. If force=False and the worker is running, throws an error.
     Returns a worker object so that the router can pass its container_id to the DockerService to stop the container.
     """
-    worker = await get_worker(session, worker_id, user_id)
+    # session.delete cascades to the tasks, so they are loaded (keys only) up front
+    worker = await get_worker(session, worker_id, user_id, with_tasks=True)
 
     if worker.status in [WorkerStatus.BUSY, WorkerStatus.STARTING] and not force:
         raise WorkerIsBusyError(
@@ -100,38 +210,11 @@ async def delete_worker(
 
     await session.delete(worker)
     await session.commit()
+    await amark_worker_changed(user_id, worker_id)
 
     return worker
 
 
-async def update_worker_docker_info(
-    session: AsyncSession,
-    worker_id: int,
-    container_id: str,
-    vnc_port: int,
-    status: WorkerStatus,
-) -> WorkerModel:
-    query = select(WorkerModel).where(WorkerModel.id == worker_id)
-    result = await session.execute(query)
-    worker = result.scalars().first()
-
-    if worker:
-        worker.container_id = container_id
-        worker.vnc_port = vnc_port
-        worker.status = status
-
-        await session.commit()
-
-    final_query = (
-        select(WorkerModel)
-        .options(selectinload(WorkerModel.tasks))
-        .where(WorkerModel.id == worker_id)
-    )
-    final_result = await session.execute(final_query)
-
-    return final_result.scalars().first()
-
-
 # ── Task CRUD ────────────────────────────────────────────────
 
 
@@ -144,8 +227,12 @@ async def create_task(
 
     if worker.status == WorkerStatus.OFFLINE:
         raise WorkerOfflineError("Worker offline.")
+    if worker.status == WorkerStatus.STARTING:
+        raise WorkerNotReadyError("Worker is still provisioning.")
     if worker.status == WorkerStatus.BUSY:
         raise WorkerIsBusyError("Worker is busy.")
+    if task_in.record_timeline and not worker_profile(worker.resource_class).desktop:
+        raise WorkerHasNoDesktopError("Timeline recording needs a desktop worker.")
 
     new_task = TaskModel(
         prompt=task_in.prompt,
@@ -159,20 +246,52 @@ async def create_task(
     session.add(new_task)
     await session.commit()
     await session.refresh(new_task)
+    await amark_worker_changed(user_id, worker_id)
 
     return new_task, container_id
 
 
-async def get_task(session: AsyncSession, task_id: int, user_id: int) -> TaskModel:
-    """Gets the task along with its screenshots, checking user rights."""
+async def _task_created_range(
+    session: AsyncSession, task_id: int
+) -> tuple[datetime | None, datetime]:
+    floors = _task_id_floors.get("tasks")
+    if floors is None:
+        floors = await session.run_sync(id_floors, "tasks")
+        _task_id_floors.set("tasks", floors, settings.PARTITION_ID_FLOORS_TTL_SECONDS)
+    return created_range("tasks", floors, task_id)
 
+
+async def _find_task(
+    session: AsyncSession,
+    task_id: int,
+    user_id: int,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> TaskModel | None:
     query = (
         select(TaskModel)
         .join(WorkerModel)
         .where(TaskModel.id == task_id, WorkerModel.user_id == user_id)
     )
+    if created_from:
+        query = query.where(TaskModel.created_at >= created_from)
+    if created_to:
+        query = query.where(TaskModel.created_at < created_to)
     result = await session.execute(query)
-    task = result.scalars().first()
+    return result.scalars().first()
+
+
+async def get_task(session: AsyncSession, task_id: int, user_id: int) -> TaskModel:
+    """
+    Gets the task, checking user rights. Bounds derived from the id keep the
+    lookup to the few partitions around it instead of probing every day.
+    """
+
+    created_from, created_to = await _task_created_range(session, task_id)
+    task = await _find_task(session, task_id, user_id, created_from, created_to)
+    if not task:
+        # Missing, or created_at strayed outside the bounds of its id: look everywhere
+        task = await _find_task(session, task_id, user_id)
 
     if not task:
         raise TaskNotFound("Task is not found or permission denied.")
@@ -181,18 +300,33 @@ async def get_task(session: AsyncSession, task_id: int, user_id: int) -> TaskMod
 
 
 async def get_task_list(
-    session: AsyncSession, worker_id: int, user_id: int
-) -> Sequence[TaskModel]:
-    """Returns the task history of a particular worker."""
+    session: AsyncSession,
+    worker_id: int,
+    user_id: int,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+    status: TaskStatus | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+) -> tuple[list[TaskModel], str | None]:
+    """Returns a page of the task history of a particular worker and the next page cursor."""
 
     query = (
         select(TaskModel)
+        .options(load_only(*TASK_LIST_COLUMNS))
         .join(WorkerModel)
         .where(TaskModel.worker_id == worker_id, WorkerModel.user_id == user_id)
-        .order_by(TaskModel.created_at.desc())
     )
+    if status:
+        query = query.where(TaskModel.status == status)
+    if created_after:
+        query = query.where(TaskModel.created_at >= created_after)
+    if created_before:
+        query = query.where(TaskModel.created_at < created_before)
+
+    query = paginate_newest_first(query, TaskModel.created_at, TaskModel.id, cursor, limit)
     result = await session.execute(query)
-    return result.scalars().all()
+    return split_page(result.scalars().all(), limit)
 
 
 async def delete_task(session: AsyncSession, task_id: int, user_id: int) -> TaskModel:
@@ -206,7 +340,12 @@ async def delete_task(session: AsyncSession, task_id: int, user_id: int) -> Task
         )
 
     await session.delete(task)
+    await session.execute(
+        unlink_task_images([task_id], to_naive_utc(task.created_at) - ID_RANGE_SLACK)
+    )
     await session.commit()
+    await amark_task_changed(task_id)
+    await amark_worker_changed(user_id, task.worker_id)
     return task
 
 
@@ -239,15 +378,18 @@ async def stop_worker_container(
             else:
                 container.stop()
 
-        await run_in_threadpool(_docker_stop)
-    except docker.errors.NotFound:
-        pass
+        async with docker_slot(WORKERS):
+            await run_in_threadpool(_docker_stop)
+    except DockerBusyError:
+        raise
     except Exception as e:
-        raise DockerOperationError(f"Docker error: {str(e)}")
+        if not is_not_found(e):
+            raise DockerOperationError(f"Docker error: {str(e)}")
 
     worker.status = WorkerStatus.OFFLINE
     await session.commit()
     await session.refresh(worker)
+    await amark_worker_changed(user_id, worker_id)
 
     return worker
 
@@ -270,51 +412,283 @@ async def start_worker_container(
             container = get_docker_service().client.containers.get(worker.container_id)
             container.start()
 
-        await run_in_threadpool(_docker_start)
-    except docker.errors.NotFound:
-        raise ContainerNotFoundError("The container was not found on the server. It may have been deleted.")
+        async with docker_slot(WORKERS):
+            await run_in_threadpool(_docker_start)
+    except DockerBusyError:
+        raise
     except Exception as e:
+        if is_not_found(e):
+            raise ContainerNotFoundError("The container was not found on the server. It may have been deleted.")
         raise DockerOperationError(f"Docker error: {str(e)}")
 
     worker.status = WorkerStatus.IDLE
     await session.commit()
     await session.refresh(worker)
+    await amark_worker_changed(user_id, worker_id)
 
     return worker
 
 
-# ── Screenshot CRUD ──────────────────────────────────────────
+# ── Bulk operations ──────────────────────────────────────────
 
 
-async def get_or_capture_screenshot(
-    session: AsyncSession, worker_id: int, user_id: int
-) -> ImageModel:
-    """Gets latest screenshot (if <30s old) or captures a new one."""
+async def _run_docker_bounded(operation, container_ids: list[str]) -> list[Exception | None]:
+    """
+    Runs a blocking Docker call per container, BULK_DOCKER_CONCURRENCY at a time,
+    each in a global Docker slot. Returns the exception raised for each container
+    (DockerBusyError if it got no slot), None where the call succeeded.
+    """
+    semaphore = asyncio.Semaphore(settings.BULK_DOCKER_CONCURRENCY)
 
-    worker = await get_worker(session, worker_id, user_id)
+    async def _run(container_id: str) -> Exception | None:
+        async with semaphore:
+            try:
+                async with docker_slot(WORKERS):
+                    await run_in_threadpool(operation, container_id)
+            except Exception as e:
+                return e
+        return None
 
-    if not worker.container_id:
-        raise WorkerNoContainerError("Worker not found or not active.")
+    return await asyncio.gather(*(_run(container_id) for container_id in container_ids))
+
+
+async def _get_owned_workers(
+    session: AsyncSession, worker_ids: list[int], user_id: int, with_tasks: bool = False
+) -> dict[int, WorkerModel]:
+    query = select(WorkerModel).where(
+        WorkerModel.id.in_(worker_ids), WorkerModel.user_id == user_id
+    )
+    if with_tasks:
+        # session.delete cascades to the tasks, which can't be lazy-loaded here
+        query = query.options(_task_list_loader())
+    result = await session.execute(query)
+    return {worker.id: worker for worker in result.scalars().all()}
+
+
+def _failed(worker_id: int, error: str) -> WorkerBulkResult:
+    return WorkerBulkResult(worker_id=worker_id, ok=False, error=error)
+
+
+async def bulk_create_workers(
+    session: AsyncSession, workers_in: list[WorkerCreate], user_id: int
+) -> list[WorkerModel | None]:
+    """
+    Creates the workers in one transaction, in STARTING like create_worker.
+    Returns one entry per input; None for those past the per-user worker limit.
+    """
+    query = (
+        select(func.count())
+        .select_from(WorkerModel)
+        .where(WorkerModel.user_id == user_id)
+    )
+    free_slots = max(MAX_WORKERS_PER_USER - (await session.execute(query)).scalar(), 0)
+
+    new_workers = [
+        WorkerModel(
+            **worker_in.model_dump(),
+            user_id=user_id,
+            status=WorkerStatus.STARTING,
+            provisioning_phase=ProvisioningPhase.QUEUED,
+        )
+        for worker_in in workers_in[:free_slots]
+    ]
+    if new_workers:
+        session.add_all(new_workers)
+        await session.commit()
+        await amark_worker_changed(user_id)
+
+    return new_workers + [None] * (len(workers_in) - len(new_workers))
+
+
+async def bulk_stop_workers(
+    session: AsyncSession, worker_ids: list[int], user_id: int, force: bool = False
+) -> list[WorkerBulkResult]:
+    """Stops many worker containers concurrently, same rules as stop_worker_container."""
+    worker_ids = list(dict.fromkeys(worker_ids))
+    workers = await _get_owned_workers(session, worker_ids, user_id)
+    results: dict[int, WorkerBulkResult] = {}
+    to_stop = []
+
+    for worker_id in worker_ids:
+        worker = workers.get(worker_id)
+        if not worker:
+            results[worker_id] = _failed(worker_id, "Worker not found or permission denied.")
+        elif not worker.container_id:
+            results[worker_id] = _failed(worker_id, "The worker has no bound container.")
+        elif worker.status == WorkerStatus.OFFLINE:
+            results[worker_id] = WorkerBulkResult(worker_id=worker_id, ok=True, status=worker.status)
+        elif worker.status == WorkerStatus.BUSY and not force:
+            results[worker_id] = _failed(
+                worker_id, "The worker is currently performing a task. Use force=true to force stop."
+            )
+        else:
+            to_stop.append(worker)
+
+    def _docker_stop(container_id: str):
+        container = get_docker_service().client.containers.get(container_id)
+        if force:
+            container.kill()
+        else:
+            container.stop()
+
+    errors = await _run_docker_bounded(_docker_stop, [w.container_id for w in to_stop])
+    for worker, error in zip(to_stop, errors):
+        if error is None or is_not_found(error):
+            worker.status = WorkerStatus.OFFLINE
+            results[worker.id] = WorkerBulkResult(worker_id=worker.id, ok=True, status=worker.status)
+        else:
+            results[worker.id] = _failed(worker.id, f"Docker error: {str(error)}")
+
+    await session.commit()
+    if to_stop:
+        await amark_worker_changed(user_id, *(worker.id for worker in to_stop))
+
+    return [results[worker_id] for worker_id in worker_ids]
+
+
+async def bulk_start_workers(
+    session: AsyncSession, worker_ids: list[int], user_id: int
+) -> list[WorkerBulkResult]:
+    """Starts many stopped worker containers concurrently, same rules as start_worker_container."""
+    worker_ids = list(dict.fromkeys(worker_ids))
+    workers = await _get_owned_workers(session, worker_ids, user_id)
+    results: dict[int, WorkerBulkResult] = {}
+    to_start = []
+
+    for worker_id in worker_ids:
+        worker = workers.get(worker_id)
+        if not worker:
+            results[worker_id] = _failed(worker_id, "Worker not found or permission denied.")
+        elif not worker.container_id:
+            results[worker_id] = _failed(worker_id, "The worker has no bound container to run.")
+        elif worker.status in [WorkerStatus.IDLE, WorkerStatus.BUSY]:
+            results[worker_id] = WorkerBulkResult(worker_id=worker_id, ok=True, status=worker.status)
+        else:
+            to_start.append(worker)
+
+    def _docker_start(container_id: str):
+        get_docker_service().client.containers.get(container_id).start()
+
+    errors = await _run_docker_bounded(_docker_start, [w.container_id for w in to_start])
+    for worker, error in zip(to_start, errors):
+        if error is None:
+            worker.status = WorkerStatus.IDLE
+            results[worker.id] = WorkerBulkResult(worker_id=worker.id, ok=True, status=worker.status)
+        elif is_not_found(error):
+            results[worker.id] = _failed(
+                worker.id, "The container was not found on the server. It may have been deleted."
+            )
+        else:
+            results[worker.id] = _failed(worker.id, f"Docker error: {str(error)}")
+
+    await session.commit()
+    if to_start:
+        await amark_worker_changed(user_id, *(worker.id for worker in to_start))
+
+    return [results[worker_id] for worker_id in worker_ids]
+
+
+async def bulk_delete_workers(
+    session: AsyncSession, worker_ids: list[int], user_id: int, force: bool = False
+) -> list[WorkerBulkResult]:
+    """
+    Removes the containers concurrently, then deletes the workers whose container
+    is gone in one transaction. A worker whose container could not be removed is kept.
+    """
+    worker_ids = list(dict.fromkeys(worker_ids))
+    workers = await _get_owned_workers(session, worker_ids, user_id, with_tasks=True)
+    results: dict[int, WorkerBulkResult] = {}
+    to_delete = []
+
+    for worker_id in worker_ids:
+        worker = workers.get(worker_id)
+        if not worker:
+            results[worker_id] = _failed(worker_id, "Worker not found or permission denied.")
+        elif worker.status in [WorkerStatus.BUSY, WorkerStatus.STARTING] and not force:
+            results[worker_id] = _failed(
+                worker_id, "Worker is busy and cannot be deleted. Use force=True to delete it."
+            )
+        else:
+            to_delete.append(worker)
+
+    with_container = [w for w in to_delete if w.container_id]
+    errors = await _run_docker_bounded(
+        get_docker_service().stop_worker, [w.container_id for w in with_container]
+    )
+    failed_ids = set()
+    for worker, error in zip(with_container, errors):
+        if error is not None:
+            failed_ids.add(worker.id)
+            results[worker.id] = _failed(worker.id, f"Docker error: {str(error)}")
+
+    deleted = [w for w in to_delete if w.id not in failed_ids]
+    for worker in deleted:
+        await session.delete(worker)
+        results[worker.id] = WorkerBulkResult(worker_id=worker.id, ok=True)
+
+    await session.commit()
+    if deleted:
+        await amark_worker_changed(user_id, *(worker.id for worker in deleted))
 
+    return [results[worker_id] for worker_id in worker_ids]
+
+
+# ── Screenshot CRUD ──────────────────────────────────────────
+
+
+async def _get_latest_screenshot(
+    session: AsyncSession, worker_id: int
+) -> ImageModel | None:
     img_stmt = (
         select(ImageModel)
         .where(ImageModel.worker_id == worker_id)
         .order_by(ImageModel.created_at.desc())
         .limit(1)
+        .execution_options(populate_existing=True)
     )
     img_res = await session.execute(img_stmt)
-    latest_img = img_res.scalar_one_or_none()
-
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return img_res.scalar_one_or_none()
 
-    if latest_img:
-        time_since_last = (now - latest_img.created_at).total_seconds()
-        if time_since_last < 30:
-            return latest_img
 
-    s3_url = await run_in_threadpool(capture_desktop_screenshot, worker.container_id, worker_id)
-
-    new_image = ImageModel(worker_id=worker_id, s3_url=s3_url)
+async def _capture_screenshot(
+    session: AsyncSession, worker: WorkerModel, latest_img: ImageModel | None
+) -> ImageModel:
+    async with docker_slot(SCREENSHOT):
+        png_bytes = await run_in_threadpool(grab_desktop_png, worker.container_id)
+    perceptual_hash, content_hash = await run_in_threadpool(
+        fingerprint_screenshot, png_bytes
+    )
+    await aincr("screenshot_captures_total")
+
+    # Desktop has not changed since the last capture: keep the stored object
+    # and only mark the existing row as seen again. Timeline images belong to
+    # their task and are never reused.
+    if (
+        latest_img
+        and latest_img.task_id is None
+        and is_same_screen(
+            perceptual_hash,
+            content_hash,
+            latest_img.perceptual_hash,
+            latest_img.content_hash,
+        )
+    ):
+        latest_img.last_seen_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        await session.commit()
+        await session.refresh(latest_img)
+        await aincr("screenshot_dedup_hits_total")
+        return latest_img
+
+    object_key = screenshot_object_key(worker.id)
+    if not await s3_service.upload_bytes(png_bytes, object_key):
+        raise RuntimeError("Failed to upload screenshot.")
+
+    new_image = ImageModel(
+        worker_id=worker.id,
+        s3_key=object_key,
+        perceptual_hash=perceptual_hash,
+        content_hash=content_hash,
+    )
     session.add(new_image)
     await session.commit()
     await session.refresh(new_image)
@@ -322,17 +696,283 @@ async def get_or_capture_screenshot(
     return new_image
 
 
+async def get_or_capture_screenshot(
+    session: AsyncSession,
+    worker_id: int,
+    user_id: int,
+    max_age_seconds: int = settings.SCREENSHOT_MAX_AGE_SECONDS,
+) -> ImageModel:
+    """
+    Gets latest screenshot (if younger than max_age_seconds) or captures a new one.
+
+    Captures are single-flight per worker across all API replicas: the caller that
+    takes the Redis lease captures, concurrent callers wait and reuse its result.
+    """
+
+    worker = await get_worker(session, worker_id, user_id)
+
+    if not worker.container_id:
+        raise WorkerNoContainerError("Worker not found or not active.")
+    if not worker_profile(worker.resource_class).desktop:
+        raise WorkerHasNoDesktopError("Headless workers have no desktop to capture.")
+
+    requested_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    deadline = time.monotonic() + settings.SCREENSHOT_CAPTURE_LEASE_SECONDS
+    lock = get_async_redis().lock(
+        SCREENSHOT_CAPTURE_LOCK.format(worker_id=worker_id),
+        timeout=settings.SCREENSHOT_CAPTURE_LEASE_SECONDS,
+    )
+    waited = False
+
+    while True:
+        latest_img = await _get_latest_screenshot(session, worker_id)
+
+        if latest_img:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            time_since_last = (now - latest_img.seen_at).total_seconds()
+            if time_since_last < max_age_seconds or latest_img.seen_at >= requested_at:
+                await aincr(
+                    "screenshot_coalesced_total" if waited else "screenshot_cache_hits_total"
+                )
+                return latest_img
+
+        if await lock.acquire(blocking=False):
+            try:
+                return await _capture_screenshot(session, worker, latest_img)
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    # Lease expired mid-capture; another caller may own it now.
+                    pass
+
+        if time.monotonic() > deadline:
+            raise ScreenshotCaptureTimeout(
+                "Timed out waiting for a concurrent screenshot capture."
+            )
+
+        waited = True
+        await asyncio.sleep(settings.SCREENSHOT_WAIT_POLL_SECONDS)
+
+
 async def get_screenshot_list(
-    session: AsyncSession, worker_id: int, user_id: int
-) -> Sequence[ImageModel]:
-    """Returns all screenshots for a worker, newest first."""
+    session: AsyncSession,
+    worker_id: int,
+    user_id: int,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+) -> tuple[list[ImageModel], str | None]:
+    """Returns a page of screenshots for a worker, newest first, and the next page cursor."""
 
     await get_worker(session, worker_id, user_id)
 
+    img_stmt = select(ImageModel).where(ImageModel.worker_id == worker_id)
+    if created_after:
+        img_stmt = img_stmt.where(ImageModel.created_at >= to_naive_utc(created_after))
+    if created_before:
+        img_stmt = img_stmt.where(ImageModel.created_at < to_naive_utc(created_before))
+
+    img_stmt = paginate_newest_first(
+        img_stmt, ImageModel.created_at, ImageModel.id, cursor, limit
+    )
+    img_res = await session.execute(img_stmt)
+    return split_page(img_res.scalars().all(), limit)
+
+
+async def get_task_timeline(
+    session: AsyncSession, task_id: int, user_id: int
+) -> Sequence[ImageModel]:
+    """Returns the screenshot timeline recorded for a task, oldest frame first."""
+
+    task = await get_task(session, task_id, user_id)
+
+    # Frames are recorded while the task runs: only its days' partitions are read
     img_stmt = (
         select(ImageModel)
-        .where(ImageModel.worker_id == worker_id)
-        .order_by(ImageModel.created_at.desc())
+        .where(
+            ImageModel.task_id == task_id,
+            ImageModel.created_at >= to_naive_utc(task.created_at) - ID_RANGE_SLACK,
+        )
+        .order_by(ImageModel.created_at.asc(), ImageModel.id.asc())
     )
+    if task.finished_at:
+        img_stmt = img_stmt.where(
+            ImageModel.created_at < to_naive_utc(task.finished_at) + ID_RANGE_SLACK
+        )
     img_res = await session.execute(img_stmt)
     return img_res.scalars().all()
+
+
+async def build_task_replay(
+    session: AsyncSession,
+    task_id: int,
+    user_id: int,
+    fmt: str,
+    frame_duration_ms: int,
+) -> bytes:
+    """Downloads the timeline frames of a task and packs them into an animated replay."""
+
+    frames = await get_task_timeline(session, task_id, user_id)
+    if not frames:
+        raise TimelineNotFound("No timeline was recorded for this task.")
+
+    png_frames = await asyncio.gather(
+        *(s3_service.download_bytes(f.s3_key) for f in frames)
+    )
+    png_frames = [frame for frame in png_frames if frame]
+    if not png_frames:
+        raise TimelineNotFound("Timeline frames are no longer available.")
+
+    return await run_in_threadpool(pack_timeline, png_frames, fmt, frame_duration_ms)
+
+
+async def build_image_reads(images: Sequence[ImageModel]) -> list[ImageRead]:
+    """Serializes screenshots with presigned URLs, signing the whole batch at once."""
+
+    urls = await s3_service.get_presigned_urls(image.s3_key for image in images)
+
+    responses = []
+    for image in images:
+        response = ImageRead.model_validate(image)
+        response.s3_url = urls.get(image.s3_key)
+        responses.append(response)
+    return responses
+
+
+# ── Dashboard ────────────────────────────────────────────────
+
+
+async def get_dashboard(session: AsyncSession, user_id: int) -> list[DashboardWorker]:
+    """
+    Every worker of the user with its latest task and latest screenshot, newest
+    worker first. One query: the latest rows come from LATERAL subqueries that walk
+    the (worker_id, created_at) indexes, and the screenshots are signed in one batch.
+    """
+
+    latest_task = (
+        select(
+            TaskModel.id,
+            TaskModel.prompt,
+            TaskModel.status,
+            TaskModel.created_at,
+            TaskModel.finished_at,
+        )
+        .where(TaskModel.worker_id == WorkerModel.id)
+        .order_by(TaskModel.created_at.desc(), TaskModel.id.desc())
+        .limit(1)
+        .lateral("latest_task")
+    )
+    latest_image = (
+        select(ImageModel.id, ImageModel.task_id, ImageModel.s3_key, ImageModel.created_at)
+        .where(ImageModel.worker_id == WorkerModel.id)
+        .order_by(ImageModel.created_at.desc(), ImageModel.id.desc())
+        .limit(1)
+        .lateral("latest_image")
+    )
+
+    stmt = (
+        select(
+            WorkerModel.id,
+            WorkerModel.name,
+            WorkerModel.status,
+            WorkerModel.resource_class,
+            WorkerModel.provisioning_phase,
+            WorkerModel.container_id,
+            WorkerModel.vnc_port,
+            latest_task.c.id.label("task_id"),
+            latest_task.c.prompt.label("task_prompt"),
+            latest_task.c.status.label("task_status"),
+            latest_task.c.created_at.label("task_created_at"),
+            latest_task.c.finished_at.label("task_finished_at"),
+            latest_image.c.id.label("image_id"),
+            latest_image.c.task_id.label("image_task_id"),
+            latest_image.c.s3_key.label("image_s3_key"),
+            latest_image.c.created_at.label("image_created_at"),
+        )
+        .select_from(WorkerModel)
+        .outerjoin(latest_task, true())
+        .outerjoin(latest_image, true())
+        .where(WorkerModel.user_id == user_id)
+        .order_by(WorkerModel.created_at.desc(), WorkerModel.id.desc())
+    )
+    rows = (await session.execute(stmt)).all()
+
+    urls = await s3_service.get_presigned_urls(
+        row.image_s3_key for row in rows if row.image_s3_key
+    )
+
+    dashboard = []
+    for row in rows:
+        latest_task_read = None
+        if row.task_id is not None:
+            latest_task_read = DashboardTask(
+                id=row.task_id,
+                prompt=row.task_prompt,
+                status=row.task_status,
+                created_at=row.task_created_at,
+                finished_at=row.task_finished_at,
+            )
+
+        latest_screenshot = None
+        if row.image_id is not None:
+            latest_screenshot = ImageRead(
+                id=row.image_id,
+                s3_url=urls.get(row.image_s3_key),
+                worker_id=row.id,
+                task_id=row.image_task_id,
+                created_at=row.image_created_at,
+            )
+
+        dashboard.append(
+            DashboardWorker(
+                id=row.id,
+                name=row.name,
+                status=row.status,
+                resource_class=row.resource_class,
+                provisioning_phase=row.provisioning_phase,
+                container_id=row.container_id,
+                vnc_port=row.vnc_port,
+                latest_task=latest_task_read,
+                latest_screenshot=latest_screenshot,
+            )
+        )
+    return dashboard
+
+
+# ── Usage ────────────────────────────────────────────────────
+
+
+async def get_task_usage(
+    session: AsyncSession, task_id: int, user_id: int
+) -> TaskUsageModel:
+    """Peak and average container usage recorded while the task was processing."""
+
+    await get_task(session, task_id, user_id)
+
+    usage = await session.get(TaskUsageModel, task_id)
+    if not usage:
+        raise UsageNotFound("No usage was recorded for this task.")
+    return usage
+
+
+async def get_worker_usage(
+    session: AsyncSession,
+    worker_id: int,
+    user_id: int,
+    since: datetime,
+    until: datetime | None = None,
+) -> Sequence[WorkerUsageModel]:
+    """Per-minute usage series of a worker container, oldest first."""
+
+    await get_worker(session, worker_id, user_id)
+
+    stmt = select(WorkerUsageModel).where(
+        WorkerUsageModel.worker_id == worker_id, WorkerUsageModel.minute >= since
+    )
+    if until:
+        stmt = stmt.where(WorkerUsageModel.minute < until)
+
+    result = await session.execute(stmt.order_by(WorkerUsageModel.minute.asc()))
+    return result.scalars().all()
@@ -1,29 +1,77 @@
 import os
 
-import docker
 import logging
-from typing import Tuple, Optional
-from docker.models.containers import Container
-from docker.errors import APIError, NotFound
+from typing import TYPE_CHECKING, Tuple, Optional
+
+# docker-py is imported on first use: the API process imports this module but
+# only talks to Docker on a few endpoints.
+if TYPE_CHECKING:
+    from docker.models.containers import Container
 
 logger = logging.getLogger(__name__)
 
+# Containers are named factory_worker_{worker_id}_{user_id}
+WORKER_CONTAINER_PREFIX = "factory_worker_"
+
+CPU_PERIOD_US = 100_000
+
+
+def is_not_found(error: BaseException) -> bool:
+    """Whether a Docker call failed because the container (or image) does not exist."""
+    from docker.errors import NotFound
+
+    return isinstance(error, NotFound)
+
+
+def limits_kwargs(cpus: float, memory_mb: int) -> dict:
+    """
+    CPU and memory limits as container run/update arguments.
+    cpu_quota is used instead of nano_cpus because only the quota can be changed
+    on a running container; swap is disabled by pinning memswap to the memory limit.
+    """
+    return {
+        "cpu_period": CPU_PERIOD_US,
+        "cpu_quota": int(cpus * CPU_PERIOD_US),
+        "mem_limit": f"{memory_mb}m",
+        "memswap_limit": f"{memory_mb}m",
+    }
+
 
 class DockerService:
     def __init__(self):
+        import docker
+
         try:
             self.client = docker.from_env()
         except Exception as e:
             logger.error(f"Failed to connect to Docker Daemon: {e}")
             raise
 
+    @staticmethod
+    def _agent_volumes() -> dict:
+        host_absolute_path = f"{os.getenv("HOST_PROJECT_PATH")}/agent_code_shared"
+        return {
+            host_absolute_path: {
+                "bind": "/home/kasm-user/agent",
+                "mode": "rw"
+            }
+        }
+
     def create_kasm_worker(
-        self, worker_name: str, vnc_password: str
+        self,
+        worker_name: str,
+        vnc_password: str,
+        image: str,
+        shm_size: str,
+        cpus: float,
+        memory_mb: int,
     ) -> Tuple[str, int]:
         """
         Starts the KasmVNC container.
         Returns: (container_id, mapped_host_port)
         """
+        from docker.errors import APIError
+
         try:
             env_vars = {
                 "VNC_USER": "kasm_user",
@@ -32,26 +80,17 @@ class DockerService:
                 "APP_ARGS": "--no-sandbox",
             }
 
-            host_absolute_path = f"{os.getenv("HOST_PROJECT_PATH")}/agent_code_shared"
-            volumes = {
-                host_absolute_path: {
-                    "bind": "/home/kasm-user/agent",
-                    "mode": "rw"
-                }
-            }
-
             container: Container = self.client.containers.run(
-                image="custom-kasm-worker:latest",
+                image=image,
                 name=worker_name,
                 detach=True,
                 ports={"6901/tcp": None},
                 environment=env_vars,
-                shm_size="512m",
-                mem_limit="1500m",
-                nano_cpus=1000000000,
-                volumes=volumes,
+                shm_size=shm_size,
+                volumes=self._agent_volumes(),
                 network="worker_factory_default",
                 restart_policy={"Name": "on-failure", "MaximumRetryCount": 3},
+                **limits_kwargs(cpus, memory_mb),
             )
 
             container.reload()
@@ -78,7 +117,43 @@ class DockerService:
             logger.error(f"Unexpected error creating worker: {e}")
             raise
 
+    def create_cli_worker(
+        self, worker_name: str, image: str, shm_size: str, cpus: float, memory_mb: int
+    ) -> str:
+        """
+        Starts a headless worker: no VNC server, no desktop, nothing listening.
+        The container only idles until tasks are exec'd into it.
+        Returns: container_id
+        """
+        from docker.errors import APIError
+
+        try:
+            container: Container = self.client.containers.run(
+                image=image,
+                name=worker_name,
+                command=["sleep", "infinity"],
+                detach=True,
+                init=True,
+                shm_size=shm_size,
+                volumes=self._agent_volumes(),
+                network="worker_factory_default",
+                restart_policy={"Name": "on-failure", "MaximumRetryCount": 3},
+                **limits_kwargs(cpus, memory_mb),
+            )
+
+            logger.info(f"Headless worker {worker_name} started")
+            return container.id
+
+        except APIError as e:
+            logger.error(f"Docker API Error: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error creating worker: {e}")
+            raise
+
     def stop_worker(self, container_id: str):
+        from docker.errors import APIError, NotFound
+
         try:
             container: Container = self.client.containers.get(container_id)
             container.stop(timeout=5)
@@ -90,6 +165,32 @@ class DockerService:
             logger.error(f"Error stopping worker {container_id}: {e}")
             raise
 
+    def update_limits(self, container_id: str, cpus: float, memory_mb: int):
+        """Changes CPU quota and memory limit of a running container in place."""
+        container: Container = self.client.containers.get(container_id)
+        container.update(**limits_kwargs(cpus, memory_mb))
+
+    def list_factory_containers(self) -> list["Container"]:
+        """All worker containers on the host, running or not."""
+        return self.client.containers.list(
+            all=True, filters={"name": WORKER_CONTAINER_PREFIX}
+        )
+
+    def remove_container(self, container_id: str):
+        """Force-removes a container, running or not. Missing containers are ignored."""
+        from docker.errors import NotFound
+
+        try:
+            self.client.containers.get(container_id).remove(force=True)
+            logger.info(f"Container {container_id} removed.")
+        except NotFound:
+            logger.warning(f"Container {container_id} already removed.")
+
+    def prune_dangling_images(self) -> int:
+        """Removes untagged images left behind by rebuilds. Returns bytes reclaimed."""
+        result = self.client.images.prune(filters={"dangling": True})
+        return result.get("SpaceReclaimed") or 0
+
     def execute_command(
         self, container_id: str, command: str, user: str = "kasm-user", check: bool = True
     ) -> str:
@@ -97,6 +198,8 @@ class DockerService:
         Executes a command inside a container.
         If check=True (default), raises RuntimeError on non-zero exit codes.
         """
+        from docker.errors import NotFound
+
         try:
             container: Container = self.client.containers.get(container_id)
 
@@ -0,0 +1,133 @@
+"""
+Long-running consumer of the Docker events stream that keeps WorkerModel.status
+in line with what actually happens to worker containers (crashes, OOM kills,
+restarts by the restart policy, health checks), without polling Docker per request.
+
+Run as its own process: python -m app.worker.events_listener
+"""
+import logging
+import time
+
+from sqlalchemy import or_, update
+
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.db.session import SessionLocal
+from app.models.worker import ProvisioningPhase, WorkerModel, WorkerStatus
+from app.worker.docker_service import get_docker_service, WORKER_CONTAINER_PREFIX
+from app.worker.status_cache import mark_worker_changed
+
+logger = logging.getLogger(__name__)
+
+RUNNING_STATUSES = (WorkerStatus.STARTING, WorkerStatus.IDLE, WorkerStatus.BUSY)
+
+# Exit codes of a requested stop: clean exit, SIGTERM, SIGKILL after the stop timeout
+STOP_EXIT_CODES = ("0", "143", "137")
+
+# action -> (new status, statuses it may replace). "start" never touches STARTING or
+# BUSY: provisioning and running tasks own those transitions. A container event
+# never makes a worker IDLE unless its provisioning finished (see _ready).
+TRANSITIONS = {
+    "oom": (WorkerStatus.ERROR, RUNNING_STATUSES),
+    "stop": (WorkerStatus.OFFLINE, RUNNING_STATUSES),
+    "pause": (WorkerStatus.OFFLINE, RUNNING_STATUSES),
+    "start": (WorkerStatus.IDLE, (WorkerStatus.OFFLINE, WorkerStatus.ERROR)),
+    "unpause": (WorkerStatus.IDLE, (WorkerStatus.OFFLINE,)),
+    "health_status: unhealthy": (WorkerStatus.ERROR, RUNNING_STATUSES),
+    "health_status: healthy": (WorkerStatus.IDLE, (WorkerStatus.ERROR,)),
+}
+
+EVENT_FILTERS = {
+    "type": "container",
+    "event": ["die", "oom", "start", "stop", "pause", "unpause", "health_status"],
+}
+
+
+def _transition(event: dict) -> tuple[WorkerStatus, tuple] | None:
+    action = event.get("Action") or event.get("status", "")
+    if action == "die":
+        exit_code = event["Actor"]["Attributes"].get("exitCode", "")
+        # An OOM kill also exits with 137, but its "oom" event arrives first
+        # and ERROR is never downgraded to OFFLINE.
+        if exit_code in STOP_EXIT_CODES:
+            return WorkerStatus.OFFLINE, RUNNING_STATUSES
+        return WorkerStatus.ERROR, RUNNING_STATUSES
+    return TRANSITIONS.get(action)
+
+
+def _ready():
+    """
+    Workers that may accept tasks once their container runs: provisioning READY,
+    or no phase at all (provisioned before phases were recorded). A worker whose
+    provisioning FAILED stays in ERROR even if its container comes back.
+    """
+    return or_(
+        WorkerModel.provisioning_phase == ProvisioningPhase.READY,
+        WorkerModel.provisioning_phase.is_(None),
+    )
+
+
+def apply_event(event: dict) -> bool:
+    """Applies one container event to its worker row. Returns True if the status changed."""
+    name = event.get("Actor", {}).get("Attributes", {}).get("name", "")
+    if not name.startswith(WORKER_CONTAINER_PREFIX):
+        return False
+
+    transition = _transition(event)
+    if transition is None:
+        return False
+    new_status, allowed_from = transition
+
+    conditions = [
+        WorkerModel.container_id == event["id"],
+        WorkerModel.status.in_(allowed_from),
+    ]
+    if new_status == WorkerStatus.IDLE:
+        conditions.append(_ready())
+
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(WorkerModel)
+            .where(*conditions)
+            .values(status=new_status)
+            .returning(WorkerModel.id, WorkerModel.user_id)
+        )
+        changed = result.all()
+        db.commit()
+    finally:
+        db.close()
+
+    for worker_id, user_id in changed:
+        logger.info(f"Worker {worker_id}: {event.get('Action')} -> {new_status.value}")
+        mark_worker_changed(user_id, worker_id)
+    return bool(changed)
+
+
+def listen_forever() -> None:
+    """
+    Consumes the event stream, reconnecting after errors. On reconnect the stream
+    resumes from the last seen event, so nothing that happened in between is lost.
+    """
+    since = None
+    while True:
+        try:
+            client = get_docker_service().client
+            for event in client.events(decode=True, since=since, filters=EVENT_FILTERS):
+                since = event.get("time", since)
+                try:
+                    if apply_event(event):
+                        incr(f'docker_events_applied_total{{action="{event.get("Action")}"}}')
+                except Exception as e:
+                    incr("docker_events_errors_total")
+                    logger.error(f"Failed to apply Docker event {event.get('Action')}: {e}")
+                set_gauge("docker_events_last_seen_timestamp", time.time())
+        except Exception as e:
+            logger.error(f"Docker event stream dropped: {e}")
+
+        time.sleep(settings.EVENTS_RECONNECT_SECONDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    listen_forever()
@@ -0,0 +1,200 @@
+"""
+Worker resource classes and dynamic CPU/memory sizing of worker containers.
+
+Each ResourceClass maps to a WorkerProfile: image, whether it runs a desktop
+(KasmVNC, Chrome) and its idle/boost limits. Workers run at their idle limits and are boosted with container.update while a
+task executes. The extra resources a boost takes (boost minus idle) come out of
+a host-wide budget kept in Redis, reserved and released by Lua scripts so that
+concurrent Celery processes can never oversubscribe the node. A worker that
+can't get budget simply runs its task at idle limits.
+"""
+import logging
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.metrics import incr, set_gauge
+from app.core.redis import get_redis
+from app.models.worker import ResourceClass
+from app.worker.docker_service import get_docker_service, is_not_found
+
+logger = logging.getLogger(__name__)
+
+# worker_id -> "<cpu millicores>:<memory MB>" held by its boost
+BOOSTS_KEY = "resources:boosts"
+# "cpu" / "memory": totals of all held boosts
+BOOST_TOTALS_KEY = "resources:boost_totals"
+
+RESERVE_SCRIPT = """
+local cpu = tonumber(redis.call('HGET', KEYS[2], 'cpu') or '0')
+local memory = tonumber(redis.call('HGET', KEYS[2], 'memory') or '0')
+-- A share still held by this worker (e.g. memory that couldn't shrink) is replaced
+local held = redis.call('HGET', KEYS[1], ARGV[1])
+if held then
+    local sep = string.find(held, ':')
+    cpu = cpu - tonumber(string.sub(held, 1, sep - 1))
+    memory = memory - tonumber(string.sub(held, sep + 1))
+end
+cpu = cpu + tonumber(ARGV[2])
+memory = memory + tonumber(ARGV[3])
+if cpu > tonumber(ARGV[4]) or memory > tonumber(ARGV[5]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. ARGV[3])
+redis.call('HSET', KEYS[2], 'cpu', cpu, 'memory', memory)
+return 1
+"""
+
+# ARGV[2] == 'cpu' releases only the CPU share and keeps the memory share held
+RELEASE_SCRIPT = """
+local held = redis.call('HGET', KEYS[1], ARGV[1])
+if not held then
+    return 0
+end
+local sep = string.find(held, ':')
+local cpu = tonumber(string.sub(held, 1, sep - 1))
+local memory = tonumber(string.sub(held, sep + 1))
+redis.call('HINCRBY', KEYS[2], 'cpu', -cpu)
+if ARGV[2] == 'cpu' then
+    redis.call('HSET', KEYS[1], ARGV[1], '0:' .. memory)
+else
+    redis.call('HINCRBY', KEYS[2], 'memory', -memory)
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    cpus: float
+    memory_mb: int
+
+
+@dataclass(frozen=True)
+class WorkerProfile:
+    image: str
+    # KasmVNC desktop with Chrome; headless workers have no VNC port and no screenshots
+    desktop: bool
+    idle: ResourceLimits
+    boost: ResourceLimits
+    shm_size: str
+
+
+def worker_profile(resource_class: ResourceClass | str) -> WorkerProfile:
+    desktop_idle = ResourceLimits(settings.WORKER_IDLE_CPUS, settings.WORKER_IDLE_MEMORY_MB)
+    desktop_boost = ResourceLimits(settings.WORKER_BOOST_CPUS, settings.WORKER_BOOST_MEMORY_MB)
+
+    if resource_class == ResourceClass.HEADLESS_CLI:
+        return WorkerProfile(
+            image=settings.CLI_WORKER_IMAGE,
+            desktop=False,
+            idle=ResourceLimits(settings.HEADLESS_IDLE_CPUS, settings.HEADLESS_IDLE_MEMORY_MB),
+            boost=ResourceLimits(settings.HEADLESS_BOOST_CPUS, settings.HEADLESS_BOOST_MEMORY_MB),
+            shm_size="64m",
+        )
+    if resource_class == ResourceClass.DESKTOP_LARGE:
+        return WorkerProfile(
+            image=settings.DESKTOP_WORKER_IMAGE,
+            desktop=True,
+            idle=ResourceLimits(desktop_idle.cpus * 2, desktop_idle.memory_mb * 2),
+            boost=ResourceLimits(desktop_boost.cpus * 2, desktop_boost.memory_mb * 2),
+            shm_size="1g",
+        )
+    return WorkerProfile(
+        image=settings.DESKTOP_WORKER_IMAGE,
+        desktop=True,
+        idle=desktop_idle,
+        boost=desktop_boost,
+        shm_size="512m",
+    )
+
+
+def _reserve(worker_id: int, cpu_millis: int, memory_mb: int) -> bool:
+    redis_client = get_redis()
+    reserved = redis_client.eval(
+        RESERVE_SCRIPT,
+        2,
+        BOOSTS_KEY,
+        BOOST_TOTALS_KEY,
+        worker_id,
+        cpu_millis,
+        memory_mb,
+        int(settings.HOST_BOOST_CPUS * 1000),
+        settings.HOST_BOOST_MEMORY_MB,
+    )
+    return bool(reserved)
+
+
+def _release(worker_id: int, cpu_only: bool = False) -> None:
+    get_redis().eval(
+        RELEASE_SCRIPT, 2, BOOSTS_KEY, BOOST_TOTALS_KEY, worker_id, "cpu" if cpu_only else "all"
+    )
+
+
+def _report_budget() -> None:
+    try:
+        totals = get_redis().hgetall(BOOST_TOTALS_KEY)
+    except Exception as e:
+        logger.warning(f"Boost budget not reported: {e}")
+        return
+    set_gauge("resource_boost_cpus_held", int(totals.get("cpu", 0)) / 1000)
+    set_gauge("resource_boost_memory_mb_held", int(totals.get("memory", 0)))
+
+
+def boost_worker(worker_id: int, container_id: str, resource_class: ResourceClass | str) -> bool:
+    """Raises a container to its boost limits if the host budget allows. Never raises."""
+    profile = worker_profile(resource_class)
+    idle, boost = profile.idle, profile.boost
+    try:
+        cpu_millis = int((boost.cpus - idle.cpus) * 1000)
+        memory_mb = boost.memory_mb - idle.memory_mb
+        if not _reserve(worker_id, cpu_millis, memory_mb):
+            incr("resource_boost_denied_total")
+            return False
+
+        try:
+            get_docker_service().update_limits(container_id, boost.cpus, boost.memory_mb)
+        except Exception:
+            _release(worker_id)
+            raise
+
+        incr("resource_boosts_total")
+        _report_budget()
+        return True
+    except Exception as e:
+        logger.warning(f"Worker {worker_id} not boosted: {e}")
+        return False
+
+
+def release_worker(
+    worker_id: int, container_id: str | None, resource_class: ResourceClass | str
+) -> None:
+    """
+    Brings a boosted container back to idle limits and returns its budget.
+    If memory can't shrink (the container still uses more than the idle limit),
+    only the CPU share is returned; the next release attempt retries the memory.
+    """
+    profile = worker_profile(resource_class)
+    idle = profile.idle
+    try:
+        if container_id:
+            try:
+                get_docker_service().update_limits(container_id, idle.cpus, idle.memory_mb)
+            except Exception as e:
+                if not is_not_found(e):
+                    logger.warning(f"Worker {worker_id} memory not shrunk: {e}")
+                    get_docker_service().update_limits(
+                        container_id, idle.cpus, profile.boost.memory_mb
+                    )
+                    _release(worker_id, cpu_only=True)
+                    return
+
+        _release(worker_id)
+    except Exception as e:
+        logger.warning(f"Worker {worker_id} boost not released: {e}")
+    finally:
+        _report_budget()
+
+
+def boosted_worker_ids() -> set[int]:
+    return {int(worker_id) for worker_id in get_redis().hkeys(BOOSTS_KEY)}
@@ -0,0 +1,187 @@
+"""
+Redis version counters of workers and tasks, the cache of the per-user worker
+list served by GET /workers, and the ETags derived from the counters.
+
+Every change to a user's workers (status, container, create/delete, their tasks)
+bumps the user's list generation and the version of each changed worker; task
+changes bump the task's version. Cached pages carry the generation they were
+built from, so a page rendered from a read that raced a status change is never
+served after it. ETags are built from the same counters, so conditional GETs are
+answered without touching the database.
+Whoever changes a worker calls mark_worker_changed / amark_worker_changed after
+commit, and mark_task_changed / amark_task_changed for a task; bulk task deletes
+(retention purge, partition drops) call mark_tasks_deleted.
+
+Counters start at a random value rather than 0: if one is lost (eviction, Redis
+restart, TTL) it restarts somewhere else, so an ETag from before can't match again.
+Cache errors never raise: on failure the data is simply read from the database.
+"""
+import hashlib
+import logging
+import secrets
+from collections import defaultdict
+from collections.abc import Iterable
+
+from app.core.config import settings
+from app.core.redis import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+LIST_GENERATION_KEY = "workers:list_gen:{user_id}"
+LIST_PAGES_KEY = "workers:list:{user_id}"
+WORKER_VERSION_KEY = "workers:version:{worker_id}"
+TASK_VERSION_KEY = "tasks:version:{task_id}"
+
+# Task versions bumped per pipeline by mark_tasks_deleted
+BUMP_CHUNK_SIZE = 1000
+
+
+def _seed() -> int:
+    return secrets.randbits(62)
+
+
+def _bump(pipe, key: str) -> None:
+    pipe.set(key, _seed(), nx=True, ex=settings.ETAG_VERSION_TTL_SECONDS)
+    pipe.incr(key)
+    pipe.expire(key, settings.ETAG_VERSION_TTL_SECONDS)
+
+
+def _worker_keys(user_id: int, worker_ids) -> list[str]:
+    return [LIST_GENERATION_KEY.format(user_id=user_id)] + [
+        WORKER_VERSION_KEY.format(worker_id=worker_id) for worker_id in worker_ids
+    ]
+
+
+def mark_worker_changed(user_id: int, *worker_ids: int) -> None:
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in _worker_keys(user_id, worker_ids):
+            _bump(pipe, key)
+        pipe.delete(LIST_PAGES_KEY.format(user_id=user_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Worker list cache of user {user_id} not invalidated: {e}")
+
+
+async def amark_worker_changed(user_id: int, *worker_ids: int) -> None:
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        for key in _worker_keys(user_id, worker_ids):
+            _bump(pipe, key)
+        pipe.delete(LIST_PAGES_KEY.format(user_id=user_id))
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Worker list cache of user {user_id} not invalidated: {e}")
+
+
+def mark_task_changed(*task_ids: int) -> None:
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for task_id in task_ids:
+            _bump(pipe, TASK_VERSION_KEY.format(task_id=task_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Versions of tasks {task_ids} not bumped: {e}")
+
+
+def mark_tasks_deleted(rows: Iterable[tuple[int, int, int]]) -> None:
+    """
+    After commit of a bulk task delete: rows are (task_id, worker_id, user_id).
+    Bumps every deleted task, so its old ETag stops matching, and every worker
+    that lost tasks, whose detail lists them.
+    """
+    task_ids = []
+    workers_by_user = defaultdict(set)
+    for task_id, worker_id, user_id in rows:
+        task_ids.append(task_id)
+        workers_by_user[user_id].add(worker_id)
+
+    for i in range(0, len(task_ids), BUMP_CHUNK_SIZE):
+        mark_task_changed(*task_ids[i:i + BUMP_CHUNK_SIZE])
+    for user_id, worker_ids in workers_by_user.items():
+        mark_worker_changed(user_id, *worker_ids)
+
+
+async def amark_task_changed(*task_ids: int) -> None:
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        for task_id in task_ids:
+            _bump(pipe, TASK_VERSION_KEY.format(task_id=task_id))
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Versions of tasks {task_ids} not bumped: {e}")
+
+
+async def _aget_version(key: str) -> str | None:
+    """Current value of a counter, seeding it if missing. None if Redis is unavailable."""
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        pipe.set(key, _seed(), nx=True, ex=settings.ETAG_VERSION_TTL_SECONDS)
+        pipe.get(key)
+        _, version = await pipe.execute()
+        return version
+    except Exception as e:
+        logger.warning(f"Version counter {key} unavailable: {e}")
+        return None
+
+
+async def aworker_etag(worker_id: int) -> str | None:
+    """ETag of GET /workers/{worker_id}; read it before the database."""
+    version = await _aget_version(WORKER_VERSION_KEY.format(worker_id=worker_id))
+    return f'W/"w{worker_id}.{version}"' if version else None
+
+
+async def atask_etag(task_id: int) -> str | None:
+    """ETag of GET /tasks/{task_id}; read it before the database."""
+    version = await _aget_version(TASK_VERSION_KEY.format(task_id=task_id))
+    return f'W/"t{task_id}.{version}"' if version else None
+
+
+def worker_list_etag(generation: str, page_key: str) -> str:
+    page_digest = hashlib.sha1(page_key.encode()).hexdigest()[:12]
+    return f'W/"l{generation}.{page_digest}"'
+
+
+async def aget_worker_list_page(
+    user_id: int, page_key: str
+) -> tuple[str | None, tuple[str, str | None] | None]:
+    """
+    Returns (generation, page) where page is (items_json, next_cursor) on a hit.
+    The generation must be read before the database, pass it to acache_worker_list_page.
+    """
+    generation_key = LIST_GENERATION_KEY.format(user_id=user_id)
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        pipe.set(generation_key, _seed(), nx=True, ex=settings.ETAG_VERSION_TTL_SECONDS)
+        pipe.get(generation_key)
+        pipe.hget(LIST_PAGES_KEY.format(user_id=user_id), page_key)
+        _, generation, cached = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Worker list cache unavailable: {e}")
+        return None, None
+
+    if not cached:
+        return generation, None
+
+    # "<generation>|<next cursor or empty>|<items json>"; cursors never contain "|"
+    cached_generation, next_cursor, items_json = cached.split("|", 2)
+    if cached_generation != generation:
+        return generation, None
+    return generation, (items_json, next_cursor or None)
+
+
+async def acache_worker_list_page(
+    user_id: int,
+    page_key: str,
+    generation: str,
+    items_json: str,
+    next_cursor: str | None,
+) -> None:
+    key = LIST_PAGES_KEY.format(user_id=user_id)
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        pipe.hset(key, page_key, f"{generation}|{next_cursor or ''}|{items_json}")
+        pipe.expire(key, settings.WORKER_LIST_CACHE_TTL_SECONDS)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Worker list page not cached: {e}")
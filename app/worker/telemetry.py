@@ -0,0 +1,129 @@
+"""
+Container resource sampling for worker usage history.
+
+Stats are read with one_shot=True, which returns immediately instead of waiting
+a second for Docker to collect a second CPU reading, and all containers are
+sampled concurrently. CPU percent and I/O are therefore computed here as deltas
+against the previous sample of the same container, kept in Redis.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.worker.docker_service import get_docker_service
+
+logger = logging.getLogger(__name__)
+
+PREVIOUS_SAMPLE_KEY = "telemetry:prev:{container_id}"
+
+COUNTERS = ("block_read_bytes", "block_write_bytes", "net_rx_bytes", "net_tx_bytes")
+
+
+def _read_stats(container_id: str) -> dict | None:
+    try:
+        return get_docker_service().client.api.stats(
+            container_id, stream=False, one_shot=True
+        )
+    except Exception as e:
+        logger.warning(f"Stats of container {container_id} unavailable: {e}")
+        return None
+
+
+def parse_stats(raw: dict) -> dict:
+    """Flattens a Docker stats payload into cumulative counters and point-in-time gauges."""
+    cpu = raw.get("cpu_stats") or {}
+    cpu_usage = cpu.get("cpu_usage") or {}
+    memory = raw.get("memory_stats") or {}
+    memory_details = memory.get("stats") or {}
+
+    # Same as `docker stats`: page cache that can be reclaimed is not counted
+    inactive_file = memory_details.get(
+        "inactive_file", memory_details.get("total_inactive_file", 0)
+    )
+
+    block_read = block_write = 0
+    for entry in (raw.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = entry.get("op", "").lower()
+        if op == "read":
+            block_read += entry.get("value", 0)
+        elif op == "write":
+            block_write += entry.get("value", 0)
+
+    networks = (raw.get("networks") or {}).values()
+
+    return {
+        "cpu_total": cpu_usage.get("total_usage", 0),
+        "system_cpu": cpu.get("system_cpu_usage", 0),
+        "online_cpus": cpu.get("online_cpus") or len(cpu_usage.get("percpu_usage") or [0]),
+        "memory_bytes": max(memory.get("usage", 0) - inactive_file, 0),
+        "pids": (raw.get("pids_stats") or {}).get("current", 0),
+        "block_read_bytes": block_read,
+        "block_write_bytes": block_write,
+        "net_rx_bytes": sum(network.get("rx_bytes", 0) for network in networks),
+        "net_tx_bytes": sum(network.get("tx_bytes", 0) for network in networks),
+    }
+
+
+def usage_since(previous: dict, current: dict) -> dict | None:
+    """
+    Usage between two samples of one container. None when there is no usable
+    previous sample, e.g. the first one or after a restart reset the counters.
+    """
+    system_delta = current["system_cpu"] - previous["system_cpu"]
+    cpu_delta = current["cpu_total"] - previous["cpu_total"]
+    counter_deltas = {name: current[name] - previous[name] for name in COUNTERS}
+
+    if system_delta <= 0 or cpu_delta < 0 or min(counter_deltas.values()) < 0:
+        return None
+
+    return {
+        "cpu_percent": cpu_delta / system_delta * current["online_cpus"] * 100.0,
+        "memory_bytes": current["memory_bytes"],
+        "pids": current["pids"],
+        **counter_deltas,
+    }
+
+
+def sample_containers(container_ids: list[str]) -> dict[str, dict]:
+    """
+    Samples all containers in one pass. Returns container_id -> usage since the
+    previous pass, for containers that have one.
+    """
+    if not container_ids:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=settings.TELEMETRY_STATS_CONCURRENCY) as pool:
+        raw_stats = dict(zip(container_ids, pool.map(_read_stats, container_ids)))
+
+    current = {
+        container_id: parse_stats(raw)
+        for container_id, raw in raw_stats.items()
+        if raw and raw.get("cpu_stats")
+    }
+    if not current:
+        return {}
+
+    redis_client = get_redis()
+    ids = list(current)
+    previous_values = redis_client.mget(
+        [PREVIOUS_SAMPLE_KEY.format(container_id=container_id) for container_id in ids]
+    )
+
+    pipe = redis_client.pipeline(transaction=False)
+    for container_id in ids:
+        pipe.set(
+            PREVIOUS_SAMPLE_KEY.format(container_id=container_id),
+            json.dumps(current[container_id]),
+            ex=settings.TELEMETRY_SAMPLE_SECONDS * 4,
+        )
+    pipe.execute()
+
+    usage = {}
+    for container_id, previous in zip(ids, previous_values):
+        if previous:
+            delta = usage_since(json.loads(previous), current[container_id])
+            if delta:
+                usage[container_id] = delta
+    return usage
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+
+from redis.exceptions import LockError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.s3 import s3_service
+from app.core.utils import (
+    SCREENSHOT_CAPTURE_LOCK,
+    grab_desktop_png,
+    fingerprint_screenshot,
+    is_same_screen,
+    screenshot_object_key,
+)
+from app.db.session import SessionLocal
+from app.models.worker import ImageModel
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineRecorder:
+    """
+    Records a screenshot timeline for a running task in a background thread.
+
+    A frame is captured every TIMELINE_INTERVAL_SECONDS while the agent runs and
+    once more on stop(). Frames whose fingerprint matches the previous frame are
+    dropped, the rest are uploaded to S3 and linked to the task.
+    Frames take the worker's capture lease like API screenshots: a periodic frame
+    is skipped while another capture holds it, the final one waits for it.
+    Capture errors are logged and never propagate into the task itself.
+    """
+
+    def __init__(self, task_id: int, worker_id: int, container_id: str):
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.container_id = container_id
+        self.frames_saved = 0
+
+        self._last_fingerprint: tuple[str, str] | None = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"timeline-task-{task_id}", daemon=True
+        )
+
+    def start(self) -> "TimelineRecorder":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Requests the final frame and waits for the recorder thread to finish."""
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(settings.TIMELINE_INTERVAL_SECONDS):
+            if self.frames_saved >= settings.TIMELINE_MAX_FRAMES:
+                break
+            self._capture_frame()
+
+        # Final frame: the state the agent left the desktop in
+        self._capture_frame(wait=True)
+
+    def _grab(self, wait: bool) -> bytes | None:
+        """Captures the desktop under the worker's capture lease; None if it is busy."""
+        lock = get_redis().lock(
+            SCREENSHOT_CAPTURE_LOCK.format(worker_id=self.worker_id),
+            timeout=settings.SCREENSHOT_CAPTURE_LEASE_SECONDS,
+        )
+        acquired = lock.acquire(
+            blocking=wait, blocking_timeout=settings.SCREENSHOT_CAPTURE_LEASE_SECONDS
+        )
+        if not acquired:
+            return None
+        try:
+            return grab_desktop_png(self.container_id)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+
+    def _capture_frame(self, wait: bool = False) -> None:
+        try:
+            png_bytes = self._grab(wait)
+            if png_bytes is None:
+                logger.info(f"Timeline frame for task {self.task_id} skipped: capture in progress")
+                return
+            fingerprint = fingerprint_screenshot(png_bytes)
+
+            if self._last_fingerprint and is_same_screen(
+                *fingerprint, *self._last_fingerprint
+            ):
+                return
+
+            object_key = screenshot_object_key(self.worker_id)
+            if not asyncio.run(s3_service.upload_bytes(png_bytes, object_key)):
+                return
+
+            db = SessionLocal()
+            try:
+                db.add(
+                    ImageModel(
+                        worker_id=self.worker_id,
+                        task_id=self.task_id,
+                        s3_key=object_key,
+                        perceptual_hash=fingerprint[0],
+                        content_hash=fingerprint[1],
+                    )
+                )
+                db.commit()
+            finally:
+                db.close()
+
+            self._last_fingerprint = fingerprint
+            self.frames_saved += 1
+        except Exception as e:
+            logger.warning(f"Timeline frame for task {self.task_id} skipped: {e}")
@@ -0,0 +1,28 @@
+"""added worker resource class
+
+Revision ID: 0b6e9d47a3c1
+Revises: f83a1d6c25e9
+Create Date: 2026-10-19 16:21:05.918442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e9d47a3c1'
+down_revision: Union[str, Sequence[str], None] = 'f83a1d6c25e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workers', sa.Column('resource_class', sa.String(length=20), server_default='desktop', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workers', 'resource_class')
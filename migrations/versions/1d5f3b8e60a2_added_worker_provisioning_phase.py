@@ -0,0 +1,30 @@
+"""added worker provisioning phase
+
+Revision ID: 1d5f3b8e60a2
+Revises: 0b6e9d47a3c1
+Create Date: 2026-10-19 16:54:40.377215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d5f3b8e60a2'
+down_revision: Union[str, Sequence[str], None] = '0b6e9d47a3c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workers', sa.Column('provisioning_phase', sa.String(length=30), nullable=True))
+    op.add_column('workers', sa.Column('provisioning_error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workers', 'provisioning_error')
+    op.drop_column('workers', 'provisioning_phase')
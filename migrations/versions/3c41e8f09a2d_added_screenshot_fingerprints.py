@@ -0,0 +1,30 @@
+"""added screenshot fingerprints
+
+Revision ID: 3c41e8f09a2d
+Revises: 9e897f2fb99a
+Create Date: 2026-10-19 10:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c41e8f09a2d'
+down_revision: Union[str, Sequence[str], None] = '9e897f2fb99a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_images', sa.Column('perceptual_hash', sa.String(length=16), nullable=True))
+    op.add_column('task_images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('task_images', 'content_hash')
+    op.drop_column('task_images', 'perceptual_hash')
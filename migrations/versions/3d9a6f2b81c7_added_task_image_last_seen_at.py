@@ -0,0 +1,28 @@
+"""added task_image last_seen_at
+
+Revision ID: 3d9a6f2b81c7
+Revises: b71e3c9a40d5
+Create Date: 2026-10-20 11:04:17.240961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9a6f2b81c7'
+down_revision: Union[str, Sequence[str], None] = 'b71e3c9a40d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_images', sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('task_images', 'last_seen_at')
@@ -0,0 +1,28 @@
+"""added user token version
+
+Revision ID: 5f2b9d0c7e18
+Revises: 8c3e5a1f97d4
+Create Date: 2026-10-19 17:58:21.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b9d0c7e18'
+down_revision: Union[str, Sequence[str], None] = '8c3e5a1f97d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
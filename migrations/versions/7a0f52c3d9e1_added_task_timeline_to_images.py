@@ -0,0 +1,32 @@
+"""added task timeline to images
+
+Revision ID: 7a0f52c3d9e1
+Revises: 3c41e8f09a2d
+Create Date: 2026-10-19 11:03:27.550914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a0f52c3d9e1'
+down_revision: Union[str, Sequence[str], None] = '3c41e8f09a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_images', sa.Column('task_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(op.f('task_images_task_id_fkey'), 'task_images', 'tasks', ['task_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_task_images_task_id_created_at', 'task_images', ['task_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_images_task_id_created_at', table_name='task_images')
+    op.drop_constraint(op.f('task_images_task_id_fkey'), 'task_images', type_='foreignkey')
+    op.drop_column('task_images', 'task_id')
@@ -0,0 +1,41 @@
+"""added hot query indexes
+
+Revision ID: 8c3e5a1f97d4
+Revises: 1d5f3b8e60a2
+Create Date: 2026-10-19 17:31:06.582914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3e5a1f97d4'
+down_revision: Union[str, Sequence[str], None] = '1d5f3b8e60a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Partitioned tables can't build indexes CONCURRENTLY; both are partial and small
+    op.create_index('ix_tasks_worker_id_finished_at_completed', 'tasks', ['worker_id', sa.text('finished_at DESC')], unique=False, postgresql_where=sa.text("status = 'COMPLETED'"))
+    op.create_index('ix_tasks_worker_id_open', 'tasks', ['worker_id', 'created_at'], unique=False, postgresql_where=sa.text("status IN ('QUEUED', 'PROCESSING')"))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_workers_container_id', 'workers', ['container_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens', postgresql_concurrently=True)
+        op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens', postgresql_concurrently=True)
+        op.drop_index('ix_workers_container_id', table_name='workers', postgresql_concurrently=True)
+
+    op.drop_index('ix_tasks_worker_id_open', table_name='tasks')
+    op.drop_index('ix_tasks_worker_id_finished_at_completed', table_name='tasks')
@@ -0,0 +1,40 @@
+"""hashed refresh tokens
+
+Revision ID: a4d81f6e2c53
+Revises: 5f2b9d0c7e18
+Create Date: 2026-10-19 18:24:13.470291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d81f6e2c53'
+down_revision: Union[str, Sequence[str], None] = '5f2b9d0c7e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM refresh_tokens WHERE expires_at < now()")
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    # Same as hash_refresh_token(), so sessions survive the migration
+    op.execute("UPDATE refresh_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.create_unique_constraint('refresh_tokens_token_hash_key', 'refresh_tokens', ['token_hash'])
+    op.drop_constraint('refresh_tokens_token_key', 'refresh_tokens', type_='unique')
+    op.drop_column('refresh_tokens', 'token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Raw tokens can't be recovered from their hashes: every session ends
+    op.execute("DELETE FROM refresh_tokens")
+    op.add_column('refresh_tokens', sa.Column('token', sa.String(length=512), nullable=False))
+    op.create_unique_constraint('refresh_tokens_token_key', 'refresh_tokens', ['token'])
+    op.drop_constraint('refresh_tokens_token_hash_key', 'refresh_tokens', type_='unique')
+    op.drop_column('refresh_tokens', 'token_hash')
@@ -0,0 +1,34 @@
+"""store screenshot s3 keys
+
+Revision ID: b18d6e4c2f70
+Revises: 7a0f52c3d9e1
+Create Date: 2026-10-19 12:21:05.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b18d6e4c2f70'
+down_revision: Union[str, Sequence[str], None] = '7a0f52c3d9e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('task_images', 's3_url', new_column_name='s3_key')
+    # Old rows hold presigned URLs: https://<bucket>.s3.<region>.amazonaws.com/<key>?X-Amz-...
+    op.execute(
+        "UPDATE task_images "
+        "SET s3_key = regexp_replace(s3_key, '^https?://[^/]+/([^?]*).*$', '\\1') "
+        "WHERE s3_key LIKE 'http%'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('task_images', 's3_key', new_column_name='s3_url')
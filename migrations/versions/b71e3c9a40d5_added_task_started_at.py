@@ -0,0 +1,28 @@
+"""added task started_at
+
+Revision ID: b71e3c9a40d5
+Revises: a4d81f6e2c53
+Create Date: 2026-10-20 10:12:40.518322
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71e3c9a40d5'
+down_revision: Union[str, Sequence[str], None] = 'a4d81f6e2c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks', 'started_at')
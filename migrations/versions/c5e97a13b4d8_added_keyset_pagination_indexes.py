@@ -0,0 +1,35 @@
+"""added keyset pagination indexes
+
+Revision ID: c5e97a13b4d8
+Revises: b18d6e4c2f70
+Create Date: 2026-10-19 13:02:48.117350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e97a13b4d8'
+down_revision: Union[str, Sequence[str], None] = 'b18d6e4c2f70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps tasks/task_images writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tasks_worker_id_created_at_id', 'tasks', ['worker_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_images_worker_id_created_at_id', 'task_images', ['worker_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_workers_user_id_created_at_id', 'workers', ['user_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_workers_user_id_created_at_id', table_name='workers', postgresql_concurrently=True)
+        op.drop_index('ix_task_images_worker_id_created_at_id', table_name='task_images', postgresql_concurrently=True)
+        op.drop_index('ix_tasks_worker_id_created_at_id', table_name='tasks', postgresql_concurrently=True)
@@ -0,0 +1,28 @@
+"""added user task retention
+
+Revision ID: d2a8f61e07b3
+Revises: c5e97a13b4d8
+Create Date: 2026-10-19 14:10:36.482019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f61e07b3'
+down_revision: Union[str, Sequence[str], None] = 'c5e97a13b4d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('task_retention_days', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'task_retention_days')
@@ -0,0 +1,116 @@
+"""partitioned tasks and task_images
+
+Revision ID: e4b7c2a90f16
+Revises: d2a8f61e07b3
+Create Date: 2026-10-19 15:02:11.730945
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c2a90f16'
+down_revision: Union[str, Sequence[str], None] = 'd2a8f61e07b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Daily partitions created ahead of today; maintain_partitions keeps the window rolling
+PREMAKE_DAYS = 7
+# Daily partitions created for existing rows, at most. Older history (past any
+# default retention) is copied into the default partition, where the row-level
+# retention jobs purge it in batches, so the migration creates a bounded number
+# of tables in its single transaction however old the data is.
+BACKFILL_DAYS = 31
+
+
+def _rename_to_legacy(table: str) -> None:
+    # The sequence must outlive the legacy table, the new table keeps using it
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    op.execute(f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+
+
+def _finish_copy(table: str) -> None:
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_legacy")
+    op.execute(f"DROP TABLE {table}_legacy")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+
+def _partition(table: str, tz_aware: bool) -> None:
+    """
+    Converts `table` into a RANGE (created_at) partitioned table with daily
+    partitions from at most BACKFILL_DAYS ago to PREMAKE_DAYS ahead.
+    """
+    _rename_to_legacy(table)
+
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    day_expr = "(created_at AT TIME ZONE 'UTC')::date" if tz_aware else "created_at::date"
+    suffix = " 00:00:00+00" if tz_aware else " 00:00:00"
+    op.execute(f"""
+        DO $$
+        DECLARE
+            today date := (now() AT TIME ZONE 'UTC')::date;
+            day date;
+        BEGIN
+            SELECT greatest(coalesce(min({day_expr}), today), today - {BACKFILL_DAYS})
+                INTO day FROM {table}_legacy;
+            WHILE day < today + {PREMAKE_DAYS} LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_p' || to_char(day, 'YYYYMMDD'),
+                    day::text || '{suffix}',
+                    (day + 1)::text || '{suffix}'
+                );
+                day := day + 1;
+            END LOOP;
+        END $$
+    """)
+
+    _finish_copy(table)
+
+
+def _unpartition(table: str) -> None:
+    _rename_to_legacy(table)
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS)")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    _finish_copy(table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A partitioned tasks table can only be referenced by (id, created_at)
+    op.drop_constraint(op.f('task_images_task_id_fkey'), 'task_images', type_='foreignkey')
+
+    _partition('tasks', tz_aware=True)
+    _partition('task_images', tz_aware=False)
+
+    op.create_foreign_key(op.f('tasks_worker_id_fkey'), 'tasks', 'workers', ['worker_id'], ['id'])
+    op.create_foreign_key(op.f('task_images_worker_id_fkey'), 'task_images', 'workers', ['worker_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_tasks_worker_id_created_at_id', 'tasks', ['worker_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_task_images_worker_id_created_at_id', 'task_images', ['worker_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_task_images_task_id_created_at', 'task_images', ['task_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _unpartition('task_images')
+    _unpartition('tasks')
+
+    op.create_foreign_key(op.f('tasks_worker_id_fkey'), 'tasks', 'workers', ['worker_id'], ['id'])
+    op.create_foreign_key(op.f('task_images_worker_id_fkey'), 'task_images', 'workers', ['worker_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_tasks_worker_id_created_at_id', 'tasks', ['worker_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_task_images_worker_id_created_at_id', 'task_images', ['worker_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_task_images_task_id_created_at', 'task_images', ['task_id', 'created_at'], unique=False)
+
+    # Frames of tasks purged while the tables were partitioned point nowhere
+    op.execute("UPDATE task_images SET task_id = NULL WHERE task_id NOT IN (SELECT id FROM tasks)")
+    op.create_foreign_key(op.f('task_images_task_id_fkey'), 'task_images', 'tasks', ['task_id'], ['id'], ondelete='SET NULL')
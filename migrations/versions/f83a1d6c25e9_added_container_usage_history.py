@@ -0,0 +1,63 @@
+"""added container usage history
+
+Revision ID: f83a1d6c25e9
+Revises: e4b7c2a90f16
+Create Date: 2026-10-19 15:48:27.204318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f83a1d6c25e9'
+down_revision: Union[str, Sequence[str], None] = 'e4b7c2a90f16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _usage_columns() -> list[sa.Column]:
+    return [
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('cpu_percent_sum', sa.Float(), nullable=False),
+        sa.Column('cpu_percent_max', sa.Float(), nullable=False),
+        sa.Column('memory_bytes_sum', sa.BigInteger(), nullable=False),
+        sa.Column('memory_bytes_max', sa.BigInteger(), nullable=False),
+        sa.Column('pids_max', sa.Integer(), nullable=False),
+        sa.Column('block_read_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('block_write_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('net_rx_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('net_tx_bytes', sa.BigInteger(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('worker_usage',
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('minute', sa.DateTime(timezone=True), nullable=False),
+    *_usage_columns(),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('worker_id', 'minute')
+    )
+    op.create_index('ix_worker_usage_minute', 'worker_usage', ['minute'], unique=False)
+    op.create_table('task_usage',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('first_sample_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_sample_at', sa.DateTime(timezone=True), nullable=False),
+    *_usage_columns(),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_usage_last_sample_at', 'task_usage', ['last_sample_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_usage_last_sample_at', table_name='task_usage')
+    op.drop_table('task_usage')
+    op.drop_index('ix_worker_usage_minute', table_name='worker_usage')
+    op.drop_table('worker_usage')
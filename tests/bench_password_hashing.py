@@ -0,0 +1,79 @@
+"""
+Login storm benchmark behind app.core.process_pool: N concurrent bcrypt
+verifies, and how late the event loop runs a 5ms timer meanwhile.
+
+    python tests/bench_password_hashing.py [N]
+
+Compares run_in_threadpool (what the routes used before, up to 40 threads)
+with run_in_process (CPU_POOL_WORKERS processes). Not collected by pytest:
+the numbers depend on the machine, see the process_pool docstring.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.process_pool import run_in_process, shutdown_process_pool  # noqa: E402
+from app.user.security import hash_password, verify_password  # noqa: E402
+
+PASSWORD = "correct horse"
+TICK_SECONDS = 0.005
+
+
+async def _ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    """Records how late each TICK_SECONDS sleep wakes up, in ms."""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(TICK_SECONDS)
+        now = time.perf_counter()
+        lags.append((now - last - TICK_SECONDS) * 1000)
+        last = now
+
+
+async def _storm(runner, hashed: str, n: int) -> tuple[float, list[float]]:
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(runner(verify_password, PASSWORD, hashed) for _ in range(n)))
+    total = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    return total, sorted(lags)
+
+
+async def main(n: int) -> None:
+    hashed = hash_password(PASSWORD)
+    runners = {"thread": run_in_threadpool, "process": run_in_process}
+    for runner in runners.values():
+        await runner(verify_password, PASSWORD, hashed)  # warm up
+
+    for name, runner in runners.items():
+        total, lags = await _storm(runner, hashed, n)
+        p99 = lags[max(int(len(lags) * 0.99) - 1, 0)]
+        print(
+            f"{name:8s} N={n} total={total * 1000:.0f}ms "
+            f"loop lag p50={statistics.median(lags):.2f}ms p99={p99:.2f}ms max={lags[-1]:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    print(
+        f"cpus={os.cpu_count()} python={sys.version.split()[0]} "
+        f"CPU_POOL_WORKERS={settings.CPU_POOL_WORKERS} BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}"
+    )
+    try:
+        asyncio.run(main(n))
+    finally:
+        shutdown_process_pool()
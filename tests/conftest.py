@@ -0,0 +1,4 @@
+import os
+
+# Settings require it; the tests never call Gemini
+os.environ.setdefault("GEMINI_API_KEY", "test")
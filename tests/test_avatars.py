@@ -0,0 +1,129 @@
+"""Avatar uploads: size limits, accepted formats, the WebP variants and their keys."""
+import asyncio
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.exceptions.user import InvalidAvatarError
+from app.routers.user import _read_avatar_body
+from app.user.avatars import (
+    AVATAR_SIZES,
+    avatar_object_keys,
+    avatar_variant_keys,
+    process_avatar,
+)
+
+Image = pytest.importorskip("PIL.Image")
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _wide_image():
+    """600x300, red centre square between blue side bands."""
+    image = Image.new("RGB", (600, 300), BLUE)
+    image.paste(Image.new("RGB", (300, 300), RED), (150, 0))
+    return image
+
+
+def _close(pixel, color, tolerance: int = 40) -> bool:
+    return all(abs(a - b) <= tolerance for a, b in zip(pixel, color))
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "PNG", "WEBP"])
+def test_every_size_is_a_square_webp(fmt):
+    variants = process_avatar(_encode(_wide_image(), fmt))
+
+    assert set(variants) == set(AVATAR_SIZES)
+    for size, data in variants.items():
+        variant = Image.open(BytesIO(data))
+        assert variant.format == "WEBP"
+        assert variant.size == (size, size)
+        # Cut to the centred square: no blue band left at the edges
+        assert _close(variant.convert("RGB").getpixel((0, 0)), RED)
+        assert _close(variant.convert("RGB").getpixel((size - 1, size - 1)), RED)
+
+
+def test_other_formats_are_rejected():
+    gif = _encode(Image.new("RGB", (64, 64), RED), "GIF")
+    with pytest.raises(InvalidAvatarError, match="JPEG, PNG, or WebP"):
+        process_avatar(gif)
+
+
+def test_undecodable_data_is_rejected():
+    with pytest.raises(InvalidAvatarError, match="Invalid image file"):
+        process_avatar(b"\x89PNG\r\n\x1a\n not really a png")
+
+    # A valid header with a truncated body fails while decoding
+    png = _encode(_wide_image(), "PNG")
+    with pytest.raises(InvalidAvatarError, match="Invalid image file"):
+        process_avatar(png[: len(png) // 2])
+
+
+def test_too_many_pixels_are_rejected_before_decoding(monkeypatch):
+    monkeypatch.setattr(settings, "AVATAR_MAX_PIXELS", 600 * 300 - 1)
+    with pytest.raises(InvalidAvatarError, match="too large"):
+        process_avatar(_encode(_wide_image(), "PNG"))
+
+
+def test_variant_keys_round_trip():
+    keys = avatar_object_keys(7)
+
+    assert set(keys) == set(AVATAR_SIZES)
+    assert all(key.startswith("avatars/user_7/") for key in keys.values())
+    assert avatar_variant_keys(keys[max(AVATAR_SIZES)]) == keys
+
+
+def test_legacy_single_image_key_has_one_variant():
+    legacy = "avatars/user_7/1700000000.png"
+    assert avatar_variant_keys(legacy) == {max(AVATAR_SIZES): legacy}
+
+
+class StreamingRequest:
+    """Stands in for Request: a Content-Length header and a body streamed in chunks."""
+
+    def __init__(self, chunks: list[bytes], content_length: str | None = None):
+        self.headers = {"content-length": content_length} if content_length else {}
+        self.chunks = chunks
+        self.read_chunks = 0
+
+    async def stream(self):
+        for chunk in self.chunks:
+            self.read_chunks += 1
+            yield chunk
+
+
+def test_upload_within_the_limit_is_read_whole(monkeypatch):
+    monkeypatch.setattr(settings, "AVATAR_MAX_BYTES", 10)
+    request = StreamingRequest([b"12345", b"67890"])
+    assert asyncio.run(_read_avatar_body(request)) == b"1234567890"
+
+
+def test_oversized_upload_stops_streaming_at_the_limit(monkeypatch):
+    monkeypatch.setattr(settings, "AVATAR_MAX_BYTES", 10)
+    request = StreamingRequest([b"123456", b"789012", b"never read"])
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(_read_avatar_body(request))
+
+    assert exc_info.value.status_code == 413
+    assert request.read_chunks == 2
+
+
+def test_oversized_content_length_is_rejected_unread(monkeypatch):
+    monkeypatch.setattr(settings, "AVATAR_MAX_BYTES", 10)
+    request = StreamingRequest([b"x" * 11], content_length="11")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(_read_avatar_body(request))
+
+    assert exc_info.value.status_code == 413
+    assert request.read_chunks == 0
@@ -0,0 +1,67 @@
+"""Container events never bring back a worker whose provisioning did not finish."""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.worker import events_listener
+from app.worker.events_listener import apply_event
+
+
+class RecordingSession:
+    """Stands in for SessionLocal(): keeps the statements, changes no rows."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def all(self):
+        return []
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def session(monkeypatch):
+    recording = RecordingSession()
+    monkeypatch.setattr(events_listener, "SessionLocal", lambda: recording)
+    return recording
+
+
+def _event(action: str) -> dict:
+    return {
+        "Action": action,
+        "id": "abc123",
+        "Actor": {"Attributes": {"name": "factory_worker_1_1", "exitCode": "1"}},
+    }
+
+
+def _sql(session) -> str:
+    [statement] = session.statements
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+@pytest.mark.parametrize("action", ["start", "unpause", "health_status: healthy"])
+def test_idle_transitions_require_finished_provisioning(session, action):
+    apply_event(_event(action))
+
+    sql = _sql(session)
+    assert "SET status='IDLE'" in sql
+    # A FAILED (or any unfinished) phase matches neither condition
+    assert "workers.provisioning_phase = 'ready' OR workers.provisioning_phase IS NULL" in sql
+
+
+@pytest.mark.parametrize("action", ["oom", "stop", "die", "health_status: unhealthy"])
+def test_failing_transitions_ignore_provisioning(session, action):
+    apply_event(_event(action))
+
+    assert "provisioning_phase" not in _sql(session)
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Only needed by background jobs and a few endpoints; imported on first use
+LAZY_MODULES = ("celery", "aioboto3", "docker")
+
+
+def test_app_main_does_not_import_heavy_dependencies():
+    code = (
+        "import sys\n"
+        "import app.main\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "test")},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+# Cumulative `import app.main` time, best of IMPORT_TIME_RUNS. About 1.9s where
+# it was set, 2.7s before the heavy dependencies went lazy. The budget catches
+# a regression of that size while leaving room for slower runners; which modules
+# stay out is checked above. Override with IMPORT_TIME_BUDGET_SECONDS on
+# hardware where it does not fit.
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", 2.7))
+IMPORT_TIME_RUNS = 3
+
+
+def _import_time_seconds() -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT,
+        env={**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "test")},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # "import time: <self us> | <cumulative us> | <module>", indented by nesting depth
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "app.main":
+            return int(fields[1]) / 1_000_000
+    raise AssertionError(f"app.main missing from -X importtime output:\n{result.stderr[-2000:]}")
+
+
+def test_app_main_import_time_within_budget():
+    best = min(_import_time_seconds() for _ in range(IMPORT_TIME_RUNS))
+    assert best <= IMPORT_TIME_BUDGET_SECONDS, (
+        f"import app.main took {best:.2f}s, budget {IMPORT_TIME_BUDGET_SECONDS:.2f}s"
+    )
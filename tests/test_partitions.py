@@ -0,0 +1,56 @@
+"""created_at bounds derived from id floors, which by-id task lookups prune partitions with."""
+from datetime import date, datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.db.partitions import ID_RANGE_SLACK, created_range, unlink_task_images
+
+FLOORS = [(date(2026, 10, 1), 100), (date(2026, 10, 2), 200), (date(2026, 10, 3), 300)]
+
+
+def _utc(day: int) -> datetime:
+    return datetime(2026, 10, day, tzinfo=timezone.utc)
+
+
+NOW = _utc(10)
+
+
+def test_id_between_floors_is_bounded_around_its_day():
+    assert created_range("tasks", FLOORS, 250, NOW) == (
+        _utc(2) - ID_RANGE_SLACK,
+        _utc(4) + ID_RANGE_SLACK,
+    )
+
+
+def test_id_on_a_floor_belongs_to_that_day():
+    assert created_range("tasks", FLOORS, 200, NOW)[0] == _utc(2) - ID_RANGE_SLACK
+
+
+def test_id_past_the_last_floor_is_bounded_by_now():
+    assert created_range("tasks", FLOORS, 999, NOW) == (
+        _utc(3) - ID_RANGE_SLACK,
+        NOW + ID_RANGE_SLACK,
+    )
+
+
+def test_id_before_the_first_floor_has_no_lower_bound():
+    # Older rows sit in the default partition, which is always read
+    assert created_range("tasks", FLOORS, 5, NOW) == (None, _utc(2) + ID_RANGE_SLACK)
+
+
+def test_no_floors_only_now():
+    assert created_range("tasks", [], 5, NOW) == (None, NOW + ID_RANGE_SLACK)
+
+
+def test_task_images_bounds_are_naive():
+    lower, upper = created_range("task_images", FLOORS, 250, NOW)
+    assert lower.tzinfo is None and upper.tzinfo is None
+    assert created_range("task_images", FLOORS, 999, NOW)[1].tzinfo is None
+
+
+def test_unlink_task_images_nulls_task_id():
+    stmt = unlink_task_images([1, 2], datetime(2026, 10, 1))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE task_images SET task_id=")
+    assert "task_images.task_id IN" in sql
+    assert "task_images.created_at >=" in sql
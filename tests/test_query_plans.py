@@ -0,0 +1,211 @@
+"""
+Query plans and statement counts of the hot read paths (worker list and detail,
+task list, dashboard, task by id) against a real PostgreSQL.
+
+Set TEST_DATABASE_URL to an asyncpg URL of a database migrated with
+`alembic upgrade head`; the tests are skipped otherwise. Everything runs in one
+transaction that is rolled back. It first seeds production-like volumes (a few
+thousand users and workers, tens of thousands of tasks and screenshots spread
+over daily partitions) and runs ANALYZE, so the plans are the planner's own
+choice with real statistics.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.s3 import s3_service
+from app.db.partitions import PARTITIONED_TABLES, create_partition, missing_days
+from app.worker import crud
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+SEED_USERS = 2000
+SEED_WORKERS_PER_USER = 3
+SEED_DAYS = 6
+SEED_TASKS_PER_DAY = 10000
+SEED_IMAGES_PER_DAY = 5000
+
+SEED_SQL = [
+    f"""
+    INSERT INTO users (email, hashed_password, is_active)
+    SELECT 'plans-' || g || '@example.com', 'x', true FROM generate_series(1, {SEED_USERS}) g
+    """,
+    f"""
+    INSERT INTO workers (name, user_id, status, created_at)
+    SELECT 'plans-' || n, u.id, 'IDLE', now() - n * interval '1 minute'
+    FROM users u, generate_series(1, {SEED_WORKERS_PER_USER}) n
+    WHERE u.email LIKE 'plans-%'
+    """,
+    # Oldest first, so ids grow with created_at as they do in production
+    f"""
+    WITH seeded AS (
+        SELECT array_agg(id) AS ids FROM workers WHERE name LIKE 'plans-%'
+    )
+    INSERT INTO tasks (prompt, status, worker_id, created_at, finished_at, logs, result)
+    SELECT 'open the browser and check the weather', 'COMPLETED',
+           ids[1 + (g * 7919) % array_length(ids, 1)], t, t + interval '1 minute',
+           repeat('log line ', 50), 'done'
+    FROM seeded, generate_series(1, {SEED_DAYS * SEED_TASKS_PER_DAY}) g,
+         LATERAL (SELECT now() - ({SEED_DAYS * SEED_TASKS_PER_DAY} - g)
+                  * interval '{86400 // SEED_TASKS_PER_DAY} seconds' AS t) ts
+    ORDER BY g
+    """,
+    f"""
+    INSERT INTO task_images (worker_id, task_id, s3_key, created_at)
+    SELECT worker_id, id, 'plans/' || id || '.png', (created_at AT TIME ZONE 'UTC')
+    FROM tasks WHERE prompt = 'open the browser and check the weather'
+      AND id % {SEED_TASKS_PER_DAY // SEED_IMAGES_PER_DAY} = 0
+    """,
+    "ANALYZE users, workers, tasks, task_images",
+]
+
+
+def _create_partitions(conn) -> None:
+    """Daily partitions of the seeded days, which a freshly migrated database may lack."""
+    today = datetime.now(timezone.utc).date()
+    for table in PARTITIONED_TABLES:
+        for day in missing_days(conn, table, today - timedelta(days=SEED_DAYS), SEED_DAYS + 1):
+            create_partition(conn, table, day)
+
+
+async def _run(calls: dict) -> dict:
+    """
+    Seeds the database, then runs each call(session, user_id, worker_id, task_id)
+    for the last seeded user, its first worker and that worker's newest task.
+    Returns {name: [(statement, parameters, plan)]} of the statements each issued.
+    """
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # The session's savepoints are not the path's own statements
+        if not statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO")):
+            statements.append((statement, parameters))
+
+    try:
+        async with engine.connect() as conn:
+            await conn.begin()
+            await conn.run_sync(_create_partitions)
+            for sql in SEED_SQL:
+                await conn.exec_driver_sql(sql)
+
+            user_id, worker_id, task_id = (
+                await conn.exec_driver_sql(
+                    "SELECT w.user_id, w.id, max(t.id) FROM workers w "
+                    "JOIN tasks t ON t.worker_id = w.id WHERE w.name LIKE 'plans-%' "
+                    "GROUP BY w.user_id, w.id ORDER BY w.user_id DESC, w.id LIMIT 1"
+                )
+            ).one()
+            session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+            # Id floors of another database must not bound the lookups
+            crud._task_id_floors.clear()
+
+            plans = {}
+            for name, call in calls.items():
+                statements.clear()
+                event.listen(engine.sync_engine, "before_cursor_execute", capture)
+                try:
+                    await call(session, user_id, worker_id, task_id)
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+                session.expunge_all()
+
+                plans[name] = []
+                for statement, parameters in statements:
+                    result = await conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+                    plans[name].append((statement, parameters, "\n".join(result.scalars())))
+
+            await conn.rollback()
+            return plans
+    finally:
+        crud._task_id_floors.clear()
+        await engine.dispose()
+
+
+async def _no_presign(keys):
+    return {}
+
+
+@pytest.fixture(scope="module")
+def plans():
+    with pytest.MonkeyPatch.context() as mp:
+        # The dashboard signs screenshot URLs; only its query matters here
+        mp.setattr(s3_service, "get_presigned_urls", _no_presign)
+        return asyncio.run(
+            _run(
+                {
+                    "worker_list": lambda s, u, w, t: crud.get_worker_list(s, u),
+                    "worker_detail": lambda s, u, w, t: crud.get_worker_detail(s, w, u),
+                    "task_list": lambda s, u, w, t: crud.get_task_list(s, w, u),
+                    "dashboard": lambda s, u, w, t: crud.get_dashboard(s, u),
+                    "task": lambda s, u, w, t: crud.get_task(s, t, u),
+                }
+            )
+        )
+
+
+def _holds_seeded_rows(relation: str) -> bool:
+    if relation.endswith("_default"):
+        return False
+    match = re.fullmatch(r"(?:tasks|task_images)_p(\d{8})", relation)
+    if not match:
+        return True
+    day = datetime.strptime(match.group(1), "%Y%m%d").date()
+    today = datetime.now(timezone.utc).date()
+    return today - timedelta(days=SEED_DAYS) <= day <= today
+
+
+def _assert_indexed(plan: str, *index_names: str) -> None:
+    # Empty partitions (the default, days ahead) cost nothing to scan sequentially
+    for relation in re.findall(r"Seq Scan on (\w+)", plan):
+        assert not _holds_seeded_rows(relation), plan
+    for name in index_names:
+        assert name in plan, plan
+
+
+def test_worker_list_uses_user_index(plans):
+    assert len(plans["worker_list"]) == 1
+    _assert_indexed(plans["worker_list"][0][2], "ix_workers_user_id_created_at_id")
+
+
+def test_worker_detail_statements(plans):
+    # The worker, then its latest tasks
+    assert len(plans["worker_detail"]) == 2
+    _assert_indexed(plans["worker_detail"][0][2], "workers_pkey")
+    _assert_indexed(plans["worker_detail"][1][2], "worker_id_created_at_id_idx")
+
+
+def test_task_list_uses_worker_created_at_index(plans):
+    assert len(plans["task_list"]) == 1
+    # Partitions carry copies of ix_tasks_worker_id_created_at_id named after its columns
+    _assert_indexed(plans["task_list"][0][2], "worker_id_created_at_id_idx")
+
+
+def test_dashboard_is_one_indexed_query(plans):
+    assert len(plans["dashboard"]) == 1
+    _assert_indexed(
+        plans["dashboard"][0][2],
+        "ix_workers_user_id_created_at_id",
+        "worker_id_created_at_id_idx",
+    )
+
+
+def test_task_by_id_reads_only_partitions_around_it(plans):
+    # The id floors, then the task itself
+    statements = plans["task"]
+    assert len(statements) == 3
+    plan = statements[-1][2]
+    _assert_indexed(plan, "pkey")
+    scanned = set(re.findall(r"on (tasks_\w+)", plan))
+    assert "tasks_default" not in scanned, plan
+    assert len(scanned) <= 4, plan
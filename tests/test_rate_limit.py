@@ -0,0 +1,168 @@
+"""Token buckets and the global Docker slot semaphore, run as their Lua scripts on a fake Redis."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import app.core.redis as redis_module
+from app.core.config import settings
+from app.core.metrics import COUNTERS_KEY
+from app.core.rate_limit import (
+    BUCKET_KEY,
+    DOCKER_SLOTS_KEY,
+    SCREENSHOT,
+    TASKS,
+    acheck_rate_limit,
+    docker_slot,
+)
+from app.exceptions.rate_limit import DockerBusyError, RateLimitExceeded
+from app.models.user import User
+from app.user.dependencies import rate_limit as rate_limit_dependency
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs EVAL through it
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_module, "_async_redis_client", client)
+    # 6 per minute: one token every 10 seconds, 2 at once
+    monkeypatch.setattr(settings, "RATE_LIMIT_SCREENSHOT_PER_MINUTE", 6)
+    monkeypatch.setattr(settings, "RATE_LIMIT_SCREENSHOT_BURST", 2)
+    return client
+
+
+def _take(user_id: int = 1, route: str = SCREENSHOT):
+    asyncio.run(acheck_rate_limit(user_id, route))
+
+
+def test_bucket_allows_the_burst_then_denies_with_retry_after(redis):
+    _take()
+    _take()
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        _take()
+
+    assert exc_info.value.retry_after == 10
+    shed = 'requests_shed_total{route="screenshot",reason="rate_limit"}'
+    assert asyncio.run(redis.hget(COUNTERS_KEY, shed)) == "1"
+
+
+def test_bucket_refills_at_the_configured_rate(redis):
+    _take()
+    _take()
+    # Pretend the last take was 10s ago: exactly one token has come back
+    key = BUCKET_KEY.format(route=SCREENSHOT, user_id=1)
+    ts = float(asyncio.run(redis.hget(key, "ts")))
+    asyncio.run(redis.hset(key, "ts", str(ts - 10)))
+
+    _take()
+    with pytest.raises(RateLimitExceeded):
+        _take()
+
+
+def test_buckets_are_per_user_and_route(redis):
+    _take(user_id=1)
+    _take(user_id=1)
+
+    _take(user_id=2)
+    _take(user_id=1, route=TASKS)
+
+
+def test_disabled_or_unreachable_redis_never_rejects(redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    for _ in range(5):
+        _take()
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+
+    class Down:
+        async def eval(self, *args):
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(redis_module, "_async_redis_client", Down())
+    for _ in range(5):
+        _take()
+
+
+def test_dependency_answers_429_with_retry_after(redis):
+    check = rate_limit_dependency(SCREENSHOT)
+    user = User(id=1)
+    asyncio.run(check(user=user))
+    asyncio.run(check(user=user))
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(check(user=user))
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "10"}
+
+
+@pytest.fixture
+def slots(redis, monkeypatch):
+    monkeypatch.setattr(settings, "DOCKER_MAX_CONCURRENT_OPS", 1)
+    monkeypatch.setattr(settings, "DOCKER_SLOT_WAIT_SECONDS", 0.3)
+    monkeypatch.setattr(settings, "DOCKER_SLOT_POLL_SECONDS", 0.05)
+    return redis
+
+
+def test_docker_slot_sheds_callers_past_the_wait(slots):
+    async def scenario():
+        async with docker_slot(SCREENSHOT):
+            with pytest.raises(DockerBusyError) as exc_info:
+                async with docker_slot(SCREENSHOT):
+                    pass
+        # Released on exit: the next caller gets the slot right away
+        async with docker_slot(SCREENSHOT):
+            assert await slots.zcard(DOCKER_SLOTS_KEY) == 1
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.retry_after == 1
+    assert asyncio.run(slots.zcard(DOCKER_SLOTS_KEY)) == 0
+
+
+def test_docker_slot_waiter_gets_a_slot_freed_in_time(slots):
+    async def holder(release: asyncio.Event):
+        async with docker_slot(SCREENSHOT):
+            await release.wait()
+
+    async def scenario():
+        release = asyncio.Event()
+        held = asyncio.create_task(holder(release))
+        await asyncio.sleep(0.05)
+        asyncio.get_running_loop().call_later(0.1, release.set)
+        async with docker_slot(SCREENSHOT):
+            pass
+        await held
+
+    asyncio.run(scenario())
+
+
+def test_docker_slot_of_a_dead_process_frees_after_its_lease(slots):
+    # A lease that already expired, as left by a process killed while holding it
+    asyncio.run(slots.zadd(DOCKER_SLOTS_KEY, {"dead": 1}))
+
+    async def scenario():
+        async with docker_slot(SCREENSHOT):
+            return await slots.zrange(DOCKER_SLOTS_KEY, 0, -1)
+
+    assert "dead" not in asyncio.run(scenario())
+
+
+def test_docker_slot_runs_unbounded_without_redis(monkeypatch):
+    class Down:
+        async def eval(self, *args):
+            raise ConnectionError("redis is down")
+
+        async def zrem(self, *args):
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(redis_module, "_async_redis_client", Down())
+
+    async def scenario():
+        async with docker_slot(SCREENSHOT):
+            async with docker_slot(SCREENSHOT):
+                return True
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,89 @@
+"""Desktop captures of the API and the timeline recorder must not interfere."""
+import io
+import re
+import tarfile
+from unittest.mock import MagicMock
+
+import pytest
+
+import app.core.redis as redis_module
+from app.core import utils
+from app.core.utils import SCREENSHOT_CAPTURE_LOCK
+from app.worker import timeline
+from app.worker.timeline import TimelineRecorder
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeDocker:
+    """Stands in for DockerService: scrot writes files, get_archive tars them."""
+
+    def __init__(self):
+        self.files = {}
+        self.commands = []
+        self.client = MagicMock()
+        self.client.containers.get.return_value.get_archive.side_effect = self._archive
+
+    def execute_command(self, container_id, command, user="kasm-user", check=True):
+        self.commands.append(command)
+        verb, path = command.rsplit(" ", 1)
+        if verb == "scrot":
+            self.files[path] = b"png:" + path.encode()
+        else:
+            self.files.pop(path, None)
+        return ""
+
+    def _archive(self, path):
+        data = self.files[path]
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            info = tarfile.TarInfo(path.rsplit("/", 1)[1])
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        return [buffer.getvalue()], {}
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    fake = FakeDocker()
+    monkeypatch.setattr(utils, "get_docker_service", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_module, "_redis_client", client)
+    return client
+
+
+def test_each_capture_uses_its_own_file(docker):
+    first = utils.grab_desktop_png("c1")
+    second = utils.grab_desktop_png("c1")
+
+    scrot_paths = [c.split(" ", 1)[1] for c in docker.commands if c.startswith("scrot")]
+    assert len(set(scrot_paths)) == 2
+    assert all(re.fullmatch(r"/tmp/screen-[0-9a-f]{32}\.png", p) for p in scrot_paths)
+    assert first != second
+    assert docker.files == {}
+
+
+def test_timeline_frame_skipped_while_api_capture_holds_lease(docker, redis, monkeypatch):
+    uploaded = MagicMock()
+    monkeypatch.setattr(timeline, "fingerprint_screenshot", uploaded)
+    lease = redis.lock(SCREENSHOT_CAPTURE_LOCK.format(worker_id=7), timeout=30)
+    assert lease.acquire(blocking=False)
+
+    TimelineRecorder(task_id=1, worker_id=7, container_id="c1")._capture_frame()
+
+    assert docker.commands == []
+    uploaded.assert_not_called()
+
+
+def test_timeline_frame_releases_lease(docker, redis, monkeypatch):
+    monkeypatch.setattr(timeline, "fingerprint_screenshot", MagicMock(side_effect=RuntimeError))
+
+    TimelineRecorder(task_id=1, worker_id=7, container_id="c1")._capture_frame()
+
+    assert any(c.startswith("scrot") for c in docker.commands)
+    assert not redis.exists(SCREENSHOT_CAPTURE_LOCK.format(worker_id=7))
@@ -0,0 +1,73 @@
+"""
+Listings select exactly TASK_LIST_COLUMNS and WORKER_STATUS_COLUMNS: logs and
+result never leave the database, nor worker columns the list doesn't show.
+"""
+import asyncio
+import re
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models import WorkerModel
+from app.worker import crud
+from app.worker.crud import TASK_LIST_COLUMNS, WORKER_STATUS_COLUMNS
+
+
+class RecordingSession:
+    """Stands in for AsyncSession: keeps the statements, returns `rows` (no rows by default)."""
+
+    def __init__(self, *rows):
+        self.statements = []
+        self.rows = list(rows)
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def all(self):
+        return []
+
+
+def _selected_columns(statement, table: str = "tasks") -> set[str]:
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    select_clause = re.match(r"SELECT (.*?)\s+FROM ", sql, re.S).group(1)
+    return set(re.findall(rf"\b{table}\.(\w+)", select_clause))
+
+
+def test_task_list_selects_only_list_columns():
+    session = RecordingSession()
+    asyncio.run(crud.get_task_list(session, worker_id=1, user_id=1))
+
+    [statement] = session.statements
+    assert _selected_columns(statement) == {column.key for column in TASK_LIST_COLUMNS}
+
+
+def test_worker_detail_selects_only_list_columns():
+    session = RecordingSession(WorkerModel(id=1, user_id=1))
+    asyncio.run(crud.get_worker_detail(session, worker_id=1, user_id=1))
+
+    _, tasks_statement = session.statements
+    assert _selected_columns(tasks_statement) == {
+        column.key for column in TASK_LIST_COLUMNS
+    }
+    assert f"LIMIT {settings.WORKER_DETAIL_TASKS_LIMIT + 1}" in str(
+        tasks_statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_worker_list_selects_only_status_columns():
+    session = RecordingSession()
+    asyncio.run(crud.get_worker_list(session, user_id=1))
+
+    [statement] = session.statements
+    assert _selected_columns(statement, "workers") == {
+        column.key for column in WORKER_STATUS_COLUMNS
+    }
@@ -0,0 +1,41 @@
+"""TTLCache is shared by the API event loop, Celery task threads and the timeline recorder."""
+import threading
+
+from app.core import cache as cache_module
+from app.core.cache import TTLCache
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    c = TTLCache(maxsize=4)
+    c.set("a", 1, ttl=10)
+    assert c.get("a") == 1
+    now[0] = 110.0
+    assert c.get("a") is None
+    assert len(c._data) == 0
+
+
+def test_concurrent_use_keeps_maxsize():
+    c = TTLCache(maxsize=32)
+    errors = []
+
+    def hammer(offset: int):
+        try:
+            for i in range(5000):
+                key = (offset + i) % 64
+                c.set(key, i, ttl=60)
+                c.get((key + 1) % 64)
+                if i % 7 == 0:
+                    c.pop((key + 3) % 64)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer, args=(n * 13,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(c._data) <= 32
@@ -0,0 +1,225 @@
+"""Bulk worker operations: per-item results, bounded Docker concurrency, one commit per request."""
+import asyncio
+import threading
+import time
+
+import pytest
+from docker.errors import APIError, NotFound
+
+import app.core.redis as redis_module
+from app.core.config import settings
+from app.models import WorkerModel
+from app.models.worker import WorkerStatus
+from app.schemas.worker import WorkerCreate
+from app.worker import crud
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeSession:
+    """Stands in for AsyncSession: every query returns `workers` (or their count)."""
+
+    def __init__(self, *workers):
+        self.workers = list(workers)
+        self.added = []
+        self.deleted = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.workers
+
+    def scalar(self):
+        return len(self.workers)
+
+    def add_all(self, objects):
+        self.added.extend(objects)
+
+    async def delete(self, obj):
+        self.deleted.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakeContainer:
+    def __init__(self, docker, container_id):
+        self.docker = docker
+        self.container_id = container_id
+
+    def _call(self, action):
+        self.docker.call(action, self.container_id)
+
+    def stop(self):
+        self._call("stop")
+
+    def kill(self):
+        self._call("kill")
+
+    def start(self):
+        self._call("start")
+
+
+class FakeDocker:
+    """Docker calls by container id; `errors` maps a container id to the exception it raises."""
+
+    def __init__(self, errors=None, delay=0.0):
+        self.errors = errors or {}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.client = self
+        self.containers = self
+
+    def get(self, container_id):
+        return FakeContainer(self, container_id)
+
+    def stop_worker(self, container_id):
+        self.call("remove", container_id)
+
+    def call(self, action, container_id):
+        with self._lock:
+            self.calls.append((action, container_id))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if container_id in self.errors:
+                raise self.errors[container_id]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    # docker_slot runs on Redis
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_module, "_async_redis_client", client)
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+
+    async def record(user_id, *worker_ids):
+        calls.append((user_id, *worker_ids))
+
+    monkeypatch.setattr(crud, "amark_worker_changed", record)
+    return calls
+
+
+def _docker(monkeypatch, **kwargs) -> FakeDocker:
+    fake = FakeDocker(**kwargs)
+    monkeypatch.setattr(crud, "get_docker_service", lambda: fake)
+    return fake
+
+
+def _worker(worker_id: int, status: WorkerStatus, container: bool = True) -> WorkerModel:
+    return WorkerModel(
+        id=worker_id,
+        user_id=1,
+        name=f"w{worker_id}",
+        status=status,
+        container_id=f"c{worker_id}" if container else None,
+    )
+
+
+def test_bulk_stop_reports_each_item_in_request_order(monkeypatch, invalidations):
+    docker = _docker(monkeypatch, errors={"c4": NotFound("gone"), "c5": APIError("boom")})
+    session = FakeSession(
+        _worker(1, WorkerStatus.IDLE),
+        _worker(2, WorkerStatus.OFFLINE),
+        _worker(3, WorkerStatus.BUSY),
+        _worker(4, WorkerStatus.IDLE),
+        _worker(5, WorkerStatus.IDLE),
+        _worker(6, WorkerStatus.IDLE, container=False),
+    )
+
+    results = asyncio.run(crud.bulk_stop_workers(session, [5, 1, 1, 2, 3, 4, 6, 99], user_id=1))
+
+    assert [r.worker_id for r in results] == [5, 1, 2, 3, 4, 6, 99]
+    ok = {r.worker_id: r.ok for r in results}
+    assert ok == {5: False, 1: True, 2: True, 3: False, 4: True, 6: False, 99: False}
+    # Already stopped, busy without force and container-less workers never reach Docker
+    assert sorted(docker.calls) == [("stop", "c1"), ("stop", "c4"), ("stop", "c5")]
+    # A container that no longer exists counts as stopped
+    assert session.workers[3].status == WorkerStatus.OFFLINE
+    assert session.workers[4].status == WorkerStatus.IDLE
+    assert session.commits == 1
+    assert len(invalidations) == 1
+
+
+def test_bulk_stop_force_kills_busy_workers(monkeypatch, invalidations):
+    docker = _docker(monkeypatch)
+    session = FakeSession(_worker(1, WorkerStatus.BUSY))
+
+    [result] = asyncio.run(crud.bulk_stop_workers(session, [1], user_id=1, force=True))
+
+    assert result.ok and result.status == WorkerStatus.OFFLINE
+    assert docker.calls == [("kill", "c1")]
+
+
+def test_bulk_start_leaves_running_workers_alone(monkeypatch, invalidations):
+    docker = _docker(monkeypatch, errors={"c3": NotFound("gone")})
+    session = FakeSession(
+        _worker(1, WorkerStatus.OFFLINE),
+        _worker(2, WorkerStatus.IDLE),
+        _worker(3, WorkerStatus.OFFLINE),
+    )
+
+    results = asyncio.run(crud.bulk_start_workers(session, [1, 2, 3], user_id=1))
+
+    assert [(r.worker_id, r.ok) for r in results] == [(1, True), (2, True), (3, False)]
+    assert "not found" in results[2].error
+    assert docker.calls == [("start", "c1"), ("start", "c3")]
+    assert session.workers[0].status == WorkerStatus.IDLE
+
+
+def test_bulk_delete_keeps_workers_whose_container_was_not_removed(monkeypatch, invalidations):
+    _docker(monkeypatch, errors={"c2": APIError("boom")})
+    session = FakeSession(
+        _worker(1, WorkerStatus.IDLE),
+        _worker(2, WorkerStatus.IDLE),
+        _worker(3, WorkerStatus.BUSY),
+        _worker(4, WorkerStatus.OFFLINE, container=False),
+    )
+
+    results = asyncio.run(crud.bulk_delete_workers(session, [1, 2, 3, 4], user_id=1))
+
+    assert [(r.worker_id, r.ok) for r in results] == [(1, True), (2, False), (3, False), (4, True)]
+    assert [w.id for w in session.deleted] == [1, 4]
+    assert session.commits == 1
+    assert invalidations == [(1, 1, 4)]
+
+
+def test_bulk_create_fails_items_past_the_worker_limit(monkeypatch, invalidations):
+    session = FakeSession(_worker(1, WorkerStatus.IDLE))
+    workers_in = [WorkerCreate(name=f"new{i}") for i in range(crud.MAX_WORKERS_PER_USER)]
+
+    created = asyncio.run(crud.bulk_create_workers(session, workers_in, user_id=1))
+
+    free = crud.MAX_WORKERS_PER_USER - 1
+    assert [w is not None for w in created] == [True] * free + [False]
+    assert all(w.status == WorkerStatus.STARTING for w in session.added)
+    assert session.commits == 1
+    assert invalidations == [(1,)]
+
+
+def test_docker_calls_are_bounded_per_request(monkeypatch, invalidations):
+    monkeypatch.setattr(settings, "BULK_DOCKER_CONCURRENCY", 3)
+    docker = _docker(monkeypatch, delay=0.05)
+    session = FakeSession(*(_worker(i, WorkerStatus.OFFLINE) for i in range(1, 11)))
+
+    results = asyncio.run(crud.bulk_start_workers(session, list(range(1, 11)), user_id=1))
+
+    assert all(r.ok for r in results)
+    assert len(docker.calls) == 10
+    assert docker.max_in_flight == 3